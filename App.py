@@ -4,10 +4,17 @@ from tkinter import messagebox
 from cryptography.fernet import Fernet
 import os
 import google.generativeai as genai
-import threading
-from Hospital_finder import HospitalApp
+import time
+from hospital_finder import HospitalApp
 from Call_Doctors import DoctorListWindow
 from Sos import EmergencyApp
+from window_manager import windows
+from request_log import RequestLog
+import metrics
+from async_bridge import bridge
+from symptom_pipeline import RISK_COLORS, Conversation, get_risk_color, get_risk_level, pipeline
+import triage
+from chat_store import ChatStore
 
 DATA_FILE = "users.enc"
 KEY_FILE = "key.key"
@@ -23,6 +30,12 @@ else:
     key = open(KEY_FILE, "rb").read()
 
 aes = Fernet(key)
+request_log = RequestLog(fernet=aes)    # symptoms and answers are sealed with the same key
+
+def _elapsed_ms(meta):
+    """Submit-to-rendered time of a chat request, for the request log."""
+    submitted = meta.get("submitted")
+    return None if submitted is None else round((time.perf_counter() - submitted) * 1000, 2)
 
 # Load users
 def load_users():
@@ -49,8 +62,44 @@ class App(ct.CTk):
         self.minsize(900, 600)
 
         self.current_page = None
+        # All network I/O runs on one asyncio loop; results come back here
+        bridge.install(self)
         self.show_page(LoginPage)
 
+        # Metrics: F12 opens the overlay and turns collection on
+        self.stall_monitor = metrics.StallMonitor(self)
+        if metrics.is_enabled():
+            self.stall_monitor.start()
+        self.bind_all("<F12>", self.toggle_metrics)
+
+    def toggle_metrics(self, event=None):
+        from metrics_overlay import MetricsOverlay
+
+        overlay = windows.get("metrics")
+        if overlay is not None and overlay.winfo_viewable():
+            self.hide_metrics()
+            return
+        metrics.enable()
+        self.stall_monitor.start()
+        overlay = windows.show("metrics", lambda: MetricsOverlay(self))
+        overlay.protocol("WM_DELETE_WINDOW", self.hide_metrics)
+        overlay.start()
+
+    def hide_metrics(self):
+        # Hidden metrics cost nothing: no samples, no stall ticks, no redraws
+        overlay = windows.get("metrics")
+        if overlay is not None:
+            overlay.stop()
+        windows.hide("metrics")
+        metrics.enable(False)
+        self.stall_monitor.stop()
+
+    def destroy(self):
+        # Structured shutdown: cancel in-flight requests before Tk goes away
+        bridge.shutdown()
+        request_log.close()         # write the last partial batch
+        super().destroy()
+
     def show_page(self, PageClass):
         if self.current_page:
             self.current_page.destroy()
@@ -175,23 +224,20 @@ class SlidingMenu(ct.CTkFrame):
 
     def open_doctor_list(self):
         try:
-            win = DoctorListWindow()
-            win.grab_set()  # make window modal
+            windows.show("doctors", DoctorListWindow, modal=True)
         except Exception as e:
             print("Error opening doctor list:", e)
 
     def open_emergency(self):
         try:
-            _window = EmergencyApp()
-            _window.mainloop()
+            windows.show("emergency", EmergencyApp)
         except Exception as e:
-            print("Error opening hospital finder:", e)
+            print("Error opening emergency window:", e)
 
 
     def open_hospital_finder(self):
         try:
-            hospital_window = HospitalApp()
-            hospital_window.mainloop()
+            windows.show("hospitals", HospitalApp)
         except Exception as e:
             print("Error opening hospital finder:", e)
 
@@ -241,7 +287,7 @@ class ChatPage(ct.CTkFrame):
     def __init__(self, root):
         super().__init__(root)
         self.root = root
-        self.chat_history=[]
+        self.conversation = Conversation()
 
         ct.CTkLabel(self, text=Heading, font=ct.CTkFont(size=28, weight="bold")).pack(pady=12)
 
@@ -249,6 +295,19 @@ class ChatPage(ct.CTkFrame):
         self.chat_area= ct.CTkScrollableFrame(self, width=900, height=520)
         self.chat_area.pack(pady=10)
 
+        # Saved history: the latest page now, older pages on demand
+        self.history = ChatStore(aes, cur_user) if cur_user else None
+        self.older_cursor = None
+        self.first_bubble = None
+        self.older_btn = ct.CTkButton(
+            self.chat_area,
+            text="⬆ Load earlier messages",
+            command=self.load_older,
+            fg_color="#303030",
+            hover_color="#454545"
+        )
+        self.load_history()
+
         self.bottom = ct.CTkFrame(self)
         self.bottom.pack(pady=10)
 
@@ -298,40 +357,16 @@ class ChatPage(ct.CTkFrame):
         super().destroy()
 
 
-    def clean_markdown(self, text):
-        import re
-        text = re.sub(r"\*\*(.*?)\*\*", r"\1", text)  # bold
-        text = re.sub(r"\*(.*?)\*", r"\1", text)       # italic
-        text = text.replace("_", "")                  # underscores
-        text = text.replace("•", "• ")                # clean bullets
-        text = text.replace("- ", "• ")               # bullets
-        return text
-
-    def beautify(self, text):
-        text = self.clean_markdown(text)
-
-        # Add emojis based on keywords
-        replacements = {
-            "Possible Conditions": "🩺 Possible Conditions",
-            "Risk Score": "📊 Risk Score",
-            "Urgency": "⏳ Urgency",
-            "Recommended Actions": "📝 Recommended Actions",
-            "Disclaimer": "⚠️ Disclaimer",
-            "Symptoms": "🤒 Symptoms",
-        }
-
-        for key, emo in replacements.items():
-            text = text.replace(key, emo)
-
-        return text
-
-    def add_bubble(self, text, side="left", color="#2E7D32"):
+    @metrics.timed("chat.add_bubble")
+    def add_bubble(self, text, side="left", color="#2E7D32", before=None, scroll=True):
         bubble = ct.CTkFrame(
             self.chat_area,
             fg_color=color,
             corner_radius=20
         )
-        bubble.pack(fill="x", pady=6, padx=20, anchor="e" if side == "right" else "w")
+        bubble.pack(fill="x", pady=6, padx=20, anchor="e" if side == "right" else "w", before=before)
+        if self.first_bubble is None:
+            self.first_bubble = bubble
 
         label = ct.CTkLabel(
             bubble,
@@ -342,7 +377,61 @@ class ChatPage(ct.CTkFrame):
         )
         label.pack(padx=15, pady=10)
 
-        self.chat_area._parent_canvas.yview_moveto(1)  # auto scroll
+        if scroll:
+            self.chat_area._parent_canvas.yview_moveto(1)  # auto scroll
+        return bubble
+
+    # ---------------------------------
+    # Saved chat history
+    # ---------------------------------
+    def add_history_bubbles(self, messages, before=None):
+        """Render saved (who, text, ts) messages, in order, above `before` (or at the end)."""
+        first = None
+        for who, text, _ in messages:
+            if who == "User":
+                bubble = self.add_bubble(f"🙂 You:\n{text}", side="right", color="#1976D2",
+                                         before=before, scroll=False)
+            else:
+                bubble = self.add_bubble(f"🤖 AI:\n{text}", side="left", color=get_risk_color(text),
+                                         before=before, scroll=False)
+            first = first or bubble
+        return first
+
+    def show_older_button(self, cursor):
+        self.older_cursor = cursor
+        if cursor is None:
+            self.older_btn.pack_forget()
+        elif not self.older_btn.winfo_manager():
+            self.older_btn.pack(pady=(4, 8), before=self.first_bubble)
+
+    @metrics.timed("chat.load_history")
+    def load_history(self):
+        """Show the latest page of this user's history and resume an unfinished case."""
+        if self.history is None:
+            return
+        messages, cursor = self.history.load_page()
+        self.add_history_bubbles(messages)
+        self.show_older_button(cursor)
+        self.chat_area._parent_canvas.yview_moveto(1)
+
+        # the model only needs the turns since the last finished report
+        history = []
+        for who, text, _ in messages:
+            history.append((who, text))
+            if who == "AI" and "disclaimer" in text.lower():
+                history = []
+        self.conversation.history = history
+
+    @metrics.timed("chat.load_older")
+    def load_older(self):
+        if self.history is None or self.older_cursor is None:
+            return
+        messages, cursor = self.history.load_page(before=self.older_cursor)
+        first = self.add_history_bubbles(messages, before=self.first_bubble)
+        if first is not None:
+            self.first_bubble = first
+        self.show_older_button(cursor)
+        self.chat_area._parent_canvas.yview_moveto(0)
 
     def analyze_symptoms(self,event=None):
         symptoms = self.entry.get().strip()
@@ -353,6 +442,7 @@ class ChatPage(ct.CTkFrame):
 
         # user bubble
         self.add_bubble(f"🙂 You:\n{symptoms}", side="right", color="#1976D2")
+        level, badge = self.show_triage(symptoms)
 
         # Show typing bubble
         self.typing_bubble = ct.CTkFrame(self.chat_area, fg_color="#444")
@@ -366,72 +456,137 @@ class ChatPage(ct.CTkFrame):
 
         self.chat_area._parent_canvas.yview_moveto(1)
 
-        # Threading
-        threading.Thread(target=self.run_api, args=(symptoms,), daemon=True).start()
-
-    def run_api(self, symptoms):
-        try:
-            prompt = f"""
-            Previous Chat History: {self.chat_history}
-            You are a medical diagnostic assistant.
-
-            patient Name if not provided abt the patient details in the symptoms: {cur_user}
-            and return the risk score as one of the following levels: Low, Moderate, High. and the last
-and if the risk is high or moderate, advise the user to seek immediate medical attention and give only 3 more critical steps to take immediately.
-doesnot return anything else 
-            if the symptoms are inadequate, ask for more information before analyzing just first time if the chat history contains it do not
-            ask and produce the diagonised report
-            keep the response concise and to the point.
-            keep the tone empatheitic and keep the language simple for a layman to understand and keep the user realxed on the tone
-
-            
-            Analyze symptoms and return:
-
-            1. Possible Conditions
-            2. Reasoning
-            3. Urgency
-            4. Recommended Actions
-            5. Recomanded feild for the cosulting doctor
-            6. Disclaimer
-
-            Symptoms: {symptoms}
-            """
-
-            model = genai.GenerativeModel("gemini-2.0-flash")
-            self.chat_history.append(("User", symptoms))
-            response = model.generate_content(prompt)
-            text = response.text
-
-        except Exception as e:
-            text = f"❌ Error: {e}"
-
-        self.after(0, lambda: self.display_response(text))
-
-    def get_risk_color(self, text):
-        text_low = text.lower()
-
-        if "high" in text_low or "severe" in text_low or "critical" in text_low:
-            return "#D32F2F"     # 🔴 Red (High Risk)
-
-        if "moderate" in text_low or "medium" in text_low:
-            return "#F9A825"     # 🟡 Yellow (Medium Risk)
-
-        if "low" in text_low or "mild" in text_low:
-            return "#2E7D32"     # 🟢 Green (Low Risk)
-
-        return "#2E7D32"
-
-    def display_response(self, text):
-
-        self.typing_bubble.destroy()
-        pretty = self.beautify(text)
-        self.chat_history.append(("AI", pretty))
+        # Model call on the shared asyncio loop; cancelled if this page is destroyed
+        meta = {"submitted": time.perf_counter(), "asked_at": time.time(), "symptoms": symptoms,
+                "typing_bubble": self.typing_bubble,
+                "triage": level, "triage_badge": badge}
+        bridge.submit(self.run_api_async(symptoms, meta),
+                      on_result=lambda result: self.display_response(*result),
+                      on_error=lambda exc: self.display_failure(exc, meta),
+                      owner=self,
+                      group="model")
+
+    @metrics.timed("chat.triage")
+    def show_triage(self, symptoms):
+        """Provisional risk badge from the local triage model, shown until the AI answers."""
+        case = " ".join(msg for who, msg in self.conversation.history if who == "User")
+        level = triage.classify(f"{case} {symptoms}").level
+        if level == triage.UNKNOWN:
+            text, color = "⚡ Provisional triage: not enough detail yet", "#616161"
+        else:
+            text, color = f"⚡ Provisional triage: {level}", RISK_COLORS[level]
+        badge = ct.CTkLabel(
+            self.chat_area,
+            text=text,
+            fg_color=color,
+            corner_radius=12,
+            font=ct.CTkFont(size=13)
+        )
+        badge.pack(anchor="e", padx=24, pady=(0, 4))
+        return level, badge
 
-        if "disclaimer" in pretty.lower():
-            self.chat_history=[]
-        
-        rsk_clour= self.get_risk_color(pretty)
+    def confirm_triage(self, meta, pretty):
+        """The AI answer confirms or overrides the provisional triage badge."""
+        badge = meta.get("triage_badge")
+        if badge is None or not badge.winfo_exists():
+            return
+        provisional = meta.get("triage")
+        level = None if meta.get("error") else get_risk_level(pretty)
+        if level is None:
+            if provisional != triage.UNKNOWN:
+                badge.configure(text=f"⚡ Provisional triage: {provisional} (not confirmed)")
+        elif provisional == triage.UNKNOWN:
+            badge.configure(text=f"✔ Triage: {level} (AI)", fg_color=RISK_COLORS[level])
+        elif level == provisional:
+            badge.configure(text=f"✔ Triage: {level} (confirmed by AI)")
+        else:
+            badge.configure(text=f"✔ Triage: {level} (AI, was {provisional})", fg_color=RISK_COLORS[level])
+
+    def submit_api(self, symptoms, meta=None, on_done=None):
+        """
+        Send `symptoms` without the entry box or typing bubble (used by the
+        replay tool); call on the Tk thread. A meta["conversation"] is used
+        instead of this page's conversation. on_done() runs after the answer
+        or failure has been displayed.
+        """
+        meta = dict(meta or {}, submitted=time.perf_counter(), symptoms=symptoms)
+
+        def result(value):
+            self.display_response(*value)
+            if on_done is not None:
+                on_done()
+
+        def error(exc):
+            self.display_failure(exc, meta)
+            if on_done is not None:
+                on_done()
+
+        return bridge.submit(self.run_api_async(symptoms, meta),
+                             on_result=result,
+                             on_error=error,
+                             owner=self,
+                             group="model")
+
+    async def run_api_async(self, symptoms, meta=None):
+        meta = dict(meta or {})
+        started = time.perf_counter()
+        meta["symptoms"] = symptoms
+        meta["queue_wait_ms"] = (started - meta.get("submitted", started)) * 1000
+        conversation = meta.get("conversation", self.conversation)
+        conversation.user = cur_user
+        prompt = pipeline.start(conversation, symptoms)
+        text, meta["error"], meta["model_ms"] = await pipeline.generate(prompt)
+        if not meta["error"]:
+            metrics.record("chat.model_call", meta["model_ms"])
+
+        meta["responded"] = time.perf_counter()
+        metrics.record("chat.run_api", (meta["responded"] - started) * 1000)
+        return text, meta
+
+    def display_failure(self, exc, meta):
+        """The request itself failed (not a model error reply): clear the typing bubble and say so."""
+        bubble = meta.get("typing_bubble")
+        if bubble is not None and bubble.winfo_exists():
+            bubble.destroy()
+        meta = dict(meta, error=True)
+        self.confirm_triage(meta, "")
+        self.add_bubble(f"⚠️ Could not get an answer: {str(exc) or type(exc).__name__}", side="left", color="#616161")
+        self.entry.focus_set()
+        request_log.record(error=True, triage=meta.get("triage"),
+                           symptoms_chars=len(meta.get("symptoms") or ""),
+                           total_ms=_elapsed_ms(meta))
+
+    @metrics.timed("chat.display_response")
+    def display_response(self, text, meta=None):
+        meta = meta or {}
+        render_start = time.perf_counter()
+        ui_wait_ms = (render_start - meta.get("responded", render_start)) * 1000
+
+        bubble = meta.get("typing_bubble")
+        if bubble is not None and bubble.winfo_exists():
+            bubble.destroy()
+        pretty, rsk_clour = pipeline.finish(meta.get("conversation", self.conversation), text)
         self.add_bubble(f"🤖 AI:\n{pretty}", side="left", color=rsk_clour)
+        self.confirm_triage(meta, pretty)
+        if self.history is not None and not meta.get("error"):
+            now = time.time()
+            self.history.append([("User", meta.get("symptoms", ""), meta.get("asked_at", now)),
+                                 ("AI", pretty, now)])
+
+        request_log.record(
+            user=cur_user,
+            symptoms=meta.get("symptoms"),
+            response=text,
+            symptoms_chars=len(meta.get("symptoms") or ""),
+            response_chars=len(text or ""),
+            error=meta.get("error", False),
+            triage=meta.get("triage"),
+            queue_wait_ms=round(meta.get("queue_wait_ms", 0.0), 2),
+            model_ms=round(meta.get("model_ms", 0.0), 2),
+            ui_wait_ms=round(ui_wait_ms, 2),
+            render_ms=round((time.perf_counter() - render_start) * 1000, 2),
+            total_ms=_elapsed_ms(meta),
+        )
 
 
 
@@ -2,6 +2,9 @@
 import customtkinter as ct
 from tkinter import messagebox
 import math
+from collections import OrderedDict
+from doctor_directory import get_directory, PAGE_SIZE
+import metrics
 
 
 # Ensure default appearance mode is readable
@@ -9,6 +12,17 @@ import math
 ct.set_appearance_mode("Dark")
 ct.set_default_color_theme("blue")
 
+# Sort menu label -> directory sort key
+SORT_OPTIONS = {
+    "Default": "default",
+    "Rating (High→Low)": "rating",
+    "Price (Low→High)": "fee",
+    "Specialization (A→Z)": "special",
+}
+ALL_SPECIALTIES = "All specialties"
+SEARCH_DEBOUNCE_MS = 150
+MAX_CACHED_CARDS = 300   # hidden cards kept for reuse
+
 def _rating_to_stars(rating, max_stars=5):
     """Return a simple text star representation (★ and ☆)"""
     full = int(math.floor(rating))
@@ -24,19 +38,13 @@ class DoctorListWindow(ct.CTkToplevel):
         self.geometry("700x640")
         self.resizable(False, False)
 
-        # Example doctor data with rating (0-5) and fee (0 = free)
-        self.doctors = [
-            {"id": 1, "name": "Dr. Arjun Kumar", "special": "Cardiologist", "fee": 1200, "phone": "+911234567890", "rating": 4.6},
-            {"id": 2, "name": "Dr. Meera Sen", "special": "Dermatologist", "fee": 0, "phone": "+919876543210", "rating": 4.1},
-            {"id": 3, "name": "Dr. Rajesh Patel", "special": "Neurologist", "fee": 1500, "phone": "+919001112233", "rating": 4.8},
-            {"id": 4, "name": "Dr. Sneha Varma", "special": "General Physician", "fee": 0, "phone": "+918765432100", "rating": 3.9},
-            {"id": 5, "name": "Dr. Kavin Rao", "special": "Orthopedic", "fee": 900, "phone": "+919112223344", "rating": 4.3},
-            {"id": 6, "name": "Dr. Aditi Shah", "special": "ENT", "fee": 700, "phone": "+919223344556", "rating": 4.0},
-            {"id": 7, "name": "Dr. Manoj Iyer", "special": "Pediatrician", "fee": 0, "phone": "+919334455667", "rating": 4.4},
-            {"id": 8, "name": "Dr. Priya Menon", "special": "Gynecologist", "fee": 1300, "phone": "+919445566778", "rating": 4.7},
-            {"id": 9, "name": "Dr. Harish Nair", "special": "General Physician", "fee": 0, "phone": "+919556677889", "rating": 3.8},
-            {"id": 10, "name": "Dr. Suresh Babu", "special": "Cardiologist", "fee": 1400, "phone": "+919667788990", "rating": 4.5}
-        ]
+        # Shared, load-once doctor catalog
+        self.directory = get_directory()
+        self.doctors = self.directory.doctors
+        self.next_cursor = None
+        self.cards = OrderedDict()   # doctor id -> card frame
+        self.shown_ids = []          # ids currently packed, in order
+        self._refresh_job = None
 
         # Top controls: Search + Payment filter + Sorting + Theme toggle
         controls = ct.CTkFrame(self)
@@ -45,7 +53,7 @@ class DoctorListWindow(ct.CTkToplevel):
         # Search
         self.search_entry = ct.CTkEntry(controls, placeholder_text="Search by name or specialty...")
         self.search_entry.grid(row=0, column=0, sticky="ew", padx=(0,8))
-        self.search_entry.bind("<KeyRelease>", lambda e: self.refresh_list())
+        self.search_entry.bind("<KeyRelease>", self.schedule_refresh)
 
         # Payment filter: All / Free / Paid
         self.payment_filter = ct.CTkOptionMenu(controls, values=["All", "Free", "Paid"], command=lambda _: self.refresh_list())
@@ -53,7 +61,7 @@ class DoctorListWindow(ct.CTkToplevel):
 
         # Sort options
         self.sort_var = ct.CTkOptionMenu(controls,
-                                         values=["Default", "Rating (High→Low)", "Price (Low→High)", "Specialization (A→Z)"],
+                                         values=list(SORT_OPTIONS),
                                          command=lambda _: self.refresh_list())
         self.sort_var.grid(row=0, column=2, padx=(0,8))
 
@@ -61,11 +69,21 @@ class DoctorListWindow(ct.CTkToplevel):
         self.theme_button = ct.CTkButton(controls, text="Toggle Theme", width=110, command=self.toggle_theme)
         self.theme_button.grid(row=0, column=3)
 
+        # Specialty facet
+        self.specialty_filter = ct.CTkOptionMenu(controls,
+                                                 values=[ALL_SPECIALTIES] + self.directory.specialties(),
+                                                 command=lambda _: self.refresh_list())
+        self.specialty_filter.grid(row=1, column=0, sticky="w", pady=(6,0))
+
+        self.count_lbl = ct.CTkLabel(controls, text="")
+        self.count_lbl.grid(row=1, column=1, columnspan=3, sticky="e", pady=(6,0))
+
         controls.grid_columnconfigure(0, weight=1)
 
         # Scrollable area for doctors
-        self.list_frame = ct.CTkScrollableFrame(self, width=660, height=520)
+        self.list_frame = ct.CTkScrollableFrame(self, width=660, height=490)
         self.list_frame.pack(padx=12, pady=(0,12), fill="both", expand=False)
+        self.more_btn = ct.CTkButton(self.list_frame, text="Show more", command=self.show_more)
 
         # Initially populated list
         self.refresh_list(animate=True)
@@ -74,96 +92,141 @@ class DoctorListWindow(ct.CTkToplevel):
         current = ct.get_appearance_mode()
         ct.set_appearance_mode("Light" if current == "Dark" else "Dark")
 
-    def refresh_list(self, animate=False):
-        # clear old list
-        for w in self.list_frame.winfo_children():
-            w.destroy()
+    def schedule_refresh(self, event=None):
+        # Debounce typing: refresh once the user pauses
+        if self._refresh_job is not None:
+            self.after_cancel(self._refresh_job)
+        self._refresh_job = self.after(SEARCH_DEBOUNCE_MS, self.refresh_list)
 
+    @metrics.timed("doctors.refresh_list")
+    def refresh_list(self, animate=False):
+        self._refresh_job = None
         q = self.search_entry.get().lower().strip()
         pay_filter = self.payment_filter.get() if hasattr(self.payment_filter, "get") else "All"
         sort_choice = self.sort_var.get() if hasattr(self.sort_var, "get") else "Default"
+        specialty = self.specialty_filter.get()
+        self.query = {
+            "text": q,
+            "payment": pay_filter,
+            "sort": SORT_OPTIONS.get(sort_choice, "default"),
+            "specialty": None if specialty == ALL_SPECIALTIES else specialty,
+        }
+        self.count_lbl.configure(text=f"{self.directory.count(q, pay_filter, self.query['specialty'])} doctors")
+
+        # Only the first page is shown; "Show more" fetches the next one
+        filtered, self.next_cursor = self.directory.query(**self.query, limit=PAGE_SIZE)
+        self.reconcile([d["id"] for d in filtered])
+
+    def show_more(self):
+        if self.next_cursor is None:
+            return
+        page, self.next_cursor = self.directory.query(**self.query, cursor=self.next_cursor, limit=PAGE_SIZE)
+        self.reconcile(self.shown_ids + [d["id"] for d in page])
 
-        # Filter
-        filtered = []
-        for d in self.doctors:
-            name_ok = q in d["name"].lower() or q in d["special"].lower() or q == ""
-            if not name_ok:
-                continue
-            if pay_filter == "Free" and d["fee"] != 0:
-                continue
-            if pay_filter == "Paid" and d["fee"] == 0:
-                continue
-            filtered.append(d)
-
-        # Sorting
-        if sort_choice == "Rating (High→Low)":
-            filtered.sort(key=lambda x: x.get("rating", 0), reverse=True)
-        elif sort_choice == "Price (Low→High)":
-            filtered.sort(key=lambda x: x.get("fee", 0))
-        elif sort_choice == "Specialization (A→Z)":
-            filtered.sort(key=lambda x: x.get("special", "").lower())
-        # Default = keep original order
-
-        # Create cards
-        # We'll add a subtle highlight animation: flash from a brighter color to normal
-        for i, doc in enumerate(filtered):
-            card = ct.CTkFrame(self.list_frame, fg_color="#262626", corner_radius=12)
+    def reconcile(self, new_ids):
+        """
+        Make the packed cards match `new_ids` (in order), keyed by doctor id.
+        Cards that stay in place are untouched, moved or hidden cards are
+        re-packed or forgotten, and only never-seen doctors get new widgets.
+        """
+        old_ids = self.shown_ids
+
+        # Cards before the first difference keep their position
+        keep = 0
+        limit = min(len(old_ids), len(new_ids))
+        while keep < limit and old_ids[keep] == new_ids[keep]:
+            keep += 1
+
+        for doc_id in old_ids[keep:]:
+            self.cards[doc_id].pack_forget()
+        self.more_btn.pack_forget()
+
+        created = []
+        for doc_id in new_ids[keep:]:
+            card = self.cards.get(doc_id)
+            if card is None:
+                card = self.cards[doc_id] = self.build_card(self.directory.get(doc_id))
+                created.append(card)
+            else:
+                self.cards.move_to_end(doc_id)
             card.pack(fill="x", padx=10, pady=(8, 6))
 
-            toprow = ct.CTkFrame(card, fg_color="transparent")
-            toprow.pack(fill="x", pady=(8,2), padx=10)
-
-            name_lbl = ct.CTkLabel(toprow, text=f"{doc['name']}", font=ct.CTkFont(size=15, weight="bold"))
-            name_lbl.pack(side="left", anchor="w")
-
-            rating_text = f"{doc['rating']:.1f} ({_rating_to_stars(doc['rating'])})"
-            ct.CTkLabel(toprow, text=rating_text).pack(side="right", anchor="e")
-
-            mid = ct.CTkFrame(card, fg_color="transparent")
-            mid.pack(fill="x", padx=10, pady=2)
-
-            ct.CTkLabel(mid, text=f"Specialty: {doc['special']}").pack(side="left", anchor="w")
-            fee_text = "Free" if doc["fee"] == 0 else f"₹{doc['fee']}"
-            ct.CTkLabel(mid, text=f" | Fee: {fee_text}").pack(side="left", anchor="w", padx=(8,0))
-
-            # Bottom row buttons
-            brow = ct.CTkFrame(card, fg_color="transparent")
-            brow.pack(fill="x", padx=10, pady=(6,10))
-
-            ct.CTkButton(brow,
-                         text="📞 Call",
-                         width=110,
-                         command=lambda d=doc: self.call_doctor(d)).pack(side="right", padx=(8,0))
-
-            ct.CTkButton(brow,
-                         text="📋 Details",
-                         width=110,
-                         command=lambda d=doc: self.show_details(d)).pack(side="right", padx=(8,0))
-
-            # Subtle animation: flash highlight then return to normal
-            def animate_card(widget, iterations=6, base=0):
-                # alternate between slightly lighter and normal
-                if base >= iterations:
-                    # ensure final normal color
-                    try:
-                        widget.configure(fg_color="#262626")
-                    except:
-                        pass
-                    return
-                if base % 2 == 0:
-                    try:
-                        widget.configure(fg_color="#2f2f2f")
-                    except:
-                        pass
-                else:
-                    try:
-                        widget.configure(fg_color="#262626")
-                    except:
-                        pass
-                widget.after(80, lambda: animate_card(widget, iterations, base + 1))
-
-            # schedule animation slightly staggered
-            self.after(60 * i, lambda w=card: animate_card(w))
+        if self.next_cursor is not None:
+            self.more_btn.pack(pady=(6, 10))
+
+        self.shown_ids = list(new_ids)
+        self.evict_hidden_cards()
+
+        # Only freshly inserted cards flash, staggered
+        for i, card in enumerate(created):
+            self.after(60 * i, lambda w=card: self.animate_card(w))
+
+    def evict_hidden_cards(self):
+        # Keep hidden cards around for reuse, but not without bound
+        if len(self.cards) <= MAX_CACHED_CARDS:
+            return
+        shown = set(self.shown_ids)
+        for doc_id in list(self.cards):
+            if len(self.cards) <= MAX_CACHED_CARDS:
+                break
+            if doc_id not in shown:
+                self.cards.pop(doc_id).destroy()
+
+    def build_card(self, doc):
+        card = ct.CTkFrame(self.list_frame, fg_color="#262626", corner_radius=12)
+
+        toprow = ct.CTkFrame(card, fg_color="transparent")
+        toprow.pack(fill="x", pady=(8,2), padx=10)
+
+        name_lbl = ct.CTkLabel(toprow, text=f"{doc['name']}", font=ct.CTkFont(size=15, weight="bold"))
+        name_lbl.pack(side="left", anchor="w")
+
+        rating_text = f"{doc['rating']:.1f} ({_rating_to_stars(doc['rating'])})"
+        ct.CTkLabel(toprow, text=rating_text).pack(side="right", anchor="e")
+
+        mid = ct.CTkFrame(card, fg_color="transparent")
+        mid.pack(fill="x", padx=10, pady=2)
+
+        ct.CTkLabel(mid, text=f"Specialty: {doc['special']}").pack(side="left", anchor="w")
+        fee_text = "Free" if doc["fee"] == 0 else f"₹{doc['fee']}"
+        ct.CTkLabel(mid, text=f" | Fee: {fee_text}").pack(side="left", anchor="w", padx=(8,0))
+
+        # Bottom row buttons
+        brow = ct.CTkFrame(card, fg_color="transparent")
+        brow.pack(fill="x", padx=10, pady=(6,10))
+
+        ct.CTkButton(brow,
+                     text="📞 Call",
+                     width=110,
+                     command=lambda d=doc: self.call_doctor(d)).pack(side="right", padx=(8,0))
+
+        ct.CTkButton(brow,
+                     text="📋 Details",
+                     width=110,
+                     command=lambda d=doc: self.show_details(d)).pack(side="right", padx=(8,0))
+        return card
+
+    # Subtle animation: flash highlight then return to normal
+    def animate_card(self, widget, iterations=6, base=0):
+        # alternate between slightly lighter and normal
+        if base >= iterations:
+            # ensure final normal color
+            try:
+                widget.configure(fg_color="#262626")
+            except:
+                pass
+            return
+        if base % 2 == 0:
+            try:
+                widget.configure(fg_color="#2f2f2f")
+            except:
+                pass
+        else:
+            try:
+                widget.configure(fg_color="#262626")
+            except:
+                pass
+        widget.after(80, lambda: self.animate_card(widget, iterations, base + 1))
 
     def show_details(self, doc):
         # Small detail popup; can be extended to a full page
@@ -1,19 +1,16 @@
 import customtkinter as ctk
 import threading
-import time
+import uuid
 from playsound import playsound
-import random
+from location_service import location_service
+from alarm_audio import alarm_engine
+from hospital_snapshot import hospital_snapshot
+from alert_outbox import alert_outbox
+from async_bridge import bridge, run_blocking
+from trail_recorder import TrailRecorder, encode_polyline, simplify, to_geojson
 
-# -----------------------
-# Simulated GPS Function
-# -----------------------
-def fake_gps(callback):
-    """Simulate changing GPS coordinates every 2 seconds."""
-    while True:
-        lat = round(random.uniform(10.000, 11.000), 5)
-        lon = round(random.uniform(76.900, 77.200), 5)
-        callback(lat, lon)
-        time.sleep(2)
+TRAIL_FILE = "sos_trail.geojson"
+TRAIL_TOLERANCE_M = 5.0
 
 # -----------------------
 # Main UI Class
@@ -23,7 +20,7 @@ class EmergencyApp(ctk.CTkToplevel):
     def __init__(self):
         super().__init__()
         self.title("Emergency Alert System")
-        self.geometry("400x500")
+        self.geometry("420x700")
         ctk.set_appearance_mode("dark")
 
         # Alarm flag
@@ -59,6 +56,47 @@ class EmergencyApp(ctk.CTkToplevel):
                                       command=self.stop_emergency)
         self.btn_stop.pack(pady=10, ipadx=10, ipady=10)
 
+        # ---------- SAVE TRAIL BUTTON ----------
+        self.btn_trail = ctk.CTkButton(self,
+                                       text="Save Trail",
+                                       fg_color="gray20",
+                                       hover_color="gray30",
+                                       command=self.save_trail)
+        self.btn_trail.pack(pady=5)
+
+        # ---------- NEAREST HOSPITALS ----------
+        self.hospitals_label = ctk.CTkLabel(self,
+                                            text="",
+                                            font=("Arial", 14),
+                                            justify="left",
+                                            wraplength=380)
+        self.hospitals_label.pack(pady=10, padx=10)
+
+        # Keep a warm hospital list so the SOS path never waits on the network
+        hospital_snapshot.start()
+
+        # Decode alarm.mp3 now so EMERGENCY starts sound instantly
+        alarm_engine.preload()
+
+        # Movement trail: every fix during an alarm, recorded on the worker thread
+        self.trail = TrailRecorder()
+        location_service.add_listener(self.record_fix)
+
+        # Alerts are persisted locally and delivered in the background
+        self.incident = None
+        alert_outbox.start()
+        if not alert_outbox.configured:
+            ctk.CTkLabel(self,
+                         text="⚠ No alert contacts configured (alerts.json).\n"
+                              "EMERGENCY will sound the alarm but notify no one.",
+                         text_color="#FFB300",
+                         font=("Arial", 14),
+                         wraplength=380).pack(pady=(0, 10), after=self.status_label)
+
+        # One shared location worker; fixes reach us on the Tk thread
+        location_service.start()
+        self._detach_location = location_service.attach(self, self.update_location)
+
     # ---------------------------------
     # Start emergency
     # ---------------------------------
@@ -66,26 +104,47 @@ class EmergencyApp(ctk.CTkToplevel):
         if self.alarm_active:
             return
         
+        # New incident and empty trail first: record_fix runs on the location
+        # thread and starts using them as soon as alarm_active is set
+        self.incident = uuid.uuid4().hex
+        self.trail.clear()
         self.alarm_active = True
-        self.status_label.configure(text="Status: ALARM ON")
+
+        # Notify contacts (enqueue only; delivery happens off the UI thread)
+        fix = location_service.latest()
+        payload = {"lat": fix.lat, "lon": fix.lon} if fix else {}
+        alert_outbox.enqueue("alert", payload, self.incident)
+        if alert_outbox.configured:
+            self.status_label.configure(text="Status: ALARM ON")
+        else:
+            self.status_label.configure(text="Status: ALARM ON (no one notified)")
         self.btn_emergency.configure(state="disabled")
 
-        # Play alarm sound in thread
-        threading.Thread(target=self.play_alarm, daemon=True).start()
+        # Loop the pre-decoded alarm; fall back to playsound if it can't play
+        try:
+            alarm_engine.start()
+        except Exception as e:
+            print("Alarm engine unavailable, using playsound:", e)
+            threading.Thread(target=self.play_alarm, daemon=True).start()
 
-        # Fake GPS in background
-        threading.Thread(target=fake_gps, args=(self.update_location,), daemon=True).start()
+        # Sample location quickly while the alarm is on
+        location_service.set_alarm(True)
 
     # ---------------------------------
     # Stop everything
     # ---------------------------------
     def stop_emergency(self):
-        self.alarm_active = False
+        was_active = self.alarm_active
+        self.alarm_active = False       # no location updates after "stopped"
+        if was_active and self.incident:
+            alert_outbox.enqueue("stopped", {}, self.incident)
+        alarm_engine.stop()
+        location_service.set_alarm(False)
         self.status_label.configure(text="Status: Stopped")
         self.btn_emergency.configure(state="normal")
 
     # ---------------------------------
-    # Alarm sound loop
+    # Fallback alarm loop (no miniaudio)
     # ---------------------------------
     def play_alarm(self):
         while self.alarm_active:
@@ -95,11 +154,72 @@ class EmergencyApp(ctk.CTkToplevel):
                 pass
 
     # ---------------------------------
-    # Update location
+    # Update location (Tk thread, via location_service)
     # ---------------------------------
     def update_location(self, lat, lon):
         if self.alarm_active:
             self.location_label.configure(text=f"Location: {lat}, {lon}")
+            self.show_nearest_hospitals(lat, lon)
+
+    def show_nearest_hospitals(self, lat, lon):
+        hospital_snapshot.recenter(lat, lon)
+        nearest = hospital_snapshot.nearest_open(lat, lon, k=3)
+        if not nearest:
+            self.hospitals_label.configure(text="Nearest hospitals: not available yet")
+            return
+        lines = ["Nearest open hospitals:"]
+        for h in nearest:
+            mark = "" if h["open_now"] else " (hours unknown)"
+            lines.append(f"• {h['name']} — {h['distance_km']:.1f} km{mark}")
+        self.hospitals_label.configure(text="\n".join(lines))
+
+    def record_fix(self, fix):
+        if self.alarm_active:
+            self.trail.add_fix(fix)
+            alert_outbox.enqueue("location", {"lat": fix.lat, "lon": fix.lon}, self.incident)
+
+    # ---------------------------------
+    # Export the trail for responders
+    # ---------------------------------
+    def save_trail(self):
+        # Simplifying a long trail takes a while; keep the SOS window responsive
+        self.btn_trail.configure(state="disabled")
+        bridge.submit(run_blocking(self._write_trail, self.trail.points()),
+                      on_result=self._trail_saved,
+                      on_error=self._trail_failed,
+                      owner=self,
+                      group="trail")
+
+    @staticmethod
+    def _write_trail(points):
+        """Worker thread: simplify and export; returns the number of points written."""
+        points = simplify(points, TRAIL_TOLERANCE_M)
+        if not points:
+            return 0
+        with open(TRAIL_FILE, "w", encoding="utf-8") as f:
+            f.write(to_geojson(points, {"polyline": encode_polyline(points)}))
+        return len(points)
+
+    def _trail_saved(self, count):
+        self.btn_trail.configure(state="normal")
+        if not count:
+            self.status_label.configure(text="Status: No trail yet")
+            return
+        self.status_label.configure(text=f"Status: Trail saved ({count} pts)")
+
+    def _trail_failed(self, exc):
+        self.btn_trail.configure(state="normal")
+        print("Trail export failed:", exc)
+        self.status_label.configure(text="Status: Trail not saved")
+
+    def destroy(self):
+        self.alarm_active = False
+        alarm_engine.stop()
+        location_service.remove_listener(self.record_fix)
+        self._detach_location()
+        location_service.set_alarm(False)
+        location_service.stop()
+        super().destroy()
 
 # -------------------------------------
 # Run the App
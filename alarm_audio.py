@@ -0,0 +1,270 @@
+"""
+In-memory alarm playback for the SOS window.
+
+alarm.mp3 is decoded once into a 16-bit PCM buffer and looped from memory
+with no gap between repeats. Playback is pulled in BUFFER_MS chunks, so
+stop() takes effect within one buffer period instead of after the whole
+clip.
+
+MP3 decoding and the speaker backend use the optional `miniaudio` package;
+WAV files decode with the standard library. PFM_AUDIO_SINK selects another
+backend for headless runs: "null" (discard) or "file:<path.wav>".
+"""
+
+import os
+import threading
+import time
+import wave
+from array import array
+
+ALARM_FILE = "alarm.mp3"
+BUFFER_MS = 50
+SAMPLE_WIDTH = 2   # bytes, signed 16-bit
+
+try:
+    import miniaudio
+except ImportError:
+    miniaudio = None
+
+
+class AudioUnavailable(Exception):
+    pass
+
+
+class PCM:
+    """Decoded interleaved signed 16-bit little-endian audio."""
+
+    def __init__(self, data, sample_rate, channels):
+        self.data = bytes(data)
+        self.sample_rate = sample_rate
+        self.channels = channels
+
+    @property
+    def frame_bytes(self):
+        return self.channels * SAMPLE_WIDTH
+
+    @property
+    def frames(self):
+        return len(self.data) // self.frame_bytes
+
+    @property
+    def duration(self):
+        return self.frames / self.sample_rate
+
+
+def decode(path):
+    """Decode a WAV (stdlib) or any format miniaudio supports into PCM."""
+    if path.lower().endswith(".wav"):
+        with wave.open(path, "rb") as w:
+            if w.getsampwidth() != SAMPLE_WIDTH:
+                raise AudioUnavailable(f"{path}: only 16-bit WAV is supported")
+            return PCM(w.readframes(w.getnframes()), w.getframerate(), w.getnchannels())
+
+    if miniaudio is None:
+        raise AudioUnavailable("miniaudio is not installed; cannot decode " + path)
+    snd = miniaudio.decode_file(path, output_format=miniaudio.SampleFormat.SIGNED16)
+    return PCM(snd.samples.tobytes(), snd.sample_rate, snd.nchannels)
+
+
+# -----------------------
+# Sinks
+# -----------------------
+class _ThreadSink:
+    """Pulls chunks on a worker thread; subclasses decide what to do with them."""
+
+    realtime = True
+
+    def __init__(self):
+        self._thread = None
+        self._stop = threading.Event()
+        self.frames_written = 0
+
+    def start(self, pcm, read, buffer_ms):
+        self._stop.clear()
+        self.frames_written = 0
+        self.open(pcm)
+        frames = max(1, pcm.sample_rate * buffer_ms // 1000)
+        self._thread = threading.Thread(target=self._pump, args=(pcm, read, frames), daemon=True)
+        self._thread.start()
+
+    def _pump(self, pcm, read, frames):
+        period = frames / pcm.sample_rate
+        next_due = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                chunk = read(frames)
+                if not chunk:
+                    break
+                self.write(chunk)
+                self.frames_written += len(chunk) // pcm.frame_bytes
+                if self.realtime:
+                    next_due += period
+                    self._stop.wait(max(0.0, next_due - time.monotonic()))
+        finally:
+            self.close()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(1.0)
+        self._thread = None
+
+    def open(self, pcm):
+        pass
+
+    def write(self, chunk):
+        pass
+
+    def close(self):
+        pass
+
+
+class NullSink(_ThreadSink):
+    """Discards audio at playback speed (or as fast as possible if realtime=False)."""
+
+    def __init__(self, realtime=True):
+        super().__init__()
+        self.realtime = realtime
+
+
+class WaveFileSink(_ThreadSink):
+    """Writes what would have been played to a WAV file."""
+
+    def __init__(self, path, realtime=True):
+        super().__init__()
+        self.path = path
+        self.realtime = realtime
+        self._wav = None
+
+    def open(self, pcm):
+        self._wav = wave.open(self.path, "wb")
+        self._wav.setnchannels(pcm.channels)
+        self._wav.setsampwidth(SAMPLE_WIDTH)
+        self._wav.setframerate(pcm.sample_rate)
+
+    def write(self, chunk):
+        self._wav.writeframes(chunk)
+
+    def close(self):
+        if self._wav is not None:
+            self._wav.close()
+            self._wav = None
+
+
+class SpeakerSink:
+    """Plays through the default output device with miniaudio."""
+
+    def __init__(self):
+        if miniaudio is None:
+            raise AudioUnavailable("miniaudio is not installed")
+        self._device = None
+
+    def start(self, pcm, read, buffer_ms):
+        self._device = miniaudio.PlaybackDevice(
+            output_format=miniaudio.SampleFormat.SIGNED16,
+            nchannels=pcm.channels,
+            sample_rate=pcm.sample_rate,
+            buffersize_msec=buffer_ms,
+        )
+
+        def stream():
+            required = yield b""
+            while True:
+                chunk = read(required)
+                if not chunk:
+                    return
+                samples = array("h")
+                samples.frombytes(chunk)
+                required = yield samples
+
+        gen = stream()
+        next(gen)
+        self._device.start(gen)
+
+    def stop(self):
+        if self._device is not None:
+            self._device.stop()
+            self._device.close()
+            self._device = None
+
+
+def make_sink(spec=None):
+    spec = spec if spec is not None else os.environ.get("PFM_AUDIO_SINK", "")
+    if spec == "null":
+        return NullSink()
+    if spec.startswith("file:"):
+        return WaveFileSink(spec[5:])
+    return SpeakerSink()
+
+
+# -----------------------
+# Engine
+# -----------------------
+class AlarmEngine:
+    def __init__(self, path=ALARM_FILE, sink=None, buffer_ms=BUFFER_MS):
+        self.path = path
+        self.sink = sink
+        self.buffer_ms = buffer_ms
+        self.pcm = None
+        self._pos = 0
+        self._playing = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def is_playing(self):
+        return self._playing.is_set()
+
+    def load(self):
+        """Decode the alarm once; later calls reuse the buffer."""
+        with self._lock:
+            if self.pcm is None:
+                pcm = decode(self.path)
+                if pcm.frames == 0:
+                    raise AudioUnavailable(f"{self.path} contains no audio")
+                self.pcm = pcm
+        return self.pcm
+
+    def preload(self):
+        """Decode in the background so the first alarm starts instantly."""
+        def run():
+            try:
+                self.load()
+            except Exception as e:
+                print("Alarm preload failed:", e)
+        threading.Thread(target=run, daemon=True).start()
+
+    def _read(self, frames):
+        # Loop the buffer seamlessly: wrap around mid-chunk if needed
+        if not self._playing.is_set():
+            return b""
+        data = self.pcm.data
+        want = frames * self.pcm.frame_bytes
+        out = bytearray()
+        while len(out) < want:
+            take = min(want - len(out), len(data) - self._pos)
+            out += data[self._pos:self._pos + take]
+            self._pos = (self._pos + take) % len(data)
+        return bytes(out)
+
+    def start(self):
+        """Start looping the alarm. Raises AudioUnavailable if it cannot play."""
+        if self.is_playing:
+            return
+        pcm = self.load()
+        if self.sink is None:
+            self.sink = make_sink()
+        self._pos = 0
+        self._playing.set()
+        try:
+            self.sink.start(pcm, self._read, self.buffer_ms)
+        except Exception:
+            self._playing.clear()
+            raise
+
+    def stop(self):
+        self._playing.clear()
+        if self.sink is not None:
+            self.sink.stop()
+
+
+alarm_engine = AlarmEngine()
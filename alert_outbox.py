@@ -0,0 +1,366 @@
+"""
+Durable outbox for SOS alerts.
+
+enqueue() appends one JSON line to an append-only file and returns; it is
+cheap enough for the UI path (no fsync, no network). A background sender
+delivers pending messages to every configured transport (HTTP webhook,
+SMTP) in batches, drops location updates that a newer one for the same
+incident has superseded, sends each transport at most one location update
+per LOCATION_INTERVAL (alerts and stops go out at once), and retries
+failures with exponential backoff.
+Delivery results are appended to the same file, so pending messages are
+recovered after a crash or restart.
+
+Transports are read from alerts.json, e.g.
+
+    {"webhooks": ["https://example.org/sos"],
+     "smtp": {"host": "localhost", "port": 25, "sender": "sos@example.org",
+              "recipients": ["family@example.org"]}}
+"""
+
+import json
+import os
+import random
+import smtplib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from email.message import EmailMessage
+
+import requests
+
+from async_bridge import bridge, run_blocking
+
+OUTBOX_FILE = "sos_outbox.jsonl"
+CONFIG_FILE = "alerts.json"
+BATCH_SIZE = 20
+BATCH_WINDOW = 0.2        # seconds to wait for more messages before sending
+LOCATION_INTERVAL = 60.0  # seconds between location updates to one transport
+FSYNC_INTERVAL = 0.5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+HTTP_TIMEOUT = 10
+COMPACT_BYTES = 1024 * 1024   # rewrite the log once idle and larger than this
+
+
+# -----------------------
+# Transports
+# -----------------------
+class WebhookTransport:
+    def __init__(self, url, timeout=HTTP_TIMEOUT, headers=None):
+        self.url = url
+        self.timeout = timeout
+        self.headers = headers or {}
+        self.name = f"webhook:{url}"
+
+    def send(self, messages):
+        resp = requests.post(self.url, json={"alerts": messages}, headers=self.headers, timeout=self.timeout)
+        resp.raise_for_status()
+
+
+class SMTPTransport:
+    def __init__(self, host, port=25, sender="sos@localhost", recipients=(), username=None, password=None,
+                 starttls=False, timeout=HTTP_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipients = list(recipients)
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.name = f"smtp:{host}:{port}"
+
+    def send(self, messages):
+        msg = EmailMessage()
+        kinds = {m["kind"] for m in messages}
+        msg["Subject"] = "SOS ALERT" if "alert" in kinds else "SOS update"
+        msg["From"] = self.sender
+        msg["To"] = ", ".join(self.recipients)
+        lines = []
+        for m in messages:
+            p = m.get("payload", {})
+            when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(m["ts"]))
+            where = f"{p['lat']}, {p['lon']}" if "lat" in p and "lon" in p else "unknown"
+            lines.append(f"[{when}] {m['kind'].upper()} incident {m['incident']} at {where}")
+            if "lat" in p and "lon" in p:
+                lines.append(f"  https://www.google.com/maps/search/?api=1&query={p['lat']},{p['lon']}")
+        msg.set_content("\n".join(lines))
+
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password or "")
+            smtp.send_message(msg)
+
+
+def load_transports(path=CONFIG_FILE):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        cfg = json.load(f)
+    transports = [WebhookTransport(url) for url in cfg.get("webhooks", [])]
+    smtp = cfg.get("smtp")
+    if smtp:
+        transports.append(SMTPTransport(**smtp))
+    return transports
+
+
+# -----------------------
+# Outbox
+# -----------------------
+class AlertOutbox:
+    def __init__(self, path=OUTBOX_FILE, transports=None, batch_size=BATCH_SIZE, batch_window=BATCH_WINDOW,
+                 location_interval=LOCATION_INTERVAL):
+        """transports=None reads them from alerts.json when the outbox starts."""
+        self.path = path
+        self.transports = None if transports is None else list(transports)
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.location_interval = location_interval
+
+        self._pending = OrderedDict()   # id -> message
+        self._delivered = {}            # id -> set of transport names
+        self._retry_at = {}             # transport name -> (monotonic time, attempts)
+        self._location_sent = {}        # transport name -> monotonic time of the last location sent
+        self._location_held = {}        # transport name -> monotonic time a held location may go
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._file = None
+        self._dirty = False
+        self._thread = None
+
+    # ---------------------------------
+    # Lifecycle
+    # ---------------------------------
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        if self.transports is None:
+            try:
+                self.transports = load_transports()
+            except (OSError, ValueError, TypeError) as e:
+                print("Alert transports not loaded:", e)
+                self.transports = []
+        self._recover()
+        self._file = open(self.path, "a", encoding="utf-8")
+        if not self.transports:
+            print(f"No alert transports configured ({CONFIG_FILE}); SOS alerts will not be sent")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="alert-outbox", daemon=True)
+        self._thread.start()
+        self._wake.set()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+
+    def _recover(self):
+        """Rebuild pending state from the log, then compact it."""
+        self._pending.clear()
+        self._delivered.clear()
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue   # torn last line after a crash
+                    op = rec.get("op")
+                    if op == "put":
+                        self._pending[rec["msg"]["id"]] = rec["msg"]
+                    elif op == "done":
+                        for mid in rec.get("ids", ()):
+                            self._delivered.setdefault(mid, set()).add(rec.get("t"))
+                    elif op == "drop":
+                        for mid in rec.get("ids", ()):
+                            self._pending.pop(mid, None)
+                            self._delivered.pop(mid, None)
+        self._forget_completed()
+        self._compact()
+
+    def _compact(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for mid, msg in self._pending.items():
+                f.write(json.dumps({"op": "put", "msg": msg}) + "\n")
+                for name in self._delivered.get(mid, ()):
+                    f.write(json.dumps({"op": "done", "t": name, "ids": [mid]}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    # ---------------------------------
+    # UI path
+    # ---------------------------------
+    @property
+    def configured(self):
+        """True once started with at least one transport to deliver to."""
+        return bool(self.transports)
+
+    def enqueue(self, kind, payload, incident):
+        """
+        Persist a message and wake the sender. Returns the message id, or
+        None without queueing anything when no transport is configured.
+        """
+        if self.transports is not None and not self.transports:
+            return None     # nothing would ever deliver it; don't grow the log
+        msg = {"id": uuid.uuid4().hex, "kind": kind, "incident": incident, "ts": time.time(), "payload": payload}
+        line = json.dumps({"op": "put", "msg": msg}) + "\n"
+        with self._lock:
+            if self._file is None:
+                raise RuntimeError("AlertOutbox is not started")
+            self._file.write(line)
+            self._file.flush()
+            self._dirty = True
+            self._pending[msg["id"]] = msg
+        self._wake.set()
+        return msg["id"]
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    # ---------------------------------
+    # Sender
+    # ---------------------------------
+    def _append(self, rec):
+        with self._lock:
+            if self._file is not None:
+                self._file.write(json.dumps(rec) + "\n")
+                self._file.flush()
+                self._dirty = True
+
+    def _forget_completed(self):
+        names = {t.name for t in self.transports}
+        for mid in list(self._pending):
+            if names and names <= self._delivered.get(mid, set()):
+                del self._pending[mid]
+                self._delivered.pop(mid, None)
+
+    def _coalesce(self):
+        """Drop location updates that a newer one for the same incident replaces."""
+        latest = {}
+        superseded = []
+        with self._lock:
+            for mid, msg in self._pending.items():
+                if msg["kind"] != "location":
+                    continue
+                key = msg["incident"]
+                if key in latest:
+                    superseded.append(latest[key])
+                latest[key] = mid
+            for mid in superseded:
+                self._pending.pop(mid, None)
+                self._delivered.pop(mid, None)
+        if superseded:
+            self._append({"op": "drop", "ids": superseded})
+
+    def _run(self):
+        last_sync = time.monotonic()
+        while not self._stop.is_set():
+            self._wake.wait(self._next_wait())
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            # Give bursts a moment to accumulate into one batch
+            time.sleep(self.batch_window)
+
+            self._coalesce()
+            for transport in self.transports:
+                self._deliver(transport)
+
+            if time.monotonic() - last_sync >= FSYNC_INTERVAL:
+                self._sync()
+                last_sync = time.monotonic()
+            self._maybe_compact()
+
+    def _next_wait(self):
+        due = [t for t, _ in self._retry_at.values()] + list(self._location_held.values())
+        if not due:
+            return FSYNC_INTERVAL
+        return max(0.05, min(FSYNC_INTERVAL, min(due) - time.monotonic()))
+
+    def _select(self, transport):
+        """Next batch for `transport`, holding back location updates inside its interval."""
+        next_location = self._location_sent.get(transport.name, float("-inf")) + self.location_interval
+        batch = []
+        held = False
+        with self._lock:
+            unsent = [m for mid, m in self._pending.items() if transport.name not in self._delivered.get(mid, ())]
+            # a held location rides along with an alert or stop instead of trailing it
+            hold = time.monotonic() < next_location and all(m["kind"] == "location" for m in unsent)
+            for m in unsent:
+                if m["kind"] == "location" and hold:
+                    held = True     # _coalesce keeps only the newest until it may go
+                    continue
+                batch.append(m)
+                if len(batch) >= self.batch_size:
+                    break
+        if held:
+            self._location_held[transport.name] = next_location
+        else:
+            self._location_held.pop(transport.name, None)
+        return batch
+
+    def _deliver(self, transport):
+        retry = self._retry_at.get(transport.name)
+        if retry and time.monotonic() < retry[0]:
+            return
+        while True:
+            batch = self._select(transport)
+            if not batch:
+                self._retry_at.pop(transport.name, None)
+                return
+            try:
+                # Blocking transports run on abandonable daemon threads under
+                # the shared loop, so alert I/O shares its limits, timeouts and shutdown
+                bridge.run_sync(run_blocking(transport.send, batch), group="alerts",
+                                timeout=getattr(transport, "timeout", HTTP_TIMEOUT) + 5)
+            except Exception as e:
+                attempts = (retry[1] if retry else 0) + 1
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+                self._retry_at[transport.name] = (time.monotonic() + delay, attempts)
+                print(f"Alert delivery via {transport.name} failed (retry in {delay:.1f}s):", e)
+                return
+            retry = None
+            if any(m["kind"] == "location" for m in batch):
+                self._location_sent[transport.name] = time.monotonic()
+            ids = [m["id"] for m in batch]
+            self._append({"op": "done", "t": transport.name, "ids": ids})
+            with self._lock:
+                for mid in ids:
+                    self._delivered.setdefault(mid, set()).add(transport.name)
+                self._forget_completed()
+
+    def _maybe_compact(self):
+        with self._lock:
+            if self._pending or self._file is None or self._file.tell() < COMPACT_BYTES:
+                return
+            self._file.close()
+            self._compact()
+            self._file = open(self.path, "a", encoding="utf-8")
+            self._dirty = False
+
+    def _sync(self):
+        with self._lock:
+            if self._file is None or not self._dirty:
+                return
+            self._dirty = False
+            fd = self._file.fileno()
+        os.fsync(fd)
+
+
+alert_outbox = AlertOutbox()
@@ -0,0 +1,134 @@
+"""
+Local stand-ins for the alert transports, for tests and demos.
+
+    with LocalWebhookServer() as hook, LocalSMTPServer() as smtp:
+        outbox = AlertOutbox("test_outbox.jsonl", [
+            WebhookTransport(hook.url),
+            SMTPTransport("127.0.0.1", smtp.port, recipients=["ops@example.org"]),
+        ])
+
+Both servers bind to 127.0.0.1 on a free port, keep what they receive in
+memory, and can be told to fail the next N requests to exercise retries.
+"""
+
+import json
+import socketserver
+import threading
+from email import message_from_bytes
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Server:
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+
+# -----------------------
+# HTTP webhook
+# -----------------------
+class LocalWebhookServer(_Server):
+    def __init__(self, host="127.0.0.1", port=0):
+        self.received = []          # list of decoded JSON bodies
+        self.fail_next = 0
+        self._lock = threading.Lock()
+        outer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                with outer._lock:
+                    if outer.fail_next > 0:
+                        outer.fail_next -= 1
+                        self.send_response(503)
+                        self.end_headers()
+                        return
+                    outer.received.append(json.loads(body or b"null"))
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(b'{"ok": true}')
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}/sos"
+
+
+# -----------------------
+# SMTP
+# -----------------------
+class LocalSMTPServer(_Server):
+    """Just enough SMTP (HELO/EHLO, MAIL, RCPT, DATA, RSET, NOOP, QUIT) for smtplib."""
+
+    def __init__(self, host="127.0.0.1", port=0):
+        self.messages = []          # list of email.message.Message
+        self.fail_next = 0
+        self._lock = threading.Lock()
+        outer = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(line.encode() + b"\r\n")
+
+            def handle(self):
+                self.reply("220 localhost stand-in SMTP")
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    cmd = line.decode(errors="replace").strip()
+                    verb = cmd[:4].upper()
+                    if verb == "EHLO":
+                        self.reply("250-localhost")
+                        self.reply("250 8BITMIME")
+                    elif verb in ("HELO", "MAIL", "RCPT", "RSET", "NOOP"):
+                        self.reply("250 OK")
+                    elif verb == "DATA":
+                        self.reply("354 End data with <CR><LF>.<CR><LF>")
+                        self.read_data()
+                    elif verb == "QUIT":
+                        self.reply("221 Bye")
+                        return
+                    else:
+                        self.reply("502 Command not implemented")
+
+            def read_data(self):
+                lines = []
+                while True:
+                    line = self.rfile.readline()
+                    if not line or line in (b".\r\n", b".\n"):
+                        break
+                    lines.append(line[1:] if line.startswith(b"..") else line)
+                with outer._lock:
+                    if outer.fail_next > 0:
+                        outer.fail_next -= 1
+                        self.reply("451 Try again later")
+                        return
+                    outer.messages.append(message_from_bytes(b"".join(lines)))
+                self.reply("250 OK")
+
+        class Server(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        self._server = Server((host, port), Handler)
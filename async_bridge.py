@@ -0,0 +1,246 @@
+"""
+One asyncio loop for all network I/O, bridged to the Tk mainloop.
+
+The loop runs on a dedicated thread. Coroutines are submitted with submit();
+each one runs under a per-group concurrency limit and an optional timeout,
+and its result or error is handed back to the Tk thread through a queue
+that the root window drains with after(). Work can be tied to an owner
+window so it is cancelled when that window is destroyed, and shutdown()
+cancels everything and stops the loop when the app exits.
+
+Blocking calls (requests, smtplib) go through run_blocking() rather than
+asyncio.to_thread: they run on their own daemon thread, so cancelling
+abandons them and a request stuck for OSM_TIMEOUT can't hold the process
+open after the window closes (executor threads are joined at exit).
+"""
+
+import asyncio
+import concurrent.futures
+import queue
+import threading
+
+POLL_MS = 20
+GROUP_LIMITS = {"network": 4, "model": 2, "alerts": 2}
+DEFAULT_LIMIT = 4
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """Await fn(*args, **kwargs) run on a fresh daemon thread; cancelling abandons it."""
+    loop = asyncio.get_running_loop()
+    fut = loop.create_future()
+
+    def settle(result, exc):
+        if fut.done():
+            return              # cancelled meanwhile; the result is dropped
+        if exc is None:
+            fut.set_result(result)
+        else:
+            fut.set_exception(exc)
+
+    def run():
+        try:
+            result, exc = fn(*args, **kwargs), None
+        except Exception as e:
+            result, exc = None, e
+        try:
+            loop.call_soon_threadsafe(settle, result, exc)
+        except RuntimeError:
+            pass                # loop already closed
+
+    threading.Thread(target=run, name=f"blocking-{getattr(fn, '__name__', 'call')}", daemon=True).start()
+    return await fut
+
+
+class AsyncBridge:
+    def __init__(self, limits=None):
+        self.limits = dict(GROUP_LIMITS if limits is None else limits)
+        self._loop = None
+        self._thread = None
+        self._semaphores = {}
+        self._owners = {}             # id(owner) -> set of futures
+        self._callbacks = queue.SimpleQueue()
+        self._tk_root = None
+        self._lock = threading.Lock()
+        self._closed = False          # set by shutdown(); worker threads must not restart the loop
+
+    # ---------------------------------
+    # Lifecycle
+    # ---------------------------------
+    def start(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("bridge shut down")
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run():
+                asyncio.set_event_loop(self._loop)
+                self._loop.call_soon(ready.set)
+                self._loop.run_forever()
+
+            self._thread = threading.Thread(target=run, name="asyncio-bridge", daemon=True)
+            self._thread.start()
+            ready.wait()
+
+    def restart(self):
+        """Reopen after shutdown(); the only way a closed bridge takes work again."""
+        self._closed = False
+        self.start()
+
+    def install(self, widget):
+        """Deliver callbacks on the Tk thread of `widget`'s application."""
+        root = widget._root()
+        if self._tk_root is root:
+            return
+        self._tk_root = root
+        root.after(POLL_MS, self._drain)
+
+    def shutdown(self, timeout=2.0):
+        """Cancel all running work and stop the loop."""
+        self._closed = True
+        loop = self._loop
+        if loop is None or not loop.is_running():
+            return
+
+        async def cancel_all():
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        try:
+            asyncio.run_coroutine_threadsafe(cancel_all(), loop).result(timeout)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(timeout)
+        self._owners.clear()
+        self._semaphores.clear()
+        self._loop = None
+        self._tk_root = None
+
+    # ---------------------------------
+    # Submitting work
+    # ---------------------------------
+    def _semaphore(self, group):
+        sem = self._semaphores.get(group)
+        if sem is None:
+            sem = self._semaphores[group] = asyncio.Semaphore(self.limits.get(group, DEFAULT_LIMIT))
+        return sem
+
+    async def _guarded(self, coro, group, timeout):
+        async with self._semaphore(group):
+            if timeout is None:
+                return await coro
+            return await asyncio.wait_for(coro, timeout)
+
+    def submit(self, coro, on_result=None, on_error=None, owner=None, group="network", timeout=None):
+        """
+        Schedule `coro` on the shared loop and return a concurrent Future
+        (call .cancel() on it to cancel the coroutine). on_result(value) or
+        on_error(exc) run later on the Tk thread, and are skipped if the
+        work was cancelled or `owner` has been destroyed. After shutdown()
+        the coroutine is dropped and an already-cancelled Future returned.
+        """
+        if self._closed:
+            coro.close()
+            fut = concurrent.futures.Future()
+            fut.cancel()
+            return fut
+        self.start()
+        fut = asyncio.run_coroutine_threadsafe(self._guarded(coro, group, timeout), self._loop)
+
+        if owner is not None:
+            key = id(owner)
+            with self._lock:
+                if key not in self._owners:
+                    self._owners[key] = set()
+                    self._bind_owner(owner)
+                self._owners[key].add(fut)
+
+        def done(f):
+            if owner is not None:
+                with self._lock:
+                    self._owners.get(id(owner), set()).discard(f)
+            if f.cancelled():
+                return
+            if on_result is None and on_error is None:
+                return
+            self._callbacks.put((f, on_result, on_error, owner))
+
+        fut.add_done_callback(done)
+        return fut
+
+    def run_sync(self, coro, group="network", timeout=None):
+        """
+        Run `coro` on the shared loop and block for its result (not from the
+        Tk thread). Raises RuntimeError, not CancelledError, if the work is
+        cancelled or the bridge has shut down, so worker threads' ordinary
+        `except Exception` handlers see it.
+        """
+        if self._closed:
+            coro.close()
+            raise RuntimeError("bridge shut down")
+        self.start()
+        fut = asyncio.run_coroutine_threadsafe(self._guarded(coro, group, timeout), self._loop)
+        try:
+            return fut.result()
+        except concurrent.futures.CancelledError:
+            raise RuntimeError("bridge shut down" if self._closed else "bridge task cancelled") from None
+
+    def cancel_owner(self, owner):
+        with self._lock:
+            futures = self._owners.pop(id(owner), set())
+        for fut in futures:
+            fut.cancel()
+
+    def _bind_owner(self, owner):
+        import tkinter as tk            # here, so headless users of run_blocking don't need Tk
+
+        def on_destroy(event):
+            if event.widget is owner:
+                self.cancel_owner(owner)
+        try:
+            # Plain Tk bind: CustomTkinter widgets redirect bind() to their canvas
+            tk.Misc.bind(owner, "<Destroy>", on_destroy, "+")
+        except Exception:
+            pass
+
+    # ---------------------------------
+    # Tk side
+    # ---------------------------------
+    def _drain(self):
+        root = self._tk_root
+        if root is None:
+            return
+        while True:
+            try:
+                fut, on_result, on_error, owner = self._callbacks.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                if owner is not None and not owner.winfo_exists():
+                    continue
+            except Exception:
+                continue
+            exc = fut.exception()
+            try:
+                if exc is None:
+                    if on_result is not None:
+                        on_result(fut.result())
+                elif on_error is not None:
+                    on_error(exc)
+                else:
+                    print("Background task failed:", exc)
+            except Exception as e:
+                print("Async callback failed:", e)
+        try:
+            if root.winfo_exists():
+                root.after(POLL_MS, self._drain)
+        except Exception:
+            pass
+
+
+bridge = AsyncBridge()
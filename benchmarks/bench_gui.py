@@ -0,0 +1,263 @@
+"""
+Headless rendering benchmarks for the list and chat widgets.
+
+Measures wall time and memory for HospitalApp.render_results,
+DoctorListWindow.refresh_list and ChatPage.add_bubble at several sizes,
+plus per-keystroke filter latency, using synthetic data (no network).
+If no X display is available a private Xvfb server is started.
+
+    python benchmarks/bench_gui.py --sizes 10 100 1000 --out bench_gui.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SPECIALTIES = ["Cardiologist", "Dermatologist", "Neurologist", "General Physician", "Orthopedic",
+               "ENT", "Pediatrician", "Gynecologist", "Psychiatrist", "Oncologist"]
+FIRST = ["Arjun", "Meera", "Rajesh", "Sneha", "Kavin", "Aditi", "Manoj", "Priya", "Harish", "Suresh"]
+LAST = ["Kumar", "Sen", "Patel", "Varma", "Rao", "Shah", "Iyer", "Menon", "Nair", "Babu"]
+HOURS = [None, "24/7", "Mo-Fr 09:00-18:00", "Mo-Sa 08:00-20:00; Su 10:00-13:00"]
+KEYSTROKES = "cardio"
+
+
+# -----------------------
+# Display
+# -----------------------
+def ensure_display():
+    """Return a Popen for a private Xvfb if one had to be started."""
+    if os.environ.get("DISPLAY"):
+        return None
+    if shutil.which("Xvfb") is None:
+        sys.exit("No DISPLAY and Xvfb is not installed (apt install xvfb)")
+    for n in range(99, 140):
+        if os.path.exists(f"/tmp/.X11-unix/X{n}") or os.path.exists(f"/tmp/.X{n}-lock"):
+            continue
+        proc = subprocess.Popen(["Xvfb", f":{n}", "-screen", "0", "1280x1024x24", "-nolisten", "tcp"],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for _ in range(50):
+            if os.path.exists(f"/tmp/.X11-unix/X{n}"):
+                os.environ["DISPLAY"] = f":{n}"
+                return proc
+            time.sleep(0.1)
+        proc.kill()
+    sys.exit("Could not start Xvfb")
+
+
+# -----------------------
+# Synthetic data
+# -----------------------
+def make_hospitals(n, rng):
+    items = []
+    for i in range(n):
+        items.append({
+            "name": f"{rng.choice(LAST)} Hospital {i}",
+            "address": f"{rng.randint(1, 400)} Main Road, Coimbatore",
+            "lat": 11.0 + rng.random() * 0.12,
+            "lon": 76.95 + rng.random() * 0.12,
+            "tags": {"amenity": "hospital"},
+            "opening_hours": rng.choice(HOURS),
+            "distance_km": rng.random() * 7,
+            "open_now": rng.choice([True, False, None]),
+        })
+    return items
+
+
+def make_doctors(n, rng):
+    return [{"id": i + 1, "name": f"Dr. {rng.choice(FIRST)} {rng.choice(LAST)}",
+             "special": rng.choice(SPECIALTIES), "fee": rng.choice([0, 500, 900, 1400]),
+             "phone": "+910000000000", "rating": round(rng.uniform(3, 5), 1)} for i in range(n)]
+
+
+# -----------------------
+# Measurement helpers
+# -----------------------
+def rss_kb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        return None
+
+
+def measure(widget, fn):
+    """Run fn, flush pending geometry/redraw work, return timing and memory."""
+    widget.update()
+    rss_before = rss_kb()
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    widget.update_idletasks()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = rss_kb()
+    return {
+        "ms": round(elapsed * 1000, 3),
+        "py_peak_kb": round(peak / 1024, 1),
+        "rss_delta_kb": None if rss_before is None else rss_after - rss_before,
+    }
+
+
+def keystroke_latency(widget, set_text, apply):
+    samples = []
+    for i in range(1, len(KEYSTROKES) + 1):
+        set_text(KEYSTROKES[:i])
+        start = time.perf_counter()
+        apply()
+        widget.update_idletasks()
+        samples.append((time.perf_counter() - start) * 1000)
+    set_text("")
+    apply()
+    return {"keystrokes": len(samples), "mean_ms": round(statistics.mean(samples), 3),
+            "max_ms": round(max(samples), 3)}
+
+
+# -----------------------
+# Benchmarks
+# -----------------------
+def bench_hospitals(sizes, rng):
+    import hospital_data
+    import hospital_finder
+
+    stub = {"items": []}
+
+    async def stub_fetch(*args, **kwargs):
+        return [dict(it) for it in stub["items"]]
+    hospital_data.fetch_hospitals_async = stub_fetch
+
+    results = []
+    for n in sizes:
+        stub["items"] = make_hospitals(n, rng)
+        win = hospital_finder.HospitalApp()
+        # let the stubbed fetch come back through the async bridge
+        deadline = time.monotonic() + 5
+        while not win.all_items and time.monotonic() < deadline:
+            win.update()
+            time.sleep(0.01)
+
+        row = {"widget": "hospitals", "n": n, **measure(win, win.apply_filters)}
+        row["filter"] = keystroke_latency(win, win.search_var.set, win.apply_filters)
+        results.append(row)
+        win.destroy()
+    return results
+
+
+def bench_doctors(sizes, rng):
+    import doctor_directory
+    import Call_Doctors
+
+    results = []
+    for n in sizes:
+        doctor_directory._directory = doctor_directory.DoctorDirectory(make_doctors(n, rng))
+        win = None
+
+        def build():
+            nonlocal win
+            win = Call_Doctors.DoctorListWindow()
+        row = {"widget": "doctors", "n": n, **measure(win or _root, build)}
+
+        # every doctor on screen, not just the first page
+        ids = [d["id"] for d in doctor_directory._directory.doctors]
+        row["render_all"] = measure(win, lambda: win.reconcile(ids))
+
+        def set_text(text):
+            win.search_entry.delete(0, "end")
+            win.search_entry.insert(0, text)
+        row["filter"] = keystroke_latency(win, set_text, win.refresh_list)
+        results.append(row)
+        win.destroy()
+    return results
+
+
+def bench_chat(sizes, rng):
+    import App
+
+    results = []
+    for n in sizes:
+        page = App.ChatPage(_root)
+        page.pack(fill="both", expand=True)
+
+        def add_all():
+            for i in range(n):
+                side = "right" if i % 2 else "left"
+                page.add_bubble(f"Message {i}: " + "symptom text " * rng.randint(3, 30), side=side)
+        results.append({"widget": "chat_bubbles", "n": n, **measure(page, add_all)})
+        page.destroy()
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "-C", ROOT, "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+_root = None
+
+
+def main():
+    global _root
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--only", choices=["hospitals", "doctors", "chat"], nargs="+")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    out = os.path.abspath(args.out) if args.out else None
+    xvfb = ensure_display()
+    # App.py creates key/user files in the working directory
+    workdir = tempfile.mkdtemp(prefix="pfm-bench-")
+    os.chdir(workdir)
+    try:
+        import App
+        _root = App.App()
+        rng = random.Random(args.seed)
+        only = set(args.only or ["hospitals", "doctors", "chat"])
+
+        results = []
+        if "hospitals" in only:
+            results += bench_hospitals(args.sizes, rng)
+        if "doctors" in only:
+            results += bench_doctors(args.sizes, rng)
+        if "chat" in only:
+            results += bench_chat(args.sizes, rng)
+
+        report = {
+            "suite": "gui",
+            "timestamp": time.time(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "results": results,
+        }
+        _root.destroy()
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if out:
+        with open(out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Correctness check for the doctor search on a large synthetic catalog.
+
+For exact and typo'd queries, under every sort order, walks all result pages
+of DoctorDirectory.query and checks that each result really matches and that
+count() agrees with a brute-force scan. Exits non-zero on any mismatch.
+
+    python benchmarks/check_doctor_search.py --doctors 50000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from doctor_directory import SORT_KEYS, DoctorDirectory   # noqa: E402
+from trigram_index import tokenize                         # noqa: E402
+
+SPECIALTIES = ["Cardiologist", "Dermatologist", "Neurologist", "General Physician", "Orthopedic",
+               "ENT", "Pediatrician", "Gynecologist", "Psychiatrist", "Oncologist"]
+FIRST = ["Arjun", "Meera", "Rajesh", "Sneha", "Kavin", "Aditi", "Manoj", "Priya", "Harish", "Suresh"]
+LAST = ["Kumar", "Sen", "Patel", "Varma", "Rao", "Shah", "Iyer", "Menon", "Nair", "Babu"]
+
+# query -> the word every result must contain (a typo'd query names its intended word)
+QUERIES = {
+    "neurologist": "neurologist",
+    "cardiologist": "cardiologist",
+    "oncologist": "oncologist",
+    "kumar": "kumar",
+    "neuro": "neuro",
+    "kardiologist": "cardiologist",
+    "neurlogist": "neurologist",
+    "dermatolgist": "dermatologist",
+}
+
+
+def make_doctors(n, rng):
+    return [{"id": i + 1, "name": f"Dr. {rng.choice(FIRST)} {rng.choice(LAST)}",
+             "special": rng.choice(SPECIALTIES), "fee": rng.choice([0, 500, 900, 1400]),
+             "phone": "+910000000000", "rating": round(rng.uniform(3, 5), 1)} for i in range(n)]
+
+
+def matches(doctor, word):
+    return any(t.startswith(word) for t in tokenize(f"{doctor['name']} {doctor['special']}"))
+
+
+def check(directory, doctors, limit):
+    failures = []
+    for query, word in QUERIES.items():
+        expected = sum(matches(d, word) for d in doctors)
+        count = directory.count(query)
+        if count != expected:
+            failures.append(f"{query!r}: count {count}, expected {expected}")
+        for sort in SORT_KEYS:
+            seen = 0
+            wrong = 0
+            cursor = 0
+            while cursor is not None:
+                page, cursor = directory.query(text=query, sort=sort, cursor=cursor, limit=limit)
+                seen += len(page)
+                wrong += sum(not matches(d, word) for d in page)
+            if wrong or seen != expected:
+                failures.append(f"{query!r} sort={sort}: {seen} results, {wrong} not matching {word!r}, "
+                                f"expected {expected}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--doctors", type=int, default=50000)
+    parser.add_argument("--limit", type=int, default=50, help="page size")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    doctors = make_doctors(args.doctors, random.Random(args.seed))
+    started = time.perf_counter()
+    directory = DoctorDirectory(doctors)
+    print(f"Indexed {len(doctors)} doctors in {time.perf_counter() - started:.2f}s")
+
+    failures = check(directory, doctors, args.limit)
+    for f in failures:
+        print("FAIL", f)
+    print(f"{len(QUERIES) * len(SORT_KEYS)} query/sort combinations, {len(failures)} failures")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
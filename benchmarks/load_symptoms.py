@@ -0,0 +1,196 @@
+"""
+Offline throughput test for the symptom-analysis pipeline.
+
+Drives multi-turn conversations from a small symptom corpus through
+symptom_pipeline.SymptomPipeline at a target concurrency, against the
+local stub model (started in-process unless --backend points elsewhere),
+and reports throughput, latency percentiles, how the prompt grows with
+each turn of a conversation, and how often the instant local triage agreed
+with the model's final risk level.
+
+    python benchmarks/load_symptoms.py --conversations 200 --concurrency 32 \
+        --latency 0.2 --token-rate 200 --out load_symptoms.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import triage                                                      # noqa: E402
+from stub_model import StubModelServer                             # noqa: E402
+from symptom_pipeline import (Conversation, HTTPBackend, SymptomPipeline,  # noqa: E402
+                              get_risk_level, make_backend)
+
+# Each case is an opening message followed by the answers to the model's questions
+CORPUS = [
+    ["I have a headache", "since yesterday, about 6 out of 10, worse in bright light",
+     "no fever, slight nausea"],
+    ["chest pain", "started an hour ago, pressure spreading to my left arm",
+     "short of breath and sweating"],
+    ["fever and cough", "three days, 101F at night", "mild sore throat, no breathing trouble"],
+    ["my stomach hurts", "lower right side since this morning", "vomited twice, fever 100F"],
+    ["rash on my arms", "appeared after gardening", "itchy, no swelling of the face"],
+    ["feeling dizzy", "when I stand up quickly", "I have not eaten much today"],
+    ["back pain", "after lifting boxes", "no numbness in the legs"],
+    ["sore throat", "two days", "painful swallowing, no fever"],
+    ["my child has diarrhea", "since last night, 5 times", "drinking water but tired"],
+    ["sudden numb face and slurred speech", "started 20 minutes ago", "my left hand feels weak too"],
+    ["I twisted my ankle", "while running this evening", "swelling but I can walk"],
+    ["runny nose and sneezing", "a week now", "no fever, mild cough"],
+]
+
+
+def percentile(samples, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not samples:
+        return None
+    return samples[max(0, math.ceil(p / 100 * len(samples)) - 1)]
+
+
+async def run_load(pipe, conversations, turns, concurrency, rng):
+    cases = [rng.choice(CORPUS) for _ in range(conversations)]
+    queue = asyncio.Queue()
+    for i, case in enumerate(cases):
+        queue.put_nowait((i, case))
+
+    samples = []                # (turn, latency_ms, prompt_chars, error)
+    verdicts = []               # (triage_us, provisional level, model level or None)
+
+    async def worker():
+        while True:
+            try:
+                i, case = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            conv = Conversation(user=f"load-user-{i}")
+            for turn in range(turns):
+                symptoms = case[turn % len(case)]
+                t0 = time.perf_counter()
+                said = " ".join(msg for who, msg in conv.history if who == "User")
+                provisional = triage.classify(f"{said} {symptoms}").level
+                triage_us = (time.perf_counter() - t0) * 1e6
+                result = await pipe.analyze(conv, symptoms)
+                samples.append((turn + 1, result.total_ms, result.prompt_chars, result.error))
+                # only a finished report carries the model's risk level
+                confirmed = None if result.error or "disclaimer" not in result.pretty.lower() \
+                    else get_risk_level(result.pretty)
+                verdicts.append((triage_us, provisional, confirmed))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples, verdicts, time.perf_counter() - started
+
+
+def summarize(samples, verdicts, elapsed):
+    latencies = sorted(ms for _, ms, _, _ in samples)
+    by_turn = {}
+    for turn, _, chars, _ in samples:
+        by_turn.setdefault(turn, []).append(chars)
+    first = statistics.mean(by_turn[1]) if 1 in by_turn else None
+    reports = [(p, c) for _, p, c in verdicts if c is not None]
+    prompt_growth = []
+    for turn in sorted(by_turn):
+        mean = statistics.mean(by_turn[turn])
+        prompt_growth.append({
+            "turn": turn,
+            "requests": len(by_turn[turn]),
+            "mean_chars": round(mean, 1),
+            "max_chars": max(by_turn[turn]),
+            "vs_first": round(mean / first, 2) if first else None,
+        })
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for *_, error in samples if error),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "mean": round(statistics.mean(latencies), 2) if latencies else None,
+            "p50": round(percentile(latencies, 50), 2) if latencies else None,
+            "p90": round(percentile(latencies, 90), 2) if latencies else None,
+            "p99": round(percentile(latencies, 99), 2) if latencies else None,
+            "max": round(latencies[-1], 2) if latencies else None,
+        },
+        "prompt_growth": prompt_growth,
+        "triage": {
+            "mean_us": round(statistics.mean(us for us, _, _ in verdicts), 1) if verdicts else None,
+            "reports": len(reports),
+            "agreement": round(sum(p == c for p, c in reports) / len(reports), 3) if reports else None,
+        },
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "-C", ROOT, "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=3, help="messages per conversation")
+    parser.add_argument("--concurrency", type=int, default=16, help="conversations in flight at once")
+    parser.add_argument("--backend", help="model backend URL (default: in-process stub model)")
+    parser.add_argument("--latency", type=float, default=0.2, help="stub: seconds per answer")
+    parser.add_argument("--token-rate", type=float, default=0.0, help="stub: words per second (0 = instant)")
+    parser.add_argument("--ask-turns", type=int, default=1, help="stub: follow-up questions before a report")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request model timeout (s)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    stub = None
+    if args.backend:
+        backend = make_backend(args.backend)
+    else:
+        stub = StubModelServer(latency=args.latency, token_rate=args.token_rate, ask_turns=args.ask_turns)
+        stub.start()
+        backend = HTTPBackend(stub.url)
+
+    try:
+        pipe = SymptomPipeline(backend, timeout=args.timeout)
+        samples, verdicts, elapsed = asyncio.run(run_load(pipe, args.conversations, args.turns,
+                                                          args.concurrency, random.Random(args.seed)))
+    finally:
+        if stub is not None:
+            stub.stop()
+
+    report = {
+        "suite": "symptoms",
+        "timestamp": time.time(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "backend": args.backend or "stub",
+            "conversations": args.conversations,
+            "turns": args.turns,
+            "concurrency": args.concurrency,
+            "stub": None if args.backend else {"latency": args.latency, "token_rate": args.token_rate,
+                                               "ask_turns": args.ask_turns},
+        },
+        "results": summarize(samples, verdicts, elapsed),
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Per-user chat history, stored as individually encrypted segments.
+
+Each user gets a directory under HISTORY_DIR with two append-only files:
+
+    segments.dat   one Fernet token per line; each decrypts to a JSON list of
+                   [who, text, ts] messages (one segment per exchange)
+    segments.idx   one fixed-size record per segment: offset and length in
+                   segments.dat, message count, first and last timestamp
+
+Appending encrypts only the new messages and writes one line and one index
+record. A page is loaded by reading index records backwards from the end
+until it holds enough messages and decrypting just those segments, so the
+cost follows the page size rather than the length of the history.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import threading
+
+HISTORY_DIR = "chat_history"
+PAGE_MESSAGES = 30
+INDEX_BLOCK = 64                # index records read per seek when paging back
+
+_RECORD = struct.Struct("<QIIdd")     # offset, length, messages, first_ts, last_ts
+
+
+class ChatStore:
+    def __init__(self, fernet, user, root=HISTORY_DIR):
+        self.fernet = fernet
+        # hashed so any username is a safe directory name and names aren't on disk
+        self.dir = os.path.join(root, hashlib.sha256(user.encode()).hexdigest()[:32])
+        self.data_path = os.path.join(self.dir, "segments.dat")
+        self.index_path = os.path.join(self.dir, "segments.idx")
+        self._lock = threading.Lock()
+        self._segments = None       # known after _recover()
+        self._end = 0               # end of the last indexed segment in segments.dat
+
+    def _recover(self):
+        """Drop a torn tail left by a crash mid-append (runs once, O(1) normally)."""
+        if self._segments is not None:
+            return
+        os.makedirs(self.dir, exist_ok=True)
+        data_size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        n = 0
+        end = 0
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r+b") as f:
+                n = os.path.getsize(self.index_path) // _RECORD.size
+                while n:
+                    f.seek((n - 1) * _RECORD.size)
+                    offset, length, *_ = _RECORD.unpack(f.read(_RECORD.size))
+                    if offset + length + 1 <= data_size:
+                        end = offset + length + 1
+                        break
+                    n -= 1          # the index got ahead of the data
+                f.truncate(n * _RECORD.size)
+        if data_size > end:
+            with open(self.data_path, "r+b") as f:
+                f.truncate(end)     # data written but never indexed
+        self._segments = n
+        self._end = end
+
+    def __len__(self):
+        with self._lock:
+            self._recover()
+            return self._segments
+
+    def append(self, messages):
+        """Store [(who, text, ts), ...] as one new segment."""
+        if not messages:
+            return
+        token = self.fernet.encrypt(json.dumps([list(m) for m in messages]).encode())
+        with self._lock:
+            self._recover()
+            # data first, then the index record that makes it visible
+            with open(self.data_path, "ab") as f:
+                f.write(token + b"\n")
+            with open(self.index_path, "ab") as f:
+                f.write(_RECORD.pack(self._end, len(token), len(messages), messages[0][2], messages[-1][2]))
+            self._end += len(token) + 1
+            self._segments += 1
+
+    def load_page(self, before=None, limit=PAGE_MESSAGES):
+        """
+        (messages, cursor): the newest whole segments before segment `before`
+        (default: the end) holding at least `limit` messages, oldest first.
+        Pass `cursor` back as `before` for the page before that; it is None
+        once the start of the history is reached.
+        """
+        with self._lock:
+            self._recover()
+            stop = self._segments if before is None else min(before, self._segments)
+        if stop <= 0:
+            return [], None
+
+        records = []                # newest first
+        total = 0
+        i = stop
+        with open(self.index_path, "rb") as f:
+            while i > 0 and total < limit:
+                start = max(0, i - INDEX_BLOCK)
+                f.seek(start * _RECORD.size)
+                block = f.read((i - start) * _RECORD.size)
+                for k in range(i - start - 1, -1, -1):
+                    rec = _RECORD.unpack_from(block, k * _RECORD.size)
+                    records.append(rec)
+                    total += rec[2]
+                    i -= 1
+                    if total >= limit:
+                        break
+
+        messages = []
+        with open(self.data_path, "rb") as f:
+            for offset, length, *_ in reversed(records):
+                f.seek(offset)
+                try:
+                    messages.extend(tuple(m) for m in json.loads(self.fernet.decrypt(f.read(length))))
+                except Exception as e:
+                    print("Skipping unreadable chat history segment:", e)
+        return messages, (i if i > 0 else None)
@@ -0,0 +1,262 @@
+"""
+Doctor directory backend for the Contact Doctors window.
+
+Doctors are loaded once (JSON, CSV or SQLite) into a flat list. Every sort
+order is precomputed as a permutation array and every facet (Free/Paid,
+specialty) as a bitset, so a query only walks the chosen permutation until
+it has filled one page instead of filtering and sorting the whole catalog.
+Text search goes through a trigram index (see trigram_index.py), so small
+typos like "kardiologist" still find cardiologists.
+"""
+
+import csv
+import json
+import os
+import sqlite3
+from array import array
+
+from trigram_index import TrigramIndex, tokenize
+
+DOCTORS_FILE = "doctors.json"
+PAGE_SIZE = 50
+
+# Used when no doctors file is present
+DEFAULT_DOCTORS = [
+    {"id": 1, "name": "Dr. Arjun Kumar", "special": "Cardiologist", "fee": 1200, "phone": "+911234567890", "rating": 4.6},
+    {"id": 2, "name": "Dr. Meera Sen", "special": "Dermatologist", "fee": 0, "phone": "+919876543210", "rating": 4.1},
+    {"id": 3, "name": "Dr. Rajesh Patel", "special": "Neurologist", "fee": 1500, "phone": "+919001112233", "rating": 4.8},
+    {"id": 4, "name": "Dr. Sneha Varma", "special": "General Physician", "fee": 0, "phone": "+918765432100", "rating": 3.9},
+    {"id": 5, "name": "Dr. Kavin Rao", "special": "Orthopedic", "fee": 900, "phone": "+919112223344", "rating": 4.3},
+    {"id": 6, "name": "Dr. Aditi Shah", "special": "ENT", "fee": 700, "phone": "+919223344556", "rating": 4.0},
+    {"id": 7, "name": "Dr. Manoj Iyer", "special": "Pediatrician", "fee": 0, "phone": "+919334455667", "rating": 4.4},
+    {"id": 8, "name": "Dr. Priya Menon", "special": "Gynecologist", "fee": 1300, "phone": "+919445566778", "rating": 4.7},
+    {"id": 9, "name": "Dr. Harish Nair", "special": "General Physician", "fee": 0, "phone": "+919556677889", "rating": 3.8},
+    {"id": 10, "name": "Dr. Suresh Babu", "special": "Cardiologist", "fee": 1400, "phone": "+919667788990", "rating": 4.5}
+]
+
+SORT_KEYS = ("default", "rating", "fee", "special")
+PAYMENT_FACETS = ("All", "Free", "Paid")
+
+
+# -----------------------
+# Loading
+# -----------------------
+def _normalize(row):
+    return {
+        "id": int(row["id"]),
+        "name": str(row.get("name") or ""),
+        "special": str(row.get("special") or ""),
+        "fee": int(float(row.get("fee") or 0)),
+        "phone": str(row.get("phone") or ""),
+        "rating": float(row.get("rating") or 0),
+    }
+
+
+def load_doctors(path):
+    """Read doctors from a .json, .csv or SQLite (.db/.sqlite) file."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".json":
+        with open(path, encoding="utf-8") as f:
+            rows = json.load(f)
+    elif ext == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+    elif ext in (".db", ".sqlite", ".sqlite3"):
+        con = sqlite3.connect(path)
+        try:
+            con.row_factory = sqlite3.Row
+            rows = [dict(r) for r in con.execute("SELECT id, name, special, fee, phone, rating FROM doctors")]
+        finally:
+            con.close()
+    else:
+        raise ValueError(f"Unsupported doctors file: {path}")
+    return [_normalize(r) for r in rows]
+
+
+# -----------------------
+# Bitset helpers (facets are Python ints, one bit per row)
+# -----------------------
+def _bits_from_rows(rows, n):
+    # Set bits in a bytearray first; OR-ing into a growing int is quadratic
+    buf = bytearray((n + 7) // 8 or 1)
+    for r in rows:
+        buf[r >> 3] |= 1 << (r & 7)
+    return int.from_bytes(buf, "little")
+
+
+def _lookup_table(mask, n):
+    """Bytes view of a mask so a single row can be tested in O(1)."""
+    return mask.to_bytes((n + 7) // 8 or 1, "little")
+
+
+def _has(table, row):
+    return table[row >> 3] >> (row & 7) & 1
+
+
+class DoctorDirectory:
+    def __init__(self, doctors):
+        self.doctors = list(doctors)
+        n = len(self.doctors)
+        self._n = n
+        self._row_by_id = {d["id"]: i for i, d in enumerate(self.doctors)}
+
+        # Precomputed sort orders (stable, so ties keep catalog order)
+        rows = range(n)
+        docs = self.doctors
+        self._orders = {
+            "default": array("I", rows),
+            "rating": array("I", sorted(rows, key=lambda i: -docs[i].get("rating", 0))),
+            "fee": array("I", sorted(rows, key=lambda i: docs[i].get("fee", 0))),
+            "special": array("I", sorted(rows, key=lambda i: docs[i].get("special", "").lower())),
+        }
+
+        # Facet bitsets
+        self._all = (1 << n) - 1
+        free = _bits_from_rows((i for i, d in enumerate(docs) if d["fee"] == 0), n)
+        self._payment = {"All": self._all, "Free": free, "Paid": self._all & ~free}
+
+        by_special = {}
+        for i, d in enumerate(docs):
+            by_special.setdefault(d["special"], []).append(i)
+        self._specialty = {k: _bits_from_rows(v, n) for k, v in by_special.items()}
+
+        # Typo-tolerant word index over names and specialties
+        self._index = TrigramIndex(n)
+        for i, d in enumerate(docs):
+            self._index.add(i, f"{d['name']} {d['special']}")
+        self._search_cache = {}
+        self._table_cache = {}
+
+    def __len__(self):
+        return self._n
+
+    def specialties(self):
+        return sorted(self._specialty, key=str.lower)
+
+    def get(self, doctor_id):
+        row = self._row_by_id.get(doctor_id)
+        return None if row is None else self.doctors[row]
+
+    # ---------------------------------
+    # Text search
+    # ---------------------------------
+    def _search(self, q):
+        """Cached (mask, ranked rows) for a query; ranked rows fill lazily."""
+        hit = self._search_cache.get(q)
+        if hit is None:
+            mask, ranked_terms = self._index.search(q)
+            if mask is None:
+                mask = self._all
+            hit = {"mask": mask, "rows": [], "gen": self._ranked_rows(ranked_terms)}
+            if len(self._search_cache) > 64:
+                self._search_cache.clear()
+            self._search_cache[q] = hit
+        return hit
+
+    def _ranked_rows(self, ranked_terms):
+        # Best-scoring terms first; rows of one term keep catalog order
+        seen = set()
+        for _score, tid in ranked_terms:
+            for r in self._index.term_rows(tid):
+                if r not in seen:
+                    seen.add(r)
+                    yield r
+
+    def _relevance_order(self, hit, upto):
+        rows = hit["rows"]
+        gen = hit["gen"]
+        while len(rows) < upto:
+            r = next(gen, None)
+            if r is None:
+                break
+            rows.append(r)
+        return rows
+
+    # ---------------------------------
+    # Query
+    # ---------------------------------
+    @staticmethod
+    def _query_text(text):
+        # text with no searchable words ("!!", "-") is no text query at all
+        q = (text or "").lower().strip()
+        return q if tokenize(q) else ""
+
+    def filter_mask(self, text="", payment="All", specialty=None):
+        mask = self._payment.get(payment, self._all)
+        if specialty:
+            mask &= self._specialty.get(specialty, 0)
+        q = self._query_text(text)
+        if q:
+            mask &= self._search(q)["mask"]
+        return mask
+
+    def _table_for(self, mask):
+        table = self._table_cache.get(mask)
+        if table is None:
+            if len(self._table_cache) > 32:
+                self._table_cache.clear()
+            table = self._table_cache[mask] = _lookup_table(mask, self._n)
+        return table
+
+    def count(self, text="", payment="All", specialty=None):
+        return self.filter_mask(text, payment, specialty).bit_count()
+
+    def query(self, text="", payment="All", sort="default", specialty=None, cursor=0, limit=PAGE_SIZE):
+        """
+        Return (doctors, next_cursor). `cursor` is a position in the sort
+        permutation; pass the returned one back to fetch the next page.
+        next_cursor is None when there are no more matches.
+
+        With search text and the default sort, results are ranked by match
+        quality (exact, then prefix, then fuzzy).
+        """
+        mask = self.filter_mask(text, payment, specialty)
+        q = self._query_text(text)
+        if q and sort == "default":
+            hit = self._search(q)
+            order = self._relevance_order(hit, cursor + limit)
+            table = self._table_for(mask)
+            page = []
+            pos = cursor
+            while len(page) < limit:
+                if pos >= len(order):
+                    order = self._relevance_order(hit, pos + limit)
+                    if pos >= len(order):
+                        break
+                r = order[pos]
+                if _has(table, r):
+                    page.append(self.doctors[r])
+                pos += 1
+            return page, (pos if len(page) == limit else None)
+
+        order = self._orders.get(sort, self._orders["default"])
+        if mask == self._all:
+            end = min(cursor + limit, self._n)
+            page = [self.doctors[r] for r in order[cursor:end]]
+            return page, (end if end < self._n else None)
+
+        table = self._table_for(mask)
+        page = []
+        pos = cursor
+        n = self._n
+        while pos < n and len(page) < limit:
+            r = order[pos]
+            if _has(table, r):
+                page.append(self.doctors[r])
+            pos += 1
+        # A full page may be followed by an empty one; that is cheaper than
+        # scanning ahead through a sparse facet to find out.
+        more = len(page) == limit and pos < n
+        return page, (pos if more else None)
+
+
+_directory = None
+
+
+def get_directory(path=DOCTORS_FILE):
+    """Load the shared directory once; falls back to the bundled doctors."""
+    global _directory
+    if _directory is None:
+        doctors = load_doctors(path) if path and os.path.exists(path) else [dict(d) for d in DEFAULT_DOCTORS]
+        _directory = DoctorDirectory(doctors)
+    return _directory
@@ -0,0 +1,252 @@
+"""
+Hospital data from OpenStreetMap (Overpass), with no GUI dependencies.
+
+Fetching, address normalisation and opening-hours evaluation live here so
+the desktop window (hospital_finder.py), the SOS snapshot and the headless
+service (service.py) all share one implementation. Searches are answered
+from the geohash tile cache in hospital_tiles.py, which only asks Overpass
+for tiles it has not seen recently.
+"""
+
+import requests
+import datetime
+import re
+from functools import lru_cache
+from math import radians, cos, sin, asin, sqrt
+import metrics
+import road_graph
+from async_bridge import run_blocking
+from hospital_tiles import TileStore
+
+COIMBATORE_COORD = (11.100824, 77.026695) 
+SEARCH_RADIUS_METERS = 7000       
+OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+OSM_TIMEOUT = 180               
+FETCH_TIMEOUT = OSM_TIMEOUT + 10   # whole fetch, including parsing
+
+def haversine(lat1, lon1, lat2, lon2):
+    # returns distance in km
+    R = 6371.0
+    dlat = radians(lat2 - lat1)
+    dlon = radians(lon2 - lon1)
+    a = sin(dlat/2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon/2)**2
+    c = 2 * asin(sqrt(a))
+    return R * c
+
+def _overpass(area):
+    # Query for hospitals and clinics (nodes/ways/relations) within `area`
+    query = f"""
+    [out:json][timeout:{OSM_TIMEOUT}];
+    (
+      node["amenity"~"hospital|clinic"]{area};
+      way["amenity"~"hospital|clinic"]{area};
+      relation["amenity"~"hospital|clinic"]{area};
+      node["healthcare"="hospital"]{area};
+      way["healthcare"="hospital"]{area};
+      relation["healthcare"="hospital"]{area};
+    );
+    out center tags;
+    """
+    resp = requests.post(OVERPASS_URL, data={"data": query}, timeout=OSM_TIMEOUT)
+    resp.raise_for_status()
+    return resp.json()
+
+@metrics.timed("hospitals.overpass_query")
+def overpass_query(lat, lon, radius):
+    return _overpass(f"(around:{radius},{lat},{lon})")
+
+@metrics.timed("hospitals.overpass_query")
+def overpass_bbox_query(south, west, north, east):
+    return _overpass(f"({south:.6f},{west:.6f},{north:.6f},{east:.6f})")
+
+def normalize_address(tags):
+    parts = []
+    for k in ("addr:full", "addr:street", "addr:housenumber", "addr:city", "addr:postcode", "addr:state"):
+        v = tags.get(k)
+        if v and v not in parts:
+            parts.append(v)
+    # fallback to "street" or "place" tag
+    if not parts:
+        for k in ("street", "place", "name", "operator"):
+            v = tags.get(k)
+            if v:
+                parts.append(v)
+                break
+    return ", ".join(parts) if parts else "Address not available"
+
+WEEKDAY_MAP = {
+    "Mo": 0, "Tu": 1, "We": 2, "Th": 3, "Fr": 4, "Sa": 5, "Su": 6
+}
+
+def parse_time_hhmm(s):
+    # "HH:MM" -> (hour, minute)
+    try:
+        h, m = s.split(":")
+        return int(h), int(m)
+    except Exception:
+        return None
+
+def time_in_range(start, end, now):
+    # start,end are (h,m); handles overnight ranges (e.g., 22:00-06:00)
+    s_minutes = start[0]*60 + start[1]
+    e_minutes = end[0]*60 + end[1]
+    n_minutes = now.hour*60 + now.minute
+    if s_minutes <= e_minutes:
+        return s_minutes <= n_minutes < e_minutes
+    else:
+        # overnight
+        return n_minutes >= s_minutes or n_minutes < e_minutes
+
+class CompiledHours:
+    """
+    An opening_hours string parsed once into (weekday mask, start, end) rules,
+    so checking it against a time needs no regex or string work.
+    """
+
+    __slots__ = ("always_open", "rules")
+
+    def __init__(self, always_open=False, rules=()):
+        self.always_open = always_open
+        self.rules = tuple(rules)   # (weekday bitmask or None, start_min, end_min)
+
+    def is_open(self, now):
+        if self.always_open:
+            return True
+        wd_bit = 1 << now.weekday()
+        n_minutes = now.hour*60 + now.minute
+        for days, s_minutes, e_minutes in self.rules:
+            if days is not None and not days & wd_bit:
+                # rule doesn't apply for today
+                continue
+            # first rule that applies today decides
+            if s_minutes <= e_minutes:
+                return s_minutes <= n_minutes < e_minutes
+            # overnight
+            return n_minutes >= s_minutes or n_minutes < e_minutes
+        return None  # no rule matched or unknown
+
+def _parse_days(days_part):
+    # support comma separated or hyphen range: Mo,Tu or Mo-Fr -> weekday bitmask
+    mask = 0
+    for seg in days_part.split(","):
+        seg = seg.strip()
+        if "-" in seg:
+            bounds = [x.strip() for x in seg.split("-")]
+            if len(bounds) != 2 or bounds[0] not in WEEKDAY_MAP or bounds[1] not in WEEKDAY_MAP:
+                continue
+            a_idx, b_idx = WEEKDAY_MAP[bounds[0]], WEEKDAY_MAP[bounds[1]]
+            d = a_idx
+            while True:   # wraps around (e.g., Fr-Mo)
+                mask |= 1 << d
+                if d == b_idx:
+                    break
+                d = (d + 1) % 7
+        elif seg in WEEKDAY_MAP:
+            mask |= 1 << WEEKDAY_MAP[seg]
+    return mask
+
+_RULE_RE = re.compile(r"(?:(?P<days>[A-Za-z0-9,\- ]+)\s+)?(?P<times>\d{1,2}:\d{2}\s*-\s*\d{1,2}:\d{2})")
+
+@lru_cache(maxsize=4096)
+def compile_opening_hours(opening_hours_str):
+    if not opening_hours_str:
+        return None
+    s = opening_hours_str.strip()
+    s = s.replace("−", "-")  # different hyphen chars
+    s = s.replace("–", "-")
+    s = s.replace(" ", " ")
+    s = s.strip()
+    lower = s.lower()
+    if "24/7" in lower or "24h" in lower or "open 24" in lower:
+        return CompiledHours(always_open=True)
+
+    # split on ';' for multiple rules; they are evaluated in order
+    rules = []
+    for rule in (r.strip() for r in s.split(";")):
+        # e.g. "Mo-Fr 09:00-18:00" or "09:00-21:00" or "Mo-Su 10:00-22:00"
+        m = _RULE_RE.match(rule)
+        if not m:
+            # cannot parse rule -> skip
+            continue
+        start_s, end_s = [t.strip() for t in m.group("times").split("-")]
+        start = parse_time_hhmm(start_s)
+        end = parse_time_hhmm(end_s)
+        if not (start and end):
+            continue
+        days_part = m.group("days")
+        days = _parse_days(days_part.strip()) if days_part else None
+        rules.append((days, start[0]*60 + start[1], end[0]*60 + end[1]))
+    return CompiledHours(rules=rules)
+
+def check_open_now(opening_hours_str, tz):
+    compiled = compile_opening_hours(opening_hours_str)
+    if compiled is None:
+        return None
+    return compiled.is_open(datetime.datetime.now(tz))
+
+
+def parse_elements(j):
+    items = []
+    for el in j.get("elements", []):
+        tags = el.get("tags", {})
+        name = tags.get("name") or tags.get("operator") or "Unnamed Hospital/Clinic"
+        # get coordinates: nodes have lat/lon, ways/relations have center
+        if el.get("type") == "node":
+            lat = el.get("lat")
+            lon = el.get("lon")
+        else:
+            center = el.get("center") or el.get("bounds")
+            if not isinstance(center, dict):
+                continue            # can't be placed on the map
+            lat = center.get("lat") or center.get("minlat")
+            lon = center.get("lon") or center.get("minlon")
+        address = normalize_address(tags)
+        oh = tags.get("opening_hours")
+        items.append({
+            "name": name,
+            "address": address,
+            "lat": lat,
+            "lon": lon,
+            "tags": tags,
+            "opening_hours": oh
+        })
+    return items
+
+def fetch_hospitals_bbox(south, west, north, east):
+    return parse_elements(overpass_bbox_query(south, west, north, east))
+
+tile_store = TileStore(fetch_hospitals_bbox)
+
+@metrics.timed("hospitals.fetch")
+def fetch_hospitals(lat=COIMBATORE_COORD[0], lon=COIMBATORE_COORD[1], radius=SEARCH_RADIUS_METERS, max_age=None):
+    # max_age: refetch tiles older than this many seconds (default: the tile TTL)
+    # bounding box of the search circle, then the exact circle from the covering tiles
+    dlat = radius / 111320.0
+    dlon = radius / (111320.0 * max(cos(radians(lat)), 0.01))
+    candidates = tile_store.items_in_bbox(lat - dlat, lon - dlon, lat + dlat, lon + dlon, max_age)
+    radius_km = radius / 1000.0
+    # deduplicate by (name, lat, lon); copies, so callers can annotate freely
+    uniq = {}
+    for it in candidates:
+        try:
+            it_lat, it_lon = float(it["lat"]), float(it["lon"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if haversine(lat, lon, it_lat, it_lon) > radius_km:
+            continue
+        key = (it["name"], round(it_lat, 5), round(it_lon, 5))
+        if key not in uniq:
+            uniq[key] = dict(it)
+    return list(uniq.values())
+
+async def fetch_hospitals_async(lat=COIMBATORE_COORD[0], lon=COIMBATORE_COORD[1], radius=SEARCH_RADIUS_METERS,
+                                max_age=None):
+    # requests is blocking, so the HTTP call runs on a daemon thread;
+    # cancelling abandons it (and its socket) instead of waiting for it
+    return await run_blocking(fetch_hospitals, lat, lon, radius, max_age)
+
+async def fetch_hospitals_ranked(origin=COIMBATORE_COORD, radius=SEARCH_RADIUS_METERS, max_age=None):
+    items = await fetch_hospitals_async(origin[0], origin[1], radius, max_age)
+    # drive times from the offline road graph, when there is one
+    await run_blocking(road_graph.annotate_drive_times, origin, items)
+    return items
@@ -5,210 +5,24 @@ Features:
 - Filter: All / Open now / Closed / Unknown
 - Scrollable list with name, address, opening_hours, status
 - Open in Google Maps button
+- Ranked by estimated drive time when a local road graph is available (road_graph.py)
 """
 
 import customtkinter as ctk
-import requests
 import webbrowser
-import datetime
-import re
 import pytz
-from math import radians, cos, sin, asin, sqrt
+import metrics
+from async_bridge import bridge
+from hospital_data import (
+    COIMBATORE_COORD, SEARCH_RADIUS_METERS, FETCH_TIMEOUT,
+    haversine, check_open_now, fetch_hospitals_ranked,
+)
 
-COIMBATORE_COORD = (11.100824, 77.026695) 
-SEARCH_RADIUS_METERS = 7000       
-OVERPASS_URL = "https://overpass-api.de/api/interpreter"
-OSM_TIMEOUT = 180               
+REFRESH_MAX_AGE = 60      # seconds; the Refresh button refetches map tiles older than this
 
 ctk.set_appearance_mode("System")
 ctk.set_default_color_theme("blue")
 
-def haversine(lat1, lon1, lat2, lon2):
-    # returns distance in km
-    R = 6371.0
-    dlat = radians(lat2 - lat1)
-    dlon = radians(lon2 - lon1)
-    a = sin(dlat/2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a))
-    return R * c
-
-def overpass_query(lat, lon, radius):
-    # Query for hospitals and clinics (nodes/ways/relations)
-    query = f"""
-    [out:json][timeout:{OSM_TIMEOUT}];
-    (
-      node["amenity"~"hospital|clinic"](around:{radius},{lat},{lon});
-      way["amenity"~"hospital|clinic"](around:{radius},{lat},{lon});
-      relation["amenity"~"hospital|clinic"](around:{radius},{lat},{lon});
-      node["healthcare"="hospital"](around:{radius},{lat},{lon});
-      way["healthcare"="hospital"](around:{radius},{lat},{lon});
-      relation["healthcare"="hospital"](around:{radius},{lat},{lon});
-    );
-    out center tags;
-    """
-    resp = requests.post(OVERPASS_URL, data={"data": query}, timeout=OSM_TIMEOUT)
-    resp.raise_for_status()
-    return resp.json()
-
-def normalize_address(tags):
-    parts = []
-    for k in ("addr:full", "addr:street", "addr:housenumber", "addr:city", "addr:postcode", "addr:state"):
-        v = tags.get(k)
-        if v and v not in parts:
-            parts.append(v)
-    # fallback to "street" or "place" tag
-    if not parts:
-        for k in ("street", "place", "name", "operator"):
-            v = tags.get(k)
-            if v:
-                parts.append(v)
-                break
-    return ", ".join(parts) if parts else "Address not available"
-
-WEEKDAY_MAP = {
-    "Mo": 0, "Tu": 1, "We": 2, "Th": 3, "Fr": 4, "Sa": 5, "Su": 6
-}
-
-def parse_time_hhmm(s):
-    # "HH:MM" -> (hour, minute)
-    try:
-        h, m = s.split(":")
-        return int(h), int(m)
-    except Exception:
-        return None
-
-def time_in_range(start, end, now):
-    # start,end are (h,m); handles overnight ranges (e.g., 22:00-06:00)
-    s_minutes = start[0]*60 + start[1]
-    e_minutes = end[0]*60 + end[1]
-    n_minutes = now.hour*60 + now.minute
-    if s_minutes <= e_minutes:
-        return s_minutes <= n_minutes < e_minutes
-    else:
-        # overnight
-        return n_minutes >= s_minutes or n_minutes < e_minutes
-
-def check_open_now(opening_hours_str, tz):
-    if not opening_hours_str:
-        return None
-    s = opening_hours_str.strip()
-    s = s.replace("−", "-")  # different hyphen chars
-    s = s.replace("–", "-")
-    s = s.replace(" ", " ")
-    s = s.strip()
-    lower = s.lower()
-    if "24/7" in lower or "24h" in lower or "open 24" in lower:
-        return True
-
-    # split on ';' for multiple rules; evaluate in order and return first match
-    rules = [r.strip() for r in opening_hours_str.split(";") if r.strip()]
-    now = datetime.datetime.now(tz)
-    today_wd = now.weekday()  # 0=Monday .. 6=Sunday
-
-    for rule in rules:
-        # e.g. "Mo-Fr 09:00-18:00" or "09:00-21:00" or "Mo-Su 10:00-22:00"
-        m_day_time = re.match(r"(?:(?P<days>[A-Za-z0-9,\- ]+)\s+)?(?P<times>\d{1,2}:\d{2}\s*-\s*\d{1,2}:\d{2})", rule)
-        if not m_day_time:
-            # try single time range alone
-            m_time = re.match(r"(?P<times>\d{1,2}:\d{2}\s*-\s*\d{1,2}:\d{2})", rule)
-            if m_time:
-                times = m_time.group("times")
-                start_s, end_s = [t.strip() for t in times.split("-")]
-                start = parse_time_hhmm(start_s)
-                end = parse_time_hhmm(end_s)
-                if start and end and time_in_range(start, end, now):
-                    return True
-                else:
-                    # this rule says closed for now (but other rules could match)
-                    continue
-            else:
-                # cannot parse rule -> skip
-                continue
-
-        days_part = m_day_time.group("days")
-        times = m_day_time.group("times")
-        start_s, end_s = [t.strip() for t in times.split("-")]
-        start = parse_time_hhmm(start_s)
-        end = parse_time_hhmm(end_s)
-        if not (start and end):
-            continue
-
-        if days_part:
-            days_part = days_part.strip()
-            # support comma separated or hyphen range: Mo,Tu or Mo-Fr
-            matched = False
-            # expand each comma-separated segment
-            for seg in days_part.split(","):
-                seg = seg.strip()
-                if "-" in seg:
-                    a,b = [x.strip() for x in seg.split("-")]
-                    if a in WEEKDAY_MAP and b in WEEKDAY_MAP:
-                        a_idx = WEEKDAY_MAP[a]
-                        b_idx = WEEKDAY_MAP[b]
-                        if a_idx <= b_idx:
-                            if a_idx <= today_wd <= b_idx:
-                                matched = True
-                                break
-                        else:
-                            # wrap around (e.g., Fr-Mo)
-                            if today_wd >= a_idx or today_wd <= b_idx:
-                                matched = True
-                                break
-                else:
-                    if seg in WEEKDAY_MAP:
-                        if WEEKDAY_MAP[seg] == today_wd:
-                            matched = True
-                            break
-            if not matched:
-                # rule doesn't apply for today
-                continue
-
-        # rule applies for today -> check time range
-        if time_in_range(start, end, now):
-            return True
-        else:
-            return False
-
-    return None  # no rule matched or unknown
-
-
-def fetch_hospitals(lat=COIMBATORE_COORD[0], lon=COIMBATORE_COORD[1], radius=SEARCH_RADIUS_METERS):
-    j = overpass_query(lat, lon, radius)
-    elements = j.get("elements", [])
-    items = []
-    for el in elements:
-        tags = el.get("tags", {})
-        name = tags.get("name") or tags.get("operator") or "Unnamed Hospital/Clinic"
-        # get coordinates: nodes have lat/lon, ways/relations have center
-        if el.get("type") == "node":
-            lat = el.get("lat")
-            lon = el.get("lon")
-        else:
-            center = el.get("center") or el.get("bounds")
-            if isinstance(center, dict):
-                lat = center.get("lat") or center.get("minlat")
-                lon = center.get("lon") or center.get("minlon")
-            else:
-                lat = COIMBATORE_COORD[0]
-                lon = COIMBATORE_COORD[1]
-        address = normalize_address(tags)
-        oh = tags.get("opening_hours")
-        items.append({
-            "name": name,
-            "address": address,
-            "lat": lat,
-            "lon": lon,
-            "tags": tags,
-            "opening_hours": oh
-        })
-    # deduplicate by (name, lat, lon)
-    uniq = {}
-    for it in items:
-        key = (it["name"], round(float(it.get("lat") or 0), 5), round(float(it.get("lon") or 0), 5))
-        if key not in uniq:
-            uniq[key] = it
-    return list(uniq.values())
-
 class HospitalApp(ctk.CTkToplevel):
     def __init__(self):
         super().__init__()
@@ -223,7 +37,7 @@ class HospitalApp(ctk.CTkToplevel):
         lbl = ctk.CTkLabel(top, text="Hospitals & Clinics — Coimbatore", font=ctk.CTkFont(size=22, weight="bold"))
         lbl.grid(row=0, column=0, sticky="w", padx=(10,0))
 
-        btn_refresh = ctk.CTkButton(top, text="Refresh", command=self.refresh)
+        btn_refresh = ctk.CTkButton(top, text="Refresh", command=lambda: self.refresh(max_age=REFRESH_MAX_AGE))
         btn_refresh.grid(row=0, column=2, padx=10)
 
         # Search and filter
@@ -251,6 +65,10 @@ class HospitalApp(ctk.CTkToplevel):
         self.all_items = []
         self.displayed_items = []
 
+        # network results come back through the shared asyncio loop
+        bridge.install(self)
+        self.fetch_job = None
+
         # initial load
         self.refresh()
 
@@ -258,11 +76,27 @@ class HospitalApp(ctk.CTkToplevel):
         for child in self.results_frame.winfo_children():
             child.destroy()
 
-    def refresh(self):
+    @metrics.timed("hospitals.refresh")
+    def refresh(self, max_age=None):
+        """Load hospitals; max_age refetches cached map tiles older than that (seconds)."""
         self.count_lbl.configure(text="Fetching hospitals from OpenStreetMap...")
         self.clear_results()
+        if self.fetch_job is not None:
+            self.fetch_job.cancel()
+        self.fetch_job = bridge.submit(fetch_hospitals_ranked(max_age=max_age),
+                                       on_result=self.load_results,
+                                       on_error=self.fetch_failed,
+                                       owner=self,
+                                       timeout=FETCH_TIMEOUT)
+
+    def fetch_failed(self, e):
+        self.fetch_job = None
+        self.count_lbl.configure(text="Failed to fetch data: " + (str(e) or type(e).__name__))
+
+    @metrics.timed("hospitals.load_results")
+    def load_results(self, items):
+        self.fetch_job = None
         try:
-            items = fetch_hospitals()
             # compute distance and open status
             tz = pytz.timezone("Asia/Kolkata")
             for it in items:
@@ -270,14 +104,15 @@ class HospitalApp(ctk.CTkToplevel):
                 lon = float(it.get("lon") or COIMBATORE_COORD[1])
                 it["distance_km"] = haversine(COIMBATORE_COORD[0], COIMBATORE_COORD[1], lat, lon)
                 it["open_now"] = check_open_now(it.get("opening_hours"), tz)
-            # sort by distance
-            items.sort(key=lambda x: x.get("distance_km", 9999))
+            # fastest by road first where drive times are known, then straight-line distance
+            items.sort(key=lambda x: (x.get("drive_min") is None, x.get("drive_min") or 0, x.get("distance_km", 9999)))
             self.all_items = items
             self.count_lbl.configure(text=f"Found {len(items)} results within {SEARCH_RADIUS_METERS/1000:.1f} km")
             self.apply_filters()
         except Exception as e:
             self.count_lbl.configure(text="Failed to fetch data: " + str(e))
 
+    @metrics.timed("hospitals.apply_filters")
     def apply_filters(self):
         q = self.search_var.get().lower().strip()
         filt = self.filter_var.get()
@@ -298,6 +133,7 @@ class HospitalApp(ctk.CTkToplevel):
         self.displayed_items = results
         self.render_results()
 
+    @metrics.timed("hospitals.render_results")
     def render_results(self):
         self.clear_results()
         if not self.displayed_items:
@@ -312,6 +148,9 @@ class HospitalApp(ctk.CTkToplevel):
             title = it.get("name", "Unnamed")
             dist = it.get("distance_km")
             dist_s = f"{dist:.1f} km" if dist is not None else ""
+            drive = it.get("drive_min")
+            if drive is not None:
+                dist_s += f" · ~{max(1, round(drive))} min drive"
             header = ctk.CTkLabel(frame, text=f"{title}    ({dist_s})", font=ctk.CTkFont(size=16, weight="bold"))
             header.pack(anchor="w", padx=10, pady=(8,2))
 
@@ -0,0 +1,168 @@
+"""
+Warm, periodically refreshed snapshot of hospitals for the SOS path.
+
+The snapshot is fetched in the background, kept in memory with every
+hospital's opening hours already compiled, and mirrored to disk so it is
+available immediately after a restart. nearest_open() only does arithmetic
+on that in-memory copy; it never touches the network.
+"""
+
+import datetime
+import heapq
+import json
+import os
+import threading
+import time
+from math import radians, cos, sin, asin, sqrt
+
+import pytz
+
+from async_bridge import bridge, run_blocking
+from hospital_data import COIMBATORE_COORD, FETCH_TIMEOUT, compile_opening_hours, fetch_hospitals
+
+SNAPSHOT_FILE = "hospital_snapshot.json"
+SNAPSHOT_RADIUS_METERS = 15000
+REFRESH_INTERVAL = 30 * 60     # seconds
+RETRY_INTERVAL = 60            # seconds after a failed refresh
+TIMEZONE = "Asia/Kolkata"
+
+
+class HospitalSnapshot:
+    def __init__(self, center=COIMBATORE_COORD, radius=SNAPSHOT_RADIUS_METERS, path=SNAPSHOT_FILE,
+                 fetch=fetch_hospitals, refresh_interval=REFRESH_INTERVAL):
+        self.center = center
+        self.radius = radius
+        self.path = path
+        self.fetch = fetch
+        self.refresh_interval = refresh_interval
+        self.tz = pytz.timezone(TIMEZONE)
+
+        self.fetched_at = 0.0
+        self._entries = []          # (lat_rad, lon_rad, cos_lat, hours, item)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---------------------------------
+    # Loading / refreshing
+    # ---------------------------------
+    def _install(self, items, fetched_at, center):
+        entries = []
+        for it in items:
+            try:
+                lat = float(it["lat"])
+                lon = float(it["lon"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            lat_r = radians(lat)
+            entries.append((lat_r, radians(lon), cos(lat_r), compile_opening_hours(it.get("opening_hours")), it))
+        with self._lock:
+            self._entries = entries
+            self.fetched_at = fetched_at
+            self.center = center
+
+    def load_disk(self):
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self._install(data["items"], data.get("fetched_at", 0.0), tuple(data.get("center", self.center)))
+            return True
+        except (OSError, ValueError, KeyError) as e:
+            print("Hospital snapshot unreadable:", e)
+            return False
+
+    def refresh_now(self):
+        center = self.center
+        # tiles older than one refresh interval are refetched, so the snapshot is really refreshed
+        items = bridge.run_sync(run_blocking(self.fetch, center[0], center[1], self.radius,
+                                                  max_age=self.refresh_interval),
+                                timeout=FETCH_TIMEOUT)
+        now = time.time()
+        self._install(items, now, center)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": now, "center": list(center), "radius": self.radius, "items": items}, f)
+        os.replace(tmp, self.path)
+
+    @property
+    def stale(self):
+        return time.time() - self.fetched_at >= self.refresh_interval
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        if not self._entries:
+            self.load_disk()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="hospital-snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            wait = max(1.0, self.refresh_interval - (time.time() - self.fetched_at))
+            if self.stale:
+                try:
+                    self.refresh_now()
+                    wait = self.refresh_interval
+                except Exception as e:
+                    print("Hospital snapshot refresh failed:", e)
+                    wait = RETRY_INTERVAL
+            self._wake.wait(wait)
+            self._wake.clear()
+
+    def recenter(self, lat, lon):
+        """Refetch around (lat, lon) in the background if it left the covered area."""
+        c_lat, c_lon = self.center
+        if _distance_km(radians(lat), radians(lon), cos(radians(lat)),
+                        radians(c_lat), radians(c_lon), cos(radians(c_lat))) * 1000 > self.radius / 2:
+            self.center = (lat, lon)
+            self.fetched_at = 0.0
+            self._wake.set()
+
+    # ---------------------------------
+    # Query (no network)
+    # ---------------------------------
+    def nearest_open(self, lat, lon, k=3, now=None):
+        """
+        Up to k hospitals nearest to (lat, lon) that are open now. If fewer
+        than k are known to be open, the nearest ones with unknown hours fill
+        the rest; hospitals known to be closed are never returned.
+        """
+        now = now or datetime.datetime.now(self.tz)
+        with self._lock:
+            entries = self._entries
+        lat_r, lon_r = radians(lat), radians(lon)
+        cos_lat = cos(lat_r)
+
+        open_now, unknown = [], []
+        for e_lat, e_lon, e_cos, hours, item in entries:
+            status = hours.is_open(now) if hours is not None else None
+            if status is False:
+                continue
+            d = _distance_km(lat_r, lon_r, cos_lat, e_lat, e_lon, e_cos)
+            (open_now if status else unknown).append((d, status, item))
+
+        best = heapq.nsmallest(k, open_now, key=lambda x: x[0])
+        if len(best) < k:
+            best += heapq.nsmallest(k - len(best), unknown, key=lambda x: x[0])
+        return [
+            {"name": item.get("name"), "lat": item.get("lat"), "lon": item.get("lon"),
+             "distance_km": d, "open_now": status}
+            for d, status, item in best
+        ]
+
+
+def _distance_km(lat1, lon1, cos1, lat2, lon2, cos2):
+    # haversine on pre-converted radians
+    a = sin((lat2 - lat1) / 2)**2 + cos1 * cos2 * sin((lon2 - lon1) / 2)**2
+    return 6371.0 * 2 * asin(sqrt(a))
+
+
+hospital_snapshot = HospitalSnapshot()
@@ -0,0 +1,234 @@
+"""
+Geohash-tiled hospital cache, so a search anywhere is cheap after the first.
+
+The map is cut into geohash cells (precision 5, about 4.9 x 4.9 km at the
+equator). Each tile holds the hospitals located inside it and the time it
+was fetched, and lives in a memory LRU backed by one JSON file per tile
+under TILE_DIR. A bounding-box lookup collects the tiles covering the box;
+only tiles that are missing or older than TILE_TTL go to the network, as
+one bounding-box query per block of neighbouring tiles. Nearby and
+overlapping searches, in any city, reuse what earlier ones fetched.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+TILE_DIR = "hospital_tiles"
+PRECISION = 5
+TILE_TTL = 24 * 3600            # seconds before a tile is refetched
+MEMORY_TILES = 1024             # tiles kept in the in-memory LRU
+FETCH_BLOCK = 8                 # at most FETCH_BLOCK x FETCH_BLOCK tiles per network query
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def cell_size(precision=PRECISION):
+    """(lat degrees, lon degrees, lat bits, lon bits) of one geohash cell."""
+    bits = 5 * precision
+    lon_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits), lat_bits, lon_bits
+
+
+def cell_of(lat, lon, precision=PRECISION):
+    """(row, col) grid index of the cell containing (lat, lon)."""
+    dlat, dlon, lat_bits, lon_bits = cell_size(precision)
+    row = min(max(int((lat + 90.0) / dlat), 0), (1 << lat_bits) - 1)
+    col = min(max(int((lon + 180.0) / dlon), 0), (1 << lon_bits) - 1)
+    return row, col
+
+
+def encode_cell(row, col, precision=PRECISION):
+    """Geohash of grid cell (row, col): the lon/lat index bits interleaved, lon first."""
+    _, _, lat_bits, lon_bits = cell_size(precision)
+    code = 0
+    for i in range(5 * precision):
+        if i % 2 == 0:
+            lon_bits -= 1
+            code = code << 1 | (col >> lon_bits) & 1
+        else:
+            lat_bits -= 1
+            code = code << 1 | (row >> lat_bits) & 1
+    return "".join(_BASE32[(code >> 5 * (precision - 1 - k)) & 31] for k in range(precision))
+
+
+def encode(lat, lon, precision=PRECISION):
+    return encode_cell(*cell_of(lat, lon, precision), precision)
+
+
+def _blocks(cells, size):
+    """Group cells into rectangles of at most size x size, anchored at the first row/col."""
+    row0 = min(r for r, _ in cells)
+    col0 = min(c for _, c in cells)
+    groups = {}
+    for r, c in cells:
+        groups.setdefault(((r - row0) // size, (c - col0) // size), []).append((r, c))
+    for group in groups.values():
+        rows = [r for r, _ in group]
+        cols = [c for _, c in group]
+        yield min(rows), min(cols), max(rows), max(cols)
+
+
+class _Fetch:
+    """One in-flight tile fetch; waiters read `error` once `done` is set."""
+    __slots__ = ("done", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+
+
+class TileStore:
+    def __init__(self, fetch_bbox, path=TILE_DIR, ttl=TILE_TTL, capacity=MEMORY_TILES, precision=PRECISION):
+        """`fetch_bbox(south, west, north, east)` returns items with "lat" and "lon"."""
+        self.fetch_bbox = fetch_bbox
+        self.path = path
+        self.ttl = ttl
+        self.capacity = capacity
+        self.precision = precision
+        self._memory = OrderedDict()    # geohash -> (fetched_at, items)
+        self._inflight = {}             # geohash -> _Fetch, while some thread fetches it
+        self._lock = threading.Lock()
+
+    # ---------------------------------
+    # Memory LRU / disk
+    # ---------------------------------
+    def _file(self, geohash):
+        return os.path.join(self.path, geohash + ".json")
+
+    def _remember(self, geohash, tile):
+        with self._lock:
+            self._memory[geohash] = tile
+            self._memory.move_to_end(geohash)
+            while len(self._memory) > self.capacity:
+                self._memory.popitem(last=False)
+
+    def _get(self, geohash):
+        with self._lock:
+            tile = self._memory.get(geohash)
+            if tile is not None:
+                self._memory.move_to_end(geohash)
+                return tile
+        try:
+            with open(self._file(geohash), encoding="utf-8") as f:
+                data = json.load(f)
+            tile = (data["fetched_at"], data["items"])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            print("Hospital tile unreadable:", geohash, e)
+            return None
+        self._remember(geohash, tile)
+        return tile
+
+    def _put(self, geohash, fetched_at, items):
+        tile = (fetched_at, items)
+        self._remember(geohash, tile)
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            tmp = self._file(geohash) + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"fetched_at": fetched_at, "items": items}, f)
+            os.replace(tmp, self._file(geohash))
+        except OSError as e:
+            print("Hospital tile not saved:", geohash, e)
+        return tile
+
+    # ---------------------------------
+    # Network
+    # ---------------------------------
+    def _fetch_block(self, row0, col0, row1, col1, tiles):
+        """Fetch the rectangle of cells in one query and store every cell in it."""
+        dlat, dlon, _, _ = cell_size(self.precision)
+        items = self.fetch_bbox(row0 * dlat - 90.0, col0 * dlon - 180.0,
+                                (row1 + 1) * dlat - 90.0, (col1 + 1) * dlon - 180.0)
+        buckets = {(r, c): [] for r in range(row0, row1 + 1) for c in range(col0, col1 + 1)}
+        for it in items:
+            try:
+                cell = cell_of(float(it["lat"]), float(it["lon"]), self.precision)
+            except (KeyError, TypeError, ValueError):
+                continue            # nowhere to file it
+            # ways crossing the box edge belong to the tile holding their centre
+            if cell in buckets:
+                buckets[cell].append(it)
+        now = time.time()
+        for cell, bucket in buckets.items():
+            tile = self._put(encode_cell(*cell, self.precision), now, bucket)
+            if cell in tiles:
+                tiles[cell] = tile
+
+    def _refresh(self, cells, tiles):
+        with self._lock:
+            mine, waiting = [], []
+            for cell in cells:
+                geohash = encode_cell(*cell, self.precision)
+                fetch = self._inflight.get(geohash)
+                if fetch is None:
+                    self._inflight[geohash] = _Fetch()
+                    mine.append(cell)
+                else:
+                    waiting.append((cell, fetch))
+
+        error = None
+        started = time.time()
+        try:
+            if mine:
+                for block in _blocks(mine, FETCH_BLOCK):
+                    self._fetch_block(*block, tiles)
+        except Exception as e:
+            error = e
+        finally:
+            with self._lock:
+                for cell in mine:
+                    fetch = self._inflight.pop(encode_cell(*cell, self.precision))
+                    if error is not None and (tiles[cell] is None or tiles[cell][0] < started):
+                        fetch.error = error     # this cell's block never came back
+                    fetch.done.set()
+
+        # cells another thread was fetching: its failure is ours too
+        for cell, fetch in waiting:
+            fetch.done.wait()
+            geohash = encode_cell(*cell, self.precision)
+            tile = self._get(geohash) if fetch.error is None else None
+            if tile is not None:
+                tiles[cell] = tile
+            elif error is None:
+                error = fetch.error or LookupError(f"hospital tile {geohash} missing after fetch")
+
+        if error is not None:
+            if any(tiles[cell] is None for cell in cells):
+                raise error
+            print("Hospital tile refresh failed, using stale tiles:", error)
+
+    # ---------------------------------
+    # Query
+    # ---------------------------------
+    def items_in_bbox(self, south, west, north, east, max_age=None):
+        """
+        Items of every tile overlapping the box, fetching only missing or
+        expired tiles. `max_age` (seconds) tightens the store's TTL for this
+        call, e.g. for an explicit refresh.
+        """
+        ttl = self.ttl if max_age is None else min(self.ttl, max_age)
+        row0, col0 = cell_of(south, west, self.precision)
+        row1, col1 = cell_of(north, east, self.precision)
+        tiles = {}
+        need = []
+        now = time.time()
+        for r in range(row0, row1 + 1):
+            for c in range(col0, col1 + 1):
+                tile = self._get(encode_cell(r, c, self.precision))
+                tiles[(r, c)] = tile
+                if tile is None or now - tile[0] >= ttl:
+                    need.append((r, c))
+        if need:
+            self._refresh(need, tiles)
+
+        items = []
+        for tile in tiles.values():
+            if tile is not None:
+                items.extend(tile[1])
+        return items
@@ -0,0 +1,245 @@
+"""
+Single location service for the SOS window.
+
+One worker thread reads fixes from a pluggable source (simulated random
+walk, NMEA or GPX file replay). It samples fast while an alarm is active and
+slowly otherwise. Tk widgets never get called from the worker: the newest fix
+sits in a one-slot (coalescing) mailbox that attached widgets drain on the
+main thread with after().
+
+Set PFM_LOCATION_FILE to a .nmea or .gpx file to replay a recorded track.
+"""
+
+import math
+import os
+import random
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+
+FAST_INTERVAL = 1.0     # seconds between fixes while the alarm is on
+SLOW_INTERVAL = 10.0    # seconds between fixes otherwise
+POLL_MS = 200           # how often attached widgets check for a new fix
+START_COORD = (10.5, 77.05)
+
+Fix = namedtuple("Fix", "lat lon ts source")
+
+
+# -----------------------
+# Sources
+# -----------------------
+class SimulatedSource:
+    """Random walk of roughly `step_m` metres per fix."""
+
+    name = "simulated"
+
+    def __init__(self, start=START_COORD, step_m=25.0, seed=None):
+        self.lat, self.lon = start
+        self.step_m = step_m
+        self._rng = random.Random(seed)
+
+    def next_fix(self):
+        heading = self._rng.uniform(0, 2 * math.pi)
+        dist = self._rng.uniform(0, self.step_m)
+        self.lat += dist * math.cos(heading) / 111_320
+        self.lon += dist * math.sin(heading) / (111_320 * math.cos(math.radians(self.lat)))
+        return round(self.lat, 5), round(self.lon, 5)
+
+
+class _ReplaySource:
+    def __init__(self, path, loop=True):
+        self.path = path
+        self.loop = loop
+        self.points = list(self._read(path))
+        self._i = 0
+        if not self.points:
+            raise ValueError(f"No positions found in {path}")
+
+    def next_fix(self):
+        if self._i >= len(self.points):
+            if not self.loop:
+                return None
+            self._i = 0
+        point = self.points[self._i]
+        self._i += 1
+        return point
+
+
+def _nmea_coord(value, hemi, degree_digits):
+    if not value:
+        return None
+    deg = float(value[:degree_digits])
+    minutes = float(value[degree_digits:])
+    coord = deg + minutes / 60
+    return -coord if hemi in ("S", "W") else coord
+
+
+class NMEAFileSource(_ReplaySource):
+    """Replays $..GGA / $..RMC sentences from a log file."""
+
+    name = "nmea"
+
+    @staticmethod
+    def _read(path):
+        with open(path, encoding="ascii", errors="ignore") as f:
+            for line in f:
+                fields = line.strip().split("*")[0].split(",")
+                kind = fields[0][3:] if fields[0].startswith("$") else ""
+                try:
+                    if kind == "GGA" and fields[6] not in ("", "0"):
+                        lat = _nmea_coord(fields[2], fields[3], 2)
+                        lon = _nmea_coord(fields[4], fields[5], 3)
+                    elif kind == "RMC" and fields[2] == "A":
+                        lat = _nmea_coord(fields[3], fields[4], 2)
+                        lon = _nmea_coord(fields[5], fields[6], 3)
+                    else:
+                        continue
+                except (IndexError, ValueError):
+                    continue
+                if lat is not None and lon is not None:
+                    yield round(lat, 6), round(lon, 6)
+
+
+class GPXFileSource(_ReplaySource):
+    """Replays track/route/way points from a GPX file."""
+
+    name = "gpx"
+
+    @staticmethod
+    def _read(path):
+        for _event, el in ET.iterparse(path):
+            tag = el.tag.rsplit("}", 1)[-1]
+            if tag in ("trkpt", "rtept", "wpt"):
+                try:
+                    yield float(el.get("lat")), float(el.get("lon"))
+                except (TypeError, ValueError):
+                    pass
+                el.clear()
+
+
+def default_source():
+    path = os.environ.get("PFM_LOCATION_FILE")
+    if path:
+        ext = os.path.splitext(path)[1].lower()
+        if ext == ".gpx":
+            return GPXFileSource(path)
+        return NMEAFileSource(path)
+    return SimulatedSource()
+
+
+# -----------------------
+# Service
+# -----------------------
+class LocationService:
+    def __init__(self, source=None, fast_interval=FAST_INTERVAL, slow_interval=SLOW_INTERVAL):
+        self.source = source
+        self.fast_interval = fast_interval
+        self.slow_interval = slow_interval
+        self.alarm = False
+
+        self._lock = threading.Lock()
+        self._latest = None
+        self._seq = 0
+        self._listeners = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def interval(self):
+        return self.fast_interval if self.alarm else self.slow_interval
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        if self.source is None:
+            self.source = default_source()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="location-service", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def set_alarm(self, active):
+        """Switch sampling rate; takes effect immediately."""
+        self.alarm = bool(active)
+        self._wake.set()
+
+    def latest(self):
+        with self._lock:
+            return self._latest
+
+    def add_listener(self, fn):
+        """Call fn(fix) on the worker thread for every fix (no coalescing)."""
+        self._listeners.append(fn)
+
+    def remove_listener(self, fn):
+        if fn in self._listeners:
+            self._listeners.remove(fn)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                point = self.source.next_fix()
+            except Exception as e:
+                print("Location source failed:", e)
+                point = None
+            if point is not None:
+                fix = Fix(point[0], point[1], time.time(), getattr(self.source, "name", "unknown"))
+                with self._lock:
+                    self._latest = fix
+                    self._seq += 1
+                for fn in list(self._listeners):
+                    try:
+                        fn(fix)
+                    except Exception as e:
+                        print("Location listener failed:", e)
+
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    # ---------------------------------
+    # Tk delivery (main thread only)
+    # ---------------------------------
+    def attach(self, widget, callback, poll_ms=POLL_MS):
+        """
+        Deliver the newest fix to callback(lat, lon) on the Tk thread.
+        Fixes that arrive between polls are coalesced into the latest one.
+        Returns a function that detaches the widget.
+        """
+        state = {"seq": self._seq, "job": None}
+
+        def drain():
+            if not widget.winfo_exists():
+                return
+            with self._lock:
+                seq, fix = self._seq, self._latest
+            if seq != state["seq"] and fix is not None:
+                state["seq"] = seq
+                callback(fix.lat, fix.lon)
+            state["job"] = widget.after(poll_ms, drain)
+
+        def detach():
+            if state["job"] is not None:
+                try:
+                    widget.after_cancel(state["job"])
+                except Exception:
+                    pass
+                state["job"] = None
+
+        state["job"] = widget.after(poll_ms, drain)
+        return detach
+
+
+# Shared by the whole app: one worker thread no matter how often SOS is used
+location_service = LocationService()
@@ -0,0 +1,159 @@
+"""
+Lightweight timing hooks for the UI hot paths.
+
+Decorate a function with @timed("name") to record how long each call takes.
+Collection is off unless PFM_METRICS=1 is set or enable() is called; while
+off, a timed function costs one attribute check per call.
+
+Tk event-loop stalls are measured by StallMonitor, which schedules a
+periodic after() callback and records how late it actually runs.
+"""
+
+import csv
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+MAX_SAMPLES = 512        # recent samples kept per metric for percentiles
+STALL_THRESHOLD_MS = 100
+
+
+class _State:
+    enabled = os.environ.get("PFM_METRICS") == "1"
+
+
+_state = _State()
+_lock = threading.Lock()
+_metrics = {}
+
+
+class _Metric:
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=MAX_SAMPLES)
+
+
+def enable(on=True):
+    _state.enabled = on
+
+
+def is_enabled():
+    return _state.enabled
+
+
+def reset():
+    with _lock:
+        _metrics.clear()
+
+
+def record(name, ms):
+    """Add one duration sample (milliseconds) to metric `name`."""
+    if not _state.enabled:
+        return
+    with _lock:
+        m = _metrics.get(name)
+        if m is None:
+            m = _metrics[name] = _Metric()
+        m.count += 1
+        m.total += ms
+        if ms > m.max:
+            m.max = ms
+        m.samples.append(ms)
+
+
+def timed(name):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _state.enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, (time.perf_counter() - start) * 1000)
+        return wrapper
+    return decorator
+
+
+def _percentile(sorted_samples, p):
+    if not sorted_samples:
+        return 0.0
+    k = min(len(sorted_samples) - 1, int(round(p / 100 * (len(sorted_samples) - 1))))
+    return sorted_samples[k]
+
+
+def snapshot():
+    """Return {name: stats} with count, mean, p50, p95 and max in ms."""
+    with _lock:
+        items = [(name, m.count, m.total, m.max, sorted(m.samples)) for name, m in _metrics.items()]
+    out = {}
+    for name, count, total, mx, samples in sorted(items):
+        out[name] = {
+            "count": count,
+            "total_ms": round(total, 3),
+            "mean_ms": round(total / count, 3) if count else 0.0,
+            "p50_ms": round(_percentile(samples, 50), 3),
+            "p95_ms": round(_percentile(samples, 95), 3),
+            "max_ms": round(mx, 3),
+        }
+    return out
+
+
+def export_json(path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"exported_at": time.time(), "metrics": snapshot()}, f, indent=2)
+
+
+def export_csv(path):
+    fields = ["name", "count", "total_ms", "mean_ms", "p50_ms", "p95_ms", "max_ms"]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for name, stats in snapshot().items():
+            writer.writerow({"name": name, **stats})
+
+
+# -----------------------
+# Tk event-loop stall monitor
+# -----------------------
+class StallMonitor:
+    def __init__(self, widget, interval_ms=50, threshold_ms=STALL_THRESHOLD_MS):
+        self.widget = widget
+        self.interval_ms = interval_ms
+        self.threshold_ms = threshold_ms
+        self._job = None
+        self._expected = None
+
+    def start(self):
+        if self._job is None:
+            self._schedule()
+
+    def stop(self):
+        if self._job is not None:
+            try:
+                self.widget.after_cancel(self._job)
+            except Exception:
+                pass
+            self._job = None
+
+    def _schedule(self):
+        self._expected = time.perf_counter() + self.interval_ms / 1000
+        self._job = self.widget.after(self.interval_ms, self._tick)
+
+    def _tick(self):
+        late_ms = max(0.0, (time.perf_counter() - self._expected) * 1000)
+        record("tk.callback_latency", late_ms)
+        if late_ms >= self.threshold_ms:
+            record("tk.stall", late_ms)
+        if self.widget.winfo_exists():
+            self._schedule()
+        else:
+            self._job = None
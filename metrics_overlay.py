@@ -0,0 +1,64 @@
+"""
+On-screen view of the metrics collected by metrics.py (toggle with F12).
+"""
+
+import time
+
+import customtkinter as ct
+
+import metrics
+
+REFRESH_MS = 500
+
+
+class MetricsOverlay(ct.CTkToplevel):
+    def __init__(self, master=None):
+        super().__init__(master)
+        self.title("Metrics")
+        self.geometry("560x360")
+        self.attributes("-topmost", True)
+
+        bar = ct.CTkFrame(self, fg_color="transparent")
+        bar.pack(fill="x", padx=10, pady=(10, 4))
+        ct.CTkButton(bar, text="Export JSON", width=110, command=lambda: self.export("json")).pack(side="left")
+        ct.CTkButton(bar, text="Export CSV", width=110, command=lambda: self.export("csv")).pack(side="left", padx=8)
+        ct.CTkButton(bar, text="Reset", width=80, command=metrics.reset).pack(side="left")
+        self.status = ct.CTkLabel(bar, text="")
+        self.status.pack(side="right")
+
+        self.text = ct.CTkTextbox(self, font=ct.CTkFont(family="Courier", size=12), wrap="none")
+        self.text.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+
+        self._job = None
+        self.start()
+
+    def start(self):
+        """Refresh every REFRESH_MS while shown."""
+        if self._job is None:
+            self.update_view()
+
+    def stop(self):
+        if self._job is not None:
+            self.after_cancel(self._job)
+            self._job = None
+
+    def update_view(self):
+        self._job = None
+        if not self.winfo_exists():
+            return
+        rows = [f"{'metric':<28}{'n':>6}{'p50':>9}{'p95':>9}{'max':>9}"]
+        for name, st in metrics.snapshot().items():
+            rows.append(f"{name:<28}{st['count']:>6}{st['p50_ms']:>9.1f}{st['p95_ms']:>9.1f}{st['max_ms']:>9.1f}")
+        self.text.configure(state="normal")
+        self.text.delete("0.0", "end")
+        self.text.insert("0.0", "\n".join(rows))
+        self.text.configure(state="disabled")
+        self._job = self.after(REFRESH_MS, self.update_view)
+
+    def export(self, kind):
+        path = f"metrics_{time.strftime('%Y%m%d_%H%M%S')}.{kind}"
+        if kind == "json":
+            metrics.export_json(path)
+        else:
+            metrics.export_csv(path)
+        self.status.configure(text=f"Saved {path}")
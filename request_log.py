@@ -0,0 +1,239 @@
+"""
+Append-only JSONL log of symptom requests and model responses.
+
+Records are queued by the UI and written by a background thread in batches,
+and the file is rotated once it grows past a size limit. Timings and sizes
+are written in the clear; the user name, symptoms and response are sealed
+into one Fernet token per record (or left out when no key is given), so the
+log doesn't undo the encrypted chat history. The same log can be replayed
+through ChatPage.submit_api for load and latency testing:
+
+    python request_log.py chat_requests.jsonl --speed 4
+
+Replayed requests are logged to REPLAY_LOG_FILE, never back into the log
+being replayed, and each one runs in a fresh conversation. When the last
+one has been answered, throughput and latency percentiles computed from
+REPLAY_LOG_FILE are printed.
+"""
+
+import json
+import math
+import os
+import queue
+import threading
+import time
+
+LOG_FILE = "chat_requests.jsonl"
+REPLAY_LOG_FILE = "chat_replay.jsonl"
+MAX_LOG_BYTES = 5 * 1024 * 1024
+BACKUP_COUNT = 3
+FLUSH_EVERY = 20          # records per batch
+FLUSH_INTERVAL = 1.0      # seconds before a partial batch is written
+PRIVATE_FIELDS = ("user", "symptoms", "response")
+
+
+class RequestLog:
+    def __init__(self, path=LOG_FILE, max_bytes=MAX_LOG_BYTES, backup_count=BACKUP_COUNT,
+                 flush_every=FLUSH_EVERY, flush_interval=FLUSH_INTERVAL, fernet=None):
+        """With fernet=None the private fields are dropped rather than stored."""
+        self.path = path
+        self.fernet = fernet
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+
+    def record(self, **fields):
+        """Queue one record; never blocks on disk."""
+        fields.setdefault("ts", time.time())
+        self._queue.put(fields)
+
+    def close(self, timeout=5.0):
+        self._stop.set()
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    # ---------------------------------
+    # Background writer
+    # ---------------------------------
+    def _writer(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = False
+
+            if item:
+                batch.append(item)
+
+            timed_out = time.monotonic() >= deadline
+            if batch and (len(batch) >= self.flush_every or timed_out or item is None):
+                self._write_batch(batch)
+                batch = []
+            if timed_out or item is None:
+                deadline = time.monotonic() + self.flush_interval
+
+            if item is None and self._stop.is_set():
+                # drain anything queued after the sentinel
+                while True:
+                    try:
+                        rest = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if rest:
+                        batch.append(rest)
+                if batch:
+                    self._write_batch(batch)
+                return
+
+    def _seal(self, record):
+        private = {k: record.pop(k) for k in PRIVATE_FIELDS if k in record}
+        if private and self.fernet is not None:
+            record["sealed"] = self.fernet.encrypt(json.dumps(private).encode()).decode()
+        return record
+
+    def _write_batch(self, batch):
+        data = "".join(json.dumps(self._seal(r), ensure_ascii=False) + "\n" for r in batch)
+        try:
+            if os.path.exists(self.path) and os.path.getsize(self.path) + len(data) > self.max_bytes:
+                self._rotate()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(data)
+        except OSError as e:
+            print("Request log write failed:", e)
+
+    def _rotate(self):
+        # chat_requests.jsonl -> .1 -> .2 ... oldest is dropped
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+def read_log(path=LOG_FILE, fernet=None):
+    """Yield records from a log file, skipping truncated lines; sealed fields are opened with `fernet`."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            sealed = rec.pop("sealed", None)
+            if sealed and fernet is not None:
+                try:
+                    rec.update(json.loads(fernet.decrypt(sealed.encode())))
+                except Exception:
+                    pass        # another key; timings are still usable
+            yield rec
+
+
+# -----------------------
+# Replay
+# -----------------------
+def replay(path, submit, schedule, speed=1.0, limit=None, fernet=None):
+    """
+    Schedule `submit(symptoms)` for each recorded request with
+    `schedule(delay_s, fn)`, keeping the original spacing divided by
+    `speed` (speed=0 sends everything at once). Pass Tk's after so every
+    submit runs on the Tk thread. Returns the number of requests scheduled.
+    """
+    records = [r for r in read_log(path, fernet) if r.get("symptoms")]
+    records.sort(key=lambda r: r.get("ts", 0))
+    if limit:
+        records = records[:limit]
+
+    first_ts = records[0].get("ts", 0) if records else 0
+    for r in records:
+        delay = (r.get("ts", first_ts) - first_ts) / speed if speed > 0 else 0.0
+        schedule(delay, lambda symptoms=r["symptoms"]: submit(symptoms))
+    return len(records)
+
+
+def percentile(samples, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not samples:
+        return None
+    return samples[max(0, math.ceil(p / 100 * len(samples)) - 1)]
+
+
+def summarize(path):
+    """Request count, throughput and end-to-end latency percentiles of a log."""
+    records = list(read_log(path))
+    if not records:
+        return {"requests": 0}
+    latencies = sorted(r["total_ms"] for r in records if r.get("total_ms") is not None)
+    # records are written when the answer is shown; total_ms reaches back to the submit
+    started = min(r["ts"] - (r.get("total_ms") or 0) / 1000 for r in records)
+    elapsed = max(r["ts"] for r in records) - started
+    return {
+        "requests": len(records),
+        "errors": sum(1 for r in records if r.get("error")),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(records) / elapsed, 2) if elapsed > 0 else None,
+        "latency_ms": {
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": latencies[-1] if latencies else None,
+        },
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay a chat request log through ChatPage.submit_api")
+    parser.add_argument("log", nargs="?", default=LOG_FILE)
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression factor, 0 = no delay")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--user", default="replay")
+    parser.add_argument("--out", default=REPLAY_LOG_FILE, help="request log for the replayed requests")
+    args = parser.parse_args()
+    if os.path.abspath(args.out) == os.path.abspath(args.log):
+        parser.error("--out must differ from the log being replayed")
+
+    import App
+    from symptom_pipeline import Conversation
+
+    App.request_log.close()
+    if os.path.exists(args.out):
+        os.remove(args.out)         # the summary covers this run only
+    App.request_log = RequestLog(path=args.out, fernet=App.aes)
+    App.cur_user = args.user
+    app = App.App()
+    app.show_page(App.ChatPage)
+    page = app.current_page
+    page.history = None         # replayed requests are not saved to chat history
+
+    pending = 0
+
+    def finished():
+        global pending
+        pending -= 1
+        if pending == 0:
+            App.request_log.close()     # flush before reading it back
+            print(json.dumps(summarize(args.out), indent=2))
+
+    def submit(symptoms):
+        # recorded requests are independent; don't let them share one context
+        page.submit_api(symptoms, {"conversation": Conversation(user=args.user)}, on_done=finished)
+
+    pending = replay(args.log, submit, lambda delay, fn: app.after(int(delay * 1000), fn),
+                     args.speed, args.limit, App.aes)
+    if not pending:
+        print("Nothing to replay in", args.log)
+    app.mainloop()
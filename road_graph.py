@@ -0,0 +1,558 @@
+"""
+Offline drive-time routing over a local OpenStreetMap extract.
+
+The drivable ways of the extract are reduced to a junction graph: each run
+of way nodes between two junctions becomes one edge weighted by its drive
+time in seconds (from the highway class or maxspeed), one-way streets stay
+one-way, and only the largest connected part of the network is kept. The
+graph is held as CSR arrays (offsets / targets / weights) and cached in a
+compact binary file next to the extract, so later runs skip the OSM parse.
+
+Every way node is kept as a snapping point: an origin or a hospital snaps
+to the nearest road point and from there to the junctions at either end of
+its stretch of road. One multi-target Dijkstra from the origin then gives
+the drive time to every hospital at once.
+
+    python road_graph.py roads.osm          # build the cache and time a query
+"""
+
+import bz2
+import gzip
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from array import array
+
+import metrics
+
+try:
+    import osmium           # only needed to read .pbf extracts
+except ImportError:
+    osmium = None
+
+ROAD_FILE = os.environ.get("PFM_ROAD_FILE", "roads.osm")
+GRAPH_SUFFIX = ".graph"
+GRAPH_VERSION = 1
+SNAP_CELL_DEG = 0.001           # ~110 m grid cells for snapping
+MAX_SNAP_METERS = 2000
+OFFROAD_SPEED_KMH = 10          # from the road to a point off it (campus driveways etc.)
+EARTH_RADIUS_M = 6371000.0
+INF = float("inf")
+
+# km/h by highway class; classes not listed are not drivable
+SPEEDS_KMH = {
+    "motorway": 80, "motorway_link": 45, "trunk": 60, "trunk_link": 40,
+    "primary": 45, "primary_link": 35, "secondary": 40, "secondary_link": 30,
+    "tertiary": 35, "tertiary_link": 25, "unclassified": 25, "residential": 20,
+    "living_street": 10, "service": 12, "road": 20,
+}
+
+_ARRAYS = ("offsets", "targets", "weights",
+           "chain_u", "chain_v", "chain_cost", "chain_twoway",
+           "pt_lat", "pt_lon", "pt_chain", "pt_offset")
+
+_MAXSPEED_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(mph)?")
+
+
+# -----------------------
+# OSM tags
+# -----------------------
+def _drivable(tags):
+    return (tags.get("highway") in SPEEDS_KMH and tags.get("area") != "yes"
+            and tags.get("access") != "no" and tags.get("motor_vehicle") != "no")
+
+
+def _speed_kmh(tags):
+    m = _MAXSPEED_RE.match(tags.get("maxspeed") or "")
+    if m:
+        speed = float(m.group(1)) * (1.609 if m.group(2) else 1.0)
+        if speed > 0:
+            return speed
+    return SPEEDS_KMH[tags["highway"]]
+
+
+def _oneway(tags):
+    """1 = only along the way's node order, -1 = only against it, 0 = both."""
+    value = tags.get("oneway")
+    if value in ("yes", "true", "1"):
+        return 1
+    if value in ("-1", "reverse"):
+        return -1
+    if value == "no":
+        return 0
+    if tags.get("junction") in ("roundabout", "circular") or tags.get("highway") == "motorway":
+        return 1
+    return 0
+
+
+def _meters(lat1, lon1, lat2, lon2):
+    # equirectangular; plenty for the short hops between way nodes
+    x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return EARTH_RADIUS_M * math.hypot(x, y)
+
+
+# -----------------------
+# Reading extracts
+# -----------------------
+def _open(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    return open(path, "rb")
+
+
+def _read_osm_xml(path):
+    # two passes: ways first (to learn which nodes matter), then only those nodes
+    ways = []
+    needed = set()
+    with _open(path) as f:
+        for _, el in ET.iterparse(f):
+            if el.tag == "way":
+                tags = {t.get("k"): t.get("v") for t in el.iter("tag")}
+                if _drivable(tags):
+                    refs = [int(nd.get("ref")) for nd in el.iter("nd")]
+                    ways.append((tags, refs))
+                    needed.update(refs)
+                el.clear()
+            elif el.tag in ("node", "relation"):
+                el.clear()
+
+    coords = {}
+    with _open(path) as f:
+        for _, el in ET.iterparse(f):
+            if el.tag == "node":
+                node_id = int(el.get("id"))
+                if node_id in needed:
+                    coords[node_id] = (float(el.get("lat")), float(el.get("lon")))
+                el.clear()
+            elif el.tag in ("way", "relation"):
+                el.clear()
+    return ways, coords
+
+
+def _read_osm_pbf(path):
+    if osmium is None:
+        raise RuntimeError("Reading .pbf extracts needs the osmium package (pip install osmium)")
+    ways, coords = [], {}
+
+    class Handler(osmium.SimpleHandler):
+        def way(self, w):
+            tags = {t.k: t.v for t in w.tags}
+            if not _drivable(tags):
+                return
+            refs = []
+            for n in w.nodes:
+                if n.location.valid():
+                    coords[n.ref] = (n.location.lat, n.location.lon)
+                    refs.append(n.ref)
+            ways.append((tags, refs))
+
+    Handler().apply_file(path, locations=True)
+    return ways, coords
+
+
+def read_osm(path):
+    """(ways, coords) from a .osm (optionally .gz/.bz2) or .pbf extract."""
+    if path.endswith(".pbf"):
+        return _read_osm_pbf(path)
+    return _read_osm_xml(path)
+
+
+# -----------------------
+# Graph
+# -----------------------
+class RoadGraph:
+    def __init__(self, offsets, targets, weights, chain_u, chain_v, chain_cost, chain_twoway,
+                 pt_lat, pt_lon, pt_chain, pt_offset):
+        # CSR over junctions: edges of node u are targets/weights[offsets[u]:offsets[u + 1]]
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights          # seconds
+        # one chain per stretch of road between two junctions
+        self.chain_u = chain_u
+        self.chain_v = chain_v
+        self.chain_cost = chain_cost    # seconds from u to v
+        self.chain_twoway = chain_twoway
+        # snapping points: every way node; pt_chain is the chain it lies on,
+        # or -1 - node for a junction
+        self.pt_lat = pt_lat
+        self.pt_lon = pt_lon
+        self.pt_chain = pt_chain
+        self.pt_offset = pt_offset      # seconds from the chain's u
+        self.source_mtime = None
+        self._grid = None
+
+    @property
+    def n_nodes(self):
+        return len(self.offsets) - 1
+
+    # ---------------------------------
+    # Building
+    # ---------------------------------
+    @classmethod
+    def from_ways(cls, ways, coords):
+        roads = []                  # (node ids in driving order, m/s, two-way)
+        uses = {}
+        for tags, refs in ways:
+            refs = [r for r in refs if r in coords]
+            if len(refs) < 2:
+                continue
+            direction = _oneway(tags)
+            if direction == -1:
+                refs.reverse()
+            roads.append((refs, _speed_kmh(tags) / 3.6, direction == 0))
+            for r in refs:
+                uses[r] = uses.get(r, 0) + 1
+            uses[refs[0]] += 1      # way ends are always junctions
+            uses[refs[-1]] += 1
+        is_junction = {n for n, count in uses.items() if count > 1}
+
+        # split every way into chains between junctions
+        chains = []                 # (u, v, seconds, two-way, [(node, offset), ...])
+        for refs, speed, twoway in roads:
+            start, cost, interior = refs[0], 0.0, []
+            for prev, node in zip(refs, refs[1:]):
+                cost += _meters(*coords[prev], *coords[node]) / speed
+                if node in is_junction:
+                    chains.append((start, node, cost, twoway, interior))
+                    start, cost, interior = node, 0.0, []
+                else:
+                    interior.append((node, cost))
+
+        # keep the largest connected part (ignoring direction)
+        parent = {}
+
+        def find(x):
+            root = x
+            while parent.get(root, root) != root:
+                root = parent[root]
+            while parent.get(x, x) != root:
+                parent[x], x = root, parent[x]
+            return root
+        for u, v, *_ in chains:
+            ru, rv = find(u), find(v)
+            if ru != rv:
+                parent[ru] = rv
+        sizes = {}
+        for u, v, *_ in chains:
+            for n in (u, v):
+                r = find(n)
+                sizes[r] = sizes.get(r, 0) + 1
+        if not sizes:
+            raise ValueError("No drivable roads in the extract")
+        main = max(sizes, key=sizes.get)
+        chains = [c for c in chains if find(c[0]) == main]
+
+        index = {}
+        for u, v, *_ in chains:
+            for n in (u, v):
+                if n not in index:
+                    index[n] = len(index)
+        n_nodes = len(index)
+
+        chain_u, chain_v = array("i"), array("i")
+        chain_cost, chain_twoway = array("f"), array("b")
+        pt_lat, pt_lon, pt_chain, pt_offset = array("d"), array("d"), array("i"), array("f")
+        edges = []
+        for c, (u, v, cost, twoway, interior) in enumerate(chains):
+            iu, iv = index[u], index[v]
+            chain_u.append(iu)
+            chain_v.append(iv)
+            chain_cost.append(cost)
+            chain_twoway.append(twoway)
+            edges.append((iu, iv, cost))
+            if twoway:
+                edges.append((iv, iu, cost))
+            for node, offset in interior:
+                lat, lon = coords[node]
+                pt_lat.append(lat)
+                pt_lon.append(lon)
+                pt_chain.append(c)
+                pt_offset.append(offset)
+        for node, i in index.items():
+            lat, lon = coords[node]
+            pt_lat.append(lat)
+            pt_lon.append(lon)
+            pt_chain.append(-1 - i)
+            pt_offset.append(0.0)
+
+        # CSR by counting sort on the source node
+        offsets = array("i", bytes(4 * (n_nodes + 1)))
+        for u, _, _ in edges:
+            offsets[u + 1] += 1
+        for i in range(n_nodes):
+            offsets[i + 1] += offsets[i]
+        fill = array("i", offsets[:-1])
+        targets = array("i", bytes(4 * len(edges)))
+        weights = array("f", bytes(4 * len(edges)))
+        for u, v, cost in edges:
+            k = fill[u]
+            targets[k] = v
+            weights[k] = cost
+            fill[u] = k + 1
+
+        return cls(offsets, targets, weights, chain_u, chain_v, chain_cost, chain_twoway,
+                   pt_lat, pt_lon, pt_chain, pt_offset)
+
+    @classmethod
+    def from_osm(cls, path):
+        return cls.from_ways(*read_osm(path))
+
+    # ---------------------------------
+    # Cache file
+    # ---------------------------------
+    def save(self, path):
+        header = {
+            "version": GRAPH_VERSION,
+            "source_mtime": self.source_mtime,
+            "arrays": [[name, getattr(self, name).typecode, len(getattr(self, name))] for name in _ARRAYS],
+        }
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(json.dumps(header).encode() + b"\n")
+            for name in _ARRAYS:
+                getattr(self, name).tofile(f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            header = json.loads(f.readline())
+            if header.get("version") != GRAPH_VERSION:
+                raise ValueError(f"Road graph cache has version {header.get('version')}, expected {GRAPH_VERSION}")
+            arrays = {}
+            for name, typecode, length in header["arrays"]:
+                arrays[name] = array(typecode)
+                arrays[name].fromfile(f, length)
+        graph = cls(**arrays)
+        graph.source_mtime = header.get("source_mtime")
+        return graph
+
+    # ---------------------------------
+    # Snapping
+    # ---------------------------------
+    def _grid_index(self):
+        if self._grid is None:
+            grid = {}
+            for p, (lat, lon) in enumerate(zip(self.pt_lat, self.pt_lon)):
+                grid.setdefault((math.floor(lat / SNAP_CELL_DEG), math.floor(lon / SNAP_CELL_DEG)), []).append(p)
+            self._grid = grid
+        return self._grid
+
+    def snap(self, lat, lon):
+        """(point, meters) of the nearest road point within MAX_SNAP_METERS, else None."""
+        grid = self._grid_index()
+        ci, cj = math.floor(lat / SNAP_CELL_DEG), math.floor(lon / SNAP_CELL_DEG)
+        pt_lat, pt_lon = self.pt_lat, self.pt_lon
+        # compare squared equirectangular offsets in radians; convert the winner only
+        kx = math.cos(math.radians(lat))
+        # the narrower side of a cell bounds how far an unvisited ring can be
+        cell_m = math.radians(SNAP_CELL_DEG) * EARTH_RADIUS_M * kx
+        best, best_sq = None, INF
+        ring = 0
+        while ring * cell_m <= MAX_SNAP_METERS + cell_m:
+            for i in range(ci - ring, ci + ring + 1):
+                for j in range(cj - ring, cj + ring + 1):
+                    if ring and abs(i - ci) != ring and abs(j - cj) != ring:
+                        continue
+                    for p in grid.get((i, j), ()):
+                        dx = (pt_lon[p] - lon) * kx
+                        dy = pt_lat[p] - lat
+                        sq = dx * dx + dy * dy
+                        if sq < best_sq:
+                            best, best_sq = p, sq
+            best_m = math.radians(math.sqrt(best_sq)) * EARTH_RADIUS_M if best is not None else INF
+            if best_m <= ring * cell_m:
+                break
+            ring += 1
+        if best is None or best_m > MAX_SNAP_METERS:
+            return None
+        return best, best_m
+
+    def _leave(self, p):
+        """[(junction, seconds from p to it)] for driving away from point p."""
+        c = self.pt_chain[p]
+        if c < 0:
+            return [(-1 - c, 0.0)]
+        o = self.pt_offset[p]
+        out = [(self.chain_v[c], self.chain_cost[c] - o)]
+        if self.chain_twoway[c]:
+            out.append((self.chain_u[c], o))
+        return out
+
+    def _arrive(self, p):
+        """[(junction, seconds from it to p)] for driving to point p."""
+        c = self.pt_chain[p]
+        if c < 0:
+            return [(-1 - c, 0.0)]
+        o = self.pt_offset[p]
+        out = [(self.chain_u[c], o)]
+        if self.chain_twoway[c]:
+            out.append((self.chain_v[c], self.chain_cost[c] - o))
+        return out
+
+    # ---------------------------------
+    # Routing
+    # ---------------------------------
+    def _dijkstra(self, seeds, needed, cutoff=None):
+        """Shortest times from `seeds`, stopping once every node in `needed` is settled."""
+        dist = [INF] * self.n_nodes
+        heap = []
+        for node, seconds in seeds:
+            if seconds < dist[node]:
+                dist[node] = seconds
+                heap.append((seconds, node))
+        heapq.heapify(heap)
+        remaining = set(needed)
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        pop, push = heapq.heappop, heapq.heappush
+        while heap and remaining:
+            d, u = pop(heap)
+            if d > dist[u]:
+                continue
+            if cutoff is not None and d > cutoff:
+                break
+            remaining.discard(u)
+            for k in range(offsets[u], offsets[u + 1]):
+                v = targets[k]
+                nd = d + weights[k]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    push(heap, (nd, v))
+        return dist
+
+    def travel_times(self, origin, destinations, cutoff=None):
+        """
+        Drive time in seconds from origin (lat, lon) to each destination,
+        or None where it is off the road network or not reachable.
+        """
+        src = self.snap(*origin)
+        if src is None:
+            return [None] * len(destinations)
+        sp, src_m = src
+        offroad = OFFROAD_SPEED_KMH / 3.6
+
+        snapped, needed = [], set()
+        for lat, lon in destinations:
+            dst = self.snap(lat, lon)
+            snapped.append(dst)
+            if dst is not None:
+                needed.update(node for node, _ in self._arrive(dst[0]))
+        dist = self._dijkstra(self._leave(sp), needed, cutoff)
+
+        times = []
+        for dst in snapped:
+            if dst is None:
+                times.append(None)
+                continue
+            tp, dst_m = dst
+            best = min(dist[node] + seconds for node, seconds in self._arrive(tp))
+            c = self.pt_chain[tp]
+            if c >= 0 and c == self.pt_chain[sp]:
+                # both on the same stretch of road: no junction needed
+                along = self.pt_offset[tp] - self.pt_offset[sp]
+                if along >= 0 or self.chain_twoway[c]:
+                    best = min(best, abs(along))
+            if best == INF:
+                times.append(None)
+            else:
+                times.append(best + (src_m + dst_m) / offroad)
+        return times
+
+
+# -----------------------
+# Shared graph
+# -----------------------
+_graph = None
+_loaded = False
+_lock = threading.Lock()
+
+
+def get_graph(path=ROAD_FILE):
+    """
+    The road graph for `path`, from its cache file when that is up to date,
+    else built from the extract (and cached). None when there is no extract.
+    """
+    global _graph, _loaded
+    with _lock:
+        if _loaded:
+            return _graph
+        _loaded = True
+        cache = path + GRAPH_SUFFIX
+        source_mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        try:
+            if os.path.exists(cache):
+                graph = RoadGraph.load(cache)
+                if source_mtime is not None and graph.source_mtime != source_mtime:
+                    graph = None
+            else:
+                graph = None
+            if graph is None:
+                if source_mtime is None:
+                    return None
+                graph = RoadGraph.from_osm(path)
+                graph.source_mtime = source_mtime
+                graph.save(cache)
+            graph._grid_index()      # build the snapping grid now, not on the first query
+            _graph = graph
+        except Exception as e:
+            print("Road graph unavailable:", e)
+        return _graph
+
+
+@metrics.timed("hospitals.route")
+def annotate_drive_times(origin, items):
+    """
+    Set it["drive_min"] on every hospital (None if it cannot be reached by
+    road). Returns False, leaving the items alone, when there is no road graph.
+    """
+    graph = get_graph()
+    if graph is None:
+        return False
+    dests = []
+    for it in items:
+        try:
+            dests.append((float(it["lat"]), float(it["lon"])))
+        except (KeyError, TypeError, ValueError):
+            dests.append(None)
+    known = [d for d in dests if d is not None]
+    times = iter(graph.travel_times(origin, known))
+    for it, d in zip(items, dests):
+        t = next(times) if d is not None else None
+        it["drive_min"] = None if t is None else t / 60
+    return True
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Build the road graph cache for an OSM extract")
+    parser.add_argument("path", nargs="?", default=ROAD_FILE)
+    parser.add_argument("--origin", type=float, nargs=2, metavar=("LAT", "LON"))
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    graph = RoadGraph.from_osm(args.path)
+    graph.source_mtime = os.path.getmtime(args.path)
+    graph.save(args.path + GRAPH_SUFFIX)
+    print(f"Built {graph.n_nodes} junctions, {len(graph.targets)} edges, {len(graph.pt_lat)} road points "
+          f"in {time.perf_counter() - start:.2f}s -> {args.path + GRAPH_SUFFIX}")
+
+    snapped = graph.snap(*args.origin) if args.origin else None
+    if args.origin and snapped is None:
+        print("Origin is not near any road in the extract")
+    elif snapped:
+        start = time.perf_counter()
+        dist = graph._dijkstra(graph._leave(snapped[0]), range(graph.n_nodes))
+        reached = sum(1 for d in dist if d < INF)
+        print(f"Full search from origin: {reached} junctions reached in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
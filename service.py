@@ -0,0 +1,581 @@
+"""
+Headless HTTP service: hospital search, doctor search and symptom analysis
+for the kiosk and mobile front-ends, with no GUI involved.
+
+    python service.py --port 8080           # real data sources (Overpass, Gemini)
+    python service.py --stub                # offline: stub hospitals and stub model
+
+Endpoints (JSON in and out):
+
+    GET  /health
+    GET  /hospitals/nearest?lat=&lon=&radius=&k=&open=1
+    GET  /doctors?q=&payment=&specialty=&sort=&cursor=&limit=
+    POST /analyze      {"symptoms": "...", "session": "...", "user": "..."}
+    GET  /metrics
+
+One asyncio loop serves every connection. Hospital lists are cached per map
+cell and shared by all requests (concurrent misses wait for one fetch), and
+ranking them (distance, opening hours, drive time) runs in a process pool.
+Each endpoint group has a concurrency limit and a bounded queue; requests
+beyond that get 503 with Retry-After instead of piling up.
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import datetime
+import json
+import multiprocessing
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from math import cos, radians
+from urllib.parse import parse_qsl, urlsplit
+
+import pytz
+
+import metrics
+import road_graph
+from async_bridge import run_blocking
+import triage
+from doctor_directory import PAYMENT_FACETS, SORT_KEYS, get_directory
+from hospital_data import COIMBATORE_COORD, FETCH_TIMEOUT, compile_opening_hours, fetch_hospitals, haversine
+from symptom_pipeline import Conversation, HTTPBackend, SymptomPipeline, get_risk_level
+
+HOST = "127.0.0.1"
+PORT = 8080
+TIMEZONE = "Asia/Kolkata"
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+# endpoint group -> (running at once, waiting at most)
+GROUP_LIMITS = {"hospitals": (8, 32), "doctors": (32, 128), "analyze": (4, 16)}
+RETRY_AFTER = 2                 # seconds, sent with 503
+
+HOSPITAL_TTL = 10 * 60          # seconds a cached cell stays fresh
+CACHE_CELL_DEG = 0.02           # ~2.2 km; requests in one cell share a fetch
+CACHE_MAX_CELLS = 64
+DEFAULT_RADIUS = 7000
+MAX_RADIUS = 25000
+MAX_K = 50
+
+SESSION_TTL = 30 * 60
+MAX_SESSIONS = 10000
+MAX_BODY = 64 * 1024
+IDLE_TIMEOUT = 30               # seconds a kept-alive connection may sit idle
+
+STUB_HOURS = [None, "24/7", "Mo-Fr 09:00-18:00", "Mo-Sa 08:00-20:00; Su 10:00-13:00", "Mo-Su 20:00-08:00"]
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Overloaded(Exception):
+    pass
+
+
+# -----------------------
+# Stub data
+# -----------------------
+def stub_fetch_hospitals(lat, lon, radius, max_age=None):
+    """Made-up but stable hospitals around (lat, lon), for running without network."""
+    rng = random.Random(f"{lat:.4f},{lon:.4f},{radius}")
+    deg = radius / 111320
+    items = []
+    for i in range(40):
+        items.append({
+            "name": f"Stub Hospital {i + 1}",
+            "address": f"{rng.randint(1, 400)} Main Road",
+            "lat": lat + rng.uniform(-deg, deg),
+            "lon": lon + rng.uniform(-deg, deg) / cos(radians(lat)),
+            "tags": {"amenity": rng.choice(["hospital", "clinic"])},
+            "opening_hours": rng.choice(STUB_HOURS),
+        })
+    return items
+
+
+# -----------------------
+# Worker-pool jobs (top level so they can be sent to another process)
+# -----------------------
+def _warm_worker():
+    road_graph.get_graph()
+    get_directory()
+
+
+def search_doctors(text, payment, sort, specialty, cursor, limit):
+    """(page, next_cursor, total) from the doctor directory; runs in the worker pool."""
+    directory = get_directory()
+    page, next_cursor = directory.query(text=text, payment=payment, sort=sort, specialty=specialty,
+                                        cursor=cursor, limit=limit)
+    return page, next_cursor, directory.count(text, payment, specialty)
+
+
+def rank_hospitals(lat, lon, radius, items, k, open_only, now_ts):
+    """
+    Hospitals within `radius` of (lat, lon), nearest first (by drive time
+    when a road graph is available). With open_only, known-closed ones are
+    dropped and open ones come before those with unknown hours.
+    """
+    now = datetime.datetime.fromtimestamp(now_ts, pytz.timezone(TIMEZONE))
+    out = []
+    for it in items:
+        try:
+            h_lat, h_lon = float(it["lat"]), float(it["lon"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        dist = haversine(lat, lon, h_lat, h_lon)
+        if dist * 1000 > radius:
+            continue
+        hours = compile_opening_hours(it.get("opening_hours"))
+        status = hours.is_open(now) if hours is not None else None
+        if open_only and status is False:
+            continue
+        out.append({
+            "name": it.get("name"),
+            "address": it.get("address"),
+            "lat": h_lat,
+            "lon": h_lon,
+            "opening_hours": it.get("opening_hours"),
+            "open_now": status,
+            "distance_km": round(dist, 3),
+        })
+    road_graph.annotate_drive_times((lat, lon), out)
+    out.sort(key=lambda x: (open_only and x["open_now"] is not True,
+                            x.get("drive_min") is None, x.get("drive_min") or 0, x["distance_km"]))
+    return out[:k]
+
+
+# -----------------------
+# Shared state
+# -----------------------
+class Limiter:
+    """At most `limit` requests run at once and `queue` more wait; the rest are refused."""
+
+    def __init__(self, limit, queue):
+        self.limit = limit
+        self.queue = queue
+        self.running = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._sem = asyncio.Semaphore(limit)
+
+    async def __aenter__(self):
+        if self._sem.locked() and self.waiting >= self.queue:
+            self.rejected += 1
+            raise Overloaded()
+        self.waiting += 1
+        try:
+            await self._sem.acquire()
+        finally:
+            self.waiting -= 1
+        self.running += 1
+
+    async def __aexit__(self, *exc):
+        self.running -= 1
+        self._sem.release()
+
+    def stats(self):
+        return {"limit": self.limit, "queue": self.queue, "running": self.running,
+                "waiting": self.waiting, "rejected": self.rejected}
+
+
+class HospitalCache:
+    """
+    Hospital lists per map cell, shared by every request. A miss fetches
+    around the cell centre with enough margin to cover the whole cell;
+    concurrent misses for one cell wait for the same fetch, and a failed
+    refresh falls back to the stale list if there is one.
+    """
+
+    def __init__(self, fetch, ttl=HOSPITAL_TTL, cell_deg=CACHE_CELL_DEG, max_cells=CACHE_MAX_CELLS):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.cell_deg = cell_deg
+        self.max_cells = max_cells
+        self.hits = self.misses = self.errors = 0
+        self._cells = OrderedDict()     # key -> (fetched_at, items)
+        self._inflight = {}             # key -> asyncio.Task
+
+    def _key(self, lat, lon, radius):
+        return round(lat / self.cell_deg), round(lon / self.cell_deg), radius
+
+    async def get(self, lat, lon, radius):
+        """(items, fetched_at, stale) for hospitals around (lat, lon)."""
+        key = self._key(lat, lon, radius)
+        entry = self._cells.get(key)
+        if entry is not None and time.time() - entry[0] < self.ttl:
+            self.hits += 1
+            self._cells.move_to_end(key)
+            return entry[1], entry[0], False
+
+        self.misses += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(self._fetch(key))
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        try:
+            # shielded: one caller giving up must not cancel the shared fetch
+            items, fetched_at = await asyncio.shield(task)
+            return items, fetched_at, False
+        except Exception:
+            self.errors += 1
+            if entry is not None:
+                return entry[1], entry[0], True
+            raise
+
+    async def _fetch(self, key):
+        i, j, radius = key
+        lat, lon = i * self.cell_deg, j * self.cell_deg
+        margin = self.cell_deg * 111320        # covers a request anywhere in the cell
+        items = await asyncio.wait_for(run_blocking(self.fetch, lat, lon, radius + margin, max_age=self.ttl),
+                                       FETCH_TIMEOUT)
+        fetched_at = time.time()
+        self._cells[key] = (fetched_at, items)
+        self._cells.move_to_end(key)
+        while len(self._cells) > self.max_cells:
+            self._cells.popitem(last=False)
+        return items, fetched_at
+
+    def stats(self):
+        return {"cells": len(self._cells), "hits": self.hits, "misses": self.misses,
+                "errors": self.errors, "fetching": len(self._inflight)}
+
+
+class Sessions:
+    """Chat histories for /analyze, least recently used dropped first."""
+
+    def __init__(self, ttl=SESSION_TTL, max_sessions=MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._items = OrderedDict()     # id -> (conversation, lock, last_used)
+
+    def get(self, session_id, user):
+        now = time.time()
+        entry = self._items.get(session_id) if session_id else None
+        if entry is None or now - entry[2] > self.ttl:
+            session_id = session_id or uuid.uuid4().hex
+            entry = (Conversation(user), asyncio.Lock(), now)
+        self._items[session_id] = (entry[0], entry[1], now)
+        self._items.move_to_end(session_id)
+        while len(self._items) > self.max_sessions:
+            self._items.popitem(last=False)
+        return session_id, entry[0], entry[1]
+
+    def __len__(self):
+        return len(self._items)
+
+
+# -----------------------
+# Parameters
+# -----------------------
+def _number(params, name, default=None, lo=None, hi=None, kind=float):
+    raw = params.get(name)
+    if raw is None or raw == "":
+        if default is None:
+            raise HTTPError(400, f"missing parameter: {name}")
+        return default
+    try:
+        value = kind(raw)
+    except ValueError:
+        raise HTTPError(400, f"bad {name}: {raw!r}")
+    if (lo is not None and value < lo) or (hi is not None and value > hi):
+        raise HTTPError(400, f"{name} must be between {lo} and {hi}")
+    return value
+
+
+def _flag(params, name):
+    return params.get(name, "").lower() in ("1", "true", "yes")
+
+
+# -----------------------
+# Service
+# -----------------------
+class Service:
+    def __init__(self, host=HOST, port=PORT, fetch=fetch_hospitals, pipeline=None, workers=DEFAULT_WORKERS):
+        self.host = host
+        self.port = port
+        self.fetch = fetch
+        self.pipeline = pipeline or SymptomPipeline()
+        self.workers = workers
+        self.requests = 0
+        self.in_flight = 0
+        self.started_at = None
+        self.routes = {
+            ("GET", "/health"): (None, self.health),
+            ("GET", "/hospitals/nearest"): ("hospitals", self.nearest_hospitals),
+            ("GET", "/doctors"): ("doctors", self.doctors),
+            ("POST", "/analyze"): ("analyze", self.analyze),
+            ("GET", "/metrics"): (None, self.metrics_report),
+        }
+        self._server = None
+        self._pool = None
+        self._loop = None
+        self._thread = None
+
+    # ---------------------------------
+    # Lifecycle
+    # ---------------------------------
+    async def start_async(self):
+        metrics.enable()
+        self.limiters = {group: Limiter(*limits) for group, limits in GROUP_LIMITS.items()}
+        self.hospitals = HospitalCache(self.fetch)
+        self.sessions = Sessions()
+        if self.workers > 0:
+            # spawn, not fork: this process already runs threads
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context("spawn"), initializer=_warm_worker)
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.started_at = time.time()
+
+    async def stop_async(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    async def serve(self):
+        await self.start_async()
+        print(f"Service listening on {self.url}")
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop_async()
+
+    def start(self):
+        """Run the service on a background thread (for tests and embedding)."""
+        self._loop = asyncio.new_event_loop()
+        ready = concurrent.futures.Future()
+
+        def run():
+            asyncio.set_event_loop(self._loop)
+            try:
+                self._loop.run_until_complete(self.start_async())
+            except Exception as e:
+                ready.set_exception(e)
+                return
+            ready.set_result(None)
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="pfm-service", daemon=True)
+        self._thread.start()
+        ready.result()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.stop_async(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    # ---------------------------------
+    # HTTP
+    # ---------------------------------
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if not line:
+                    break
+                try:
+                    method, target, version = line.decode("latin-1").split()
+                except ValueError:
+                    await self._send(writer, 400, {"error": "bad request line"}, False)
+                    break
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = h.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._send(writer, 400, {"error": "bad content-length"}, False)
+                    break
+                if length > MAX_BODY:
+                    await self._send(writer, 413, {"error": "request body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                status, payload = await self.dispatch(method, target, body)
+                await self._send(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _send(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode()
+        head = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+                "Content-Type: application/json",
+                f"Content-Length: {len(body)}",
+                "Access-Control-Allow-Origin: *",
+                "Connection: " + ("keep-alive" if keep_alive else "close")]
+        if status == 503:
+            head.append(f"Retry-After: {RETRY_AFTER}")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+        await writer.drain()
+
+    async def dispatch(self, method, target, body):
+        """(status, payload) for one request."""
+        url = urlsplit(target)
+        route = self.routes.get((method, url.path))
+        if route is None:
+            if any(path == url.path for _, path in self.routes):
+                return 405, {"error": f"{method} not allowed on {url.path}"}
+            return 404, {"error": f"no such endpoint: {url.path}"}
+        group, handler = route
+        params = dict(parse_qsl(url.query))
+
+        self.requests += 1
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            if group is None:
+                return 200, await handler(params, body)
+            async with self.limiters[group]:
+                result = await handler(params, body)
+            return result if isinstance(result, tuple) else (200, result)
+        except HTTPError as e:
+            return e.status, {"error": e.message}
+        except Overloaded:
+            return 503, {"error": "busy, retry shortly"}
+        except asyncio.TimeoutError:
+            return 504, {"error": "upstream timed out"}
+        except Exception as e:
+            print("Service request failed:", e)
+            return 500, {"error": str(e) or type(e).__name__}
+        finally:
+            self.in_flight -= 1
+            metrics.record(f"service.{group or url.path.strip('/')}", (time.perf_counter() - started) * 1000)
+
+    # ---------------------------------
+    # Endpoints
+    # ---------------------------------
+    async def health(self, params, body):
+        return {"ok": True}
+
+    async def nearest_hospitals(self, params, body):
+        lat = _number(params, "lat", COIMBATORE_COORD[0], -90, 90)
+        lon = _number(params, "lon", COIMBATORE_COORD[1], -180, 180)
+        radius = _number(params, "radius", DEFAULT_RADIUS, 100, MAX_RADIUS, int)
+        k = _number(params, "k", 10, 1, MAX_K, int)
+        open_only = _flag(params, "open")
+
+        items, fetched_at, stale = await self.hospitals.get(lat, lon, radius)
+        args = (lat, lon, radius, items, k, open_only, time.time())
+        ranked = await asyncio.get_running_loop().run_in_executor(self._pool, rank_hospitals, *args)
+        return {"hospitals": ranked, "fetched_at": fetched_at, "stale": stale}
+
+    async def doctors(self, params, body):
+        payment = params.get("payment", "All")
+        sort = params.get("sort", "default")
+        if payment not in PAYMENT_FACETS:
+            raise HTTPError(400, f"payment must be one of {', '.join(PAYMENT_FACETS)}")
+        if sort not in SORT_KEYS:
+            raise HTTPError(400, f"sort must be one of {', '.join(SORT_KEYS)}")
+        text = params.get("q", "")
+        specialty = params.get("specialty") or None
+        args = (text, payment, sort, specialty,
+                _number(params, "cursor", 0, 0, kind=int), _number(params, "limit", 50, 1, 200, int))
+        page, next_cursor, total = await asyncio.get_running_loop().run_in_executor(self._pool, search_doctors, *args)
+        return {"doctors": page, "next_cursor": next_cursor, "total": total}
+
+    async def analyze(self, params, body):
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "body must be JSON")
+        symptoms = str(data.get("symptoms") or "").strip() if isinstance(data, dict) else ""
+        if not symptoms:
+            raise HTTPError(400, "missing symptoms")
+
+        session_id, conv, lock = self.sessions.get(data.get("session"), data.get("user"))
+        async with lock:        # one turn at a time per conversation
+            said = " ".join(msg for who, msg in conv.history if who == "User")
+            provisional = triage.classify(f"{said} {symptoms}")
+            result = await self.pipeline.analyze(conv, symptoms)
+
+        payload = {
+            "session": session_id,
+            "triage": {"level": provisional.level, "confidence": round(provisional.confidence, 3),
+                       "matched": list(provisional.matched)},
+            "risk_level": None if result.error else get_risk_level(result.pretty),
+            "color": result.color,
+            "text": result.text,
+            "pretty": result.pretty,
+            "complete": "disclaimer" in result.pretty.lower(),
+            "error": result.error,
+            "model_ms": round(result.model_ms, 1),
+        }
+        return (502, payload) if result.error else payload
+
+    async def metrics_report(self, params, body):
+        return {
+            "service": {
+                "uptime_s": round(time.time() - self.started_at, 1),
+                "requests": self.requests,
+                "in_flight": self.in_flight,
+                "workers": self.workers,
+                "groups": {group: limiter.stats() for group, limiter in self.limiters.items()},
+                "hospital_cache": self.hospitals.stats(),
+                "sessions": len(self.sessions),
+            },
+            "metrics": metrics.snapshot(),
+        }
+
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error", 502: "Bad Gateway",
+            503: "Service Unavailable", 504: "Gateway Timeout"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless PFM HTTP service")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="processes for CPU-bound ranking (0 = a thread in this process)")
+    parser.add_argument("--stub", action="store_true", help="stub hospitals and stub model, no network")
+    parser.add_argument("--model-latency", type=float, default=0.3, help="stub model: seconds per answer")
+    args = parser.parse_args()
+
+    stub = None
+    if args.stub:
+        from stub_model import StubModelServer
+        stub = StubModelServer(latency=args.model_latency)
+        stub.start()
+        service = Service(args.host, args.port, fetch=stub_fetch_hospitals,
+                          pipeline=SymptomPipeline(HTTPBackend(stub.url)), workers=args.workers)
+    else:
+        service = Service(args.host, args.port, workers=args.workers)
+    try:
+        asyncio.run(service.serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if stub is not None:
+            stub.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Local stand-in for the symptom-analysis model, for load tests and demos.
+
+    python stub_model.py --port 8765 --latency 0.4 --token-rate 80
+    PFM_MODEL_BACKEND=http://127.0.0.1:8765/generate python App.py
+
+POST /generate with {"prompt": ...} answers {"text": ...} after `latency`
+seconds plus one second per `token_rate` words of answer, so a slow model
+can be simulated without spending API quota. Like the real model it asks
+for more information on the first `ask_turns` messages of a case and then
+returns a full report (ending with the disclaimer, which starts a new case).
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+HIGH_RISK = ("chest pain", "breath", "unconscious", "faint", "bleeding", "seizure", "numb", "slurred")
+MODERATE_RISK = ("fever", "vomit", "dizz", "rash", "swelling", "diarrh", "migraine", "cough")
+
+CONDITIONS = {
+    "High": "possible cardiac or neurological emergency",
+    "Moderate": "viral infection or dehydration",
+    "Low": "minor strain or common cold",
+}
+DOCTORS = {"High": "Cardiologist or Emergency Medicine", "Moderate": "General Physician", "Low": "General Physician"}
+
+
+def risk_level(text):
+    text = text.lower()
+    if any(word in text for word in HIGH_RISK):
+        return "High"
+    if any(word in text for word in MODERATE_RISK):
+        return "Moderate"
+    return "Low"
+
+
+def answer(prompt, ask_turns=1):
+    """The stub's reply to `prompt` (a prompt built by symptom_pipeline.build_prompt)."""
+    history, _, symptoms = prompt.partition("You are a medical diagnostic assistant.")
+    symptoms = symptoms.rsplit("Symptoms:", 1)[-1].strip()
+    earlier = len(re.findall(r"\('User', ", history))
+    if earlier < ask_turns:
+        return ("I'm sorry you're not feeling well. To help you better, could you tell me "
+                "how long you have had this, how bad it is on a scale of 1 to 10, and "
+                "whether anything makes it better or worse?")
+
+    level = risk_level(history + " " + symptoms)
+    lines = [
+        f"**Possible Conditions**: {CONDITIONS[level]}",
+        f"**Reasoning**: based on what you described ({symptoms[:120]})",
+        f"**Risk Score**: {level}",
+        "**Urgency**: " + ("seek care immediately" if level == "High" else
+                           "see a doctor within a day or two" if level == "Moderate" else
+                           "rest and watch for changes"),
+        "**Recommended Actions**:",
+        "- Stay calm and rest",
+        "- Drink plenty of water",
+        "- Keep a note of how your symptoms change",
+        f"**Recomanded feild for the cosulting doctor**: {DOCTORS[level]}",
+        "**Disclaimer**: this is not a diagnosis; please consult a doctor.",
+    ]
+    return "\n".join(lines)
+
+
+class StubModelServer:
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, token_rate=0.0, ask_turns=1):
+        self.latency = latency
+        self.token_rate = token_rate        # words per second, 0 = instant
+        self.ask_turns = ask_turns
+        self.requests = 0
+        self.prompt_chars = 0
+        self._lock = threading.Lock()
+        outer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                try:
+                    prompt = json.loads(body)["prompt"]
+                except (ValueError, KeyError, TypeError):
+                    self.send_error(400, "expected {\"prompt\": ...}")
+                    return
+                with outer._lock:
+                    outer.requests += 1
+                    outer.prompt_chars += len(prompt)
+
+                text = answer(prompt, outer.ask_turns)
+                delay = outer.latency
+                if outer.token_rate > 0:
+                    delay += len(text.split()) / outer.token_rate
+                time.sleep(delay)
+
+                payload = json.dumps({"text": text}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            request_queue_size = 256        # load tests open many connections at once
+
+        self._server = Server((host, port), Handler)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}/generate"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stub for the symptom-analysis model")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before the first token")
+    parser.add_argument("--token-rate", type=float, default=0.0, help="words per second (0 = instant)")
+    parser.add_argument("--ask-turns", type=int, default=1, help="follow-up questions before a report")
+    args = parser.parse_args()
+
+    server = StubModelServer(args.host, args.port, args.latency, args.token_rate, args.ask_turns)
+    print(f"Stub model listening on http://{args.host}:{server.port}/generate")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
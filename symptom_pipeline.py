@@ -0,0 +1,233 @@
+"""
+The symptom-analysis pipeline, independent of the GUI.
+
+prompt build -> model call -> beautify -> risk colour. ChatPage drives it
+from the Tk thread; benchmarks/load_symptoms.py drives it headlessly. The
+model backend is pluggable: Gemini by default, or any HTTP endpoint that
+takes {"prompt": ...} and answers {"text": ...} (for example the stub in
+stub_model.py), selected with PFM_MODEL_BACKEND=http://host:port/generate.
+"""
+
+import asyncio
+import json
+import os
+import re
+import time
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+MODEL_TIMEOUT = 60   # seconds
+GEMINI_MODEL = "gemini-2.0-flash"
+
+PROMPT_TEMPLATE = """
+            Previous Chat History: {history}
+            You are a medical diagnostic assistant.
+
+            patient Name if not provided abt the patient details in the symptoms: {user}
+            and return the risk score as one of the following levels: Low, Moderate, High. and the last
+and if the risk is high or moderate, advise the user to seek immediate medical attention and give only 3 more critical steps to take immediately.
+doesnot return anything else 
+            if the symptoms are inadequate, ask for more information before analyzing just first time if the chat history contains it do not
+            ask and produce the diagonised report
+            keep the response concise and to the point.
+            keep the tone empatheitic and keep the language simple for a layman to understand and keep the user realxed on the tone
+
+            
+            Analyze symptoms and return:
+
+            1. Possible Conditions
+            2. Reasoning
+            3. Urgency
+            4. Recommended Actions
+            5. Recomanded feild for the cosulting doctor
+            6. Disclaimer
+
+            Symptoms: {symptoms}
+            """
+
+RISK_COLORS = {
+    "High": "#D32F2F",       # 🔴 Red (High Risk)
+    "Moderate": "#F9A825",   # 🟡 Yellow (Medium Risk)
+    "Low": "#2E7D32",        # 🟢 Green (Low Risk)
+}
+
+Analysis = namedtuple("Analysis", "text pretty color error prompt_chars model_ms total_ms")
+
+
+# -----------------------
+# Text helpers
+# -----------------------
+def build_prompt(history, user, symptoms):
+    return PROMPT_TEMPLATE.format(history=history, user=user, symptoms=symptoms)
+
+
+def clean_markdown(text):
+    text = re.sub(r"\*\*(.*?)\*\*", r"\1", text)  # bold
+    text = re.sub(r"\*(.*?)\*", r"\1", text)       # italic
+    text = text.replace("_", "")                  # underscores
+    text = text.replace("•", "• ")                # clean bullets
+    text = text.replace("- ", "• ")               # bullets
+    return text
+
+
+def beautify(text):
+    text = clean_markdown(text)
+
+    # Add emojis based on keywords
+    replacements = {
+        "Possible Conditions": "🩺 Possible Conditions",
+        "Risk Score": "📊 Risk Score",
+        "Urgency": "⏳ Urgency",
+        "Recommended Actions": "📝 Recommended Actions",
+        "Disclaimer": "⚠️ Disclaimer",
+        "Symptoms": "🤒 Symptoms",
+    }
+
+    for key, emo in replacements.items():
+        text = text.replace(key, emo)
+
+    return text
+
+
+def get_risk_level(text):
+    """Risk level named in a model answer ("High", "Moderate" or "Low"), or None."""
+    text_low = text.lower()
+
+    if "high" in text_low or "severe" in text_low or "critical" in text_low:
+        return "High"
+
+    if "moderate" in text_low or "medium" in text_low:
+        return "Moderate"
+
+    if "low" in text_low or "mild" in text_low:
+        return "Low"
+
+    return None
+
+
+def get_risk_color(text):
+    return RISK_COLORS.get(get_risk_level(text), RISK_COLORS["Low"])
+
+
+# -----------------------
+# Model backends
+# -----------------------
+class GeminiBackend:
+    name = "gemini"
+
+    def __init__(self, model=GEMINI_MODEL):
+        import google.generativeai as genai     # only needed for the real model
+        self._model = genai.GenerativeModel(model)
+
+    async def generate(self, prompt):
+        response = await self._model.generate_content_async(prompt)
+        return response.text
+
+
+class HTTPBackend:
+    """
+    POSTs {"prompt": ...} as JSON and reads {"text": ...} back, one
+    connection per request on the asyncio loop (no thread per call).
+    """
+
+    name = "http"
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.url = url
+        self.host = parts.hostname
+        self.ssl = parts.scheme == "https"
+        self.port = parts.port or (443 if self.ssl else 80)
+        self.path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+    async def generate(self, prompt):
+        body = json.dumps({"prompt": prompt}).encode()
+        head = (f"POST {self.path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n")
+        reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl or None)
+        try:
+            writer.write(head.encode() + body)
+            await writer.drain()
+            raw = await reader.read()
+        finally:
+            writer.close()
+        status_line, _, rest = raw.partition(b"\r\n")
+        _, _, payload = rest.partition(b"\r\n\r\n")
+        status = int(status_line.split()[1])
+        if status != 200:
+            raise RuntimeError(f"model backend returned HTTP {status}")
+        return json.loads(payload)["text"]
+
+
+def make_backend(spec=None):
+    """Backend for `spec` (or PFM_MODEL_BACKEND): "gemini" or an http(s):// URL."""
+    spec = spec or os.environ.get("PFM_MODEL_BACKEND") or "gemini"
+    if spec.startswith(("http://", "https://")):
+        return HTTPBackend(spec)
+    if spec == "gemini":
+        return GeminiBackend()
+    raise ValueError(f"Unknown model backend: {spec}")
+
+
+# -----------------------
+# Pipeline
+# -----------------------
+class Conversation:
+    """One user's running chat history, as sent back to the model each turn."""
+
+    def __init__(self, user=None):
+        self.user = user
+        self.history = []
+
+
+class SymptomPipeline:
+    def __init__(self, backend=None, timeout=MODEL_TIMEOUT):
+        self._backend = backend
+        self.timeout = timeout
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = make_backend()
+        return self._backend
+
+    def start(self, conv, symptoms):
+        """Build the prompt for this turn and record the user's message."""
+        prompt = build_prompt(conv.history, conv.user, symptoms)
+        conv.history.append(("User", symptoms))
+        return prompt
+
+    async def generate(self, prompt):
+        """Return (text, error, model_ms); failures come back as an error message."""
+        model_start = time.perf_counter()
+        try:
+            text = await asyncio.wait_for(self.backend.generate(prompt), self.timeout)
+            error = False
+        except asyncio.TimeoutError:
+            text, error = f"❌ Error: no answer within {self.timeout} seconds", True
+        except Exception as e:
+            text, error = f"❌ Error: {e}", True
+        return text, error, (time.perf_counter() - model_start) * 1000
+
+    def finish(self, conv, text):
+        """Beautify the answer, record it, and return (pretty, colour)."""
+        pretty = beautify(text)
+        conv.history.append(("AI", pretty))
+
+        # a finished report (it always ends with the disclaimer) starts a new case
+        if "disclaimer" in pretty.lower():
+            conv.history = []
+
+        return pretty, get_risk_color(pretty)
+
+    async def analyze(self, conv, symptoms):
+        started = time.perf_counter()
+        prompt = self.start(conv, symptoms)
+        text, error, model_ms = await self.generate(prompt)
+        pretty, color = self.finish(conv, text)
+        return Analysis(text, pretty, color, error, len(prompt), model_ms,
+                        (time.perf_counter() - started) * 1000)
+
+
+pipeline = SymptomPipeline()
@@ -0,0 +1,207 @@
+"""
+Fixed-memory recorder for the SOS movement trail.
+
+Fixes are stored in a ring buffer of packed doubles (timestamp, lat, lon),
+so appending is O(1) and memory never grows however long the incident
+lasts; when full, the oldest fixes are overwritten. Trails can be
+simplified (Douglas-Peucker or Visvalingam-Whyatt) and exported as GeoJSON
+or a Google encoded polyline.
+"""
+
+import heapq
+import json
+import threading
+from array import array
+from math import radians, cos, sqrt
+
+DEFAULT_CAPACITY = 86_400   # one day at 1 Hz, ~2 MB
+DP_MAX_POINTS = 2_000       # douglas_peucker is O(n^2) worst case; thin longer trails first
+EARTH_RADIUS_M = 6_371_000.0
+
+
+class TrailRecorder:
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._buf = array("d", bytes(8 * 3 * capacity))
+        self._head = 0      # next slot to write
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._count
+
+    def append(self, ts, lat, lon):
+        with self._lock:
+            i = self._head * 3
+            buf = self._buf
+            buf[i] = ts
+            buf[i + 1] = lat
+            buf[i + 2] = lon
+            self._head = (self._head + 1) % self.capacity
+            if self._count < self.capacity:
+                self._count += 1
+
+    def add_fix(self, fix):
+        """Listener for location_service (called on its worker thread)."""
+        self.append(fix.ts, fix.lat, fix.lon)
+
+    def clear(self):
+        with self._lock:
+            self._head = 0
+            self._count = 0
+
+    def points(self):
+        """Oldest-first list of (ts, lat, lon)."""
+        with self._lock:
+            start = (self._head - self._count) % self.capacity
+            if start + self._count <= self.capacity:
+                flat = self._buf[start * 3:(start + self._count) * 3]
+            else:
+                flat = self._buf[start * 3:] + self._buf[:self._head * 3]
+        return [(flat[i], flat[i + 1], flat[i + 2]) for i in range(0, len(flat), 3)]
+
+    def last(self):
+        with self._lock:
+            if not self._count:
+                return None
+            i = ((self._head - 1) % self.capacity) * 3
+            return self._buf[i], self._buf[i + 1], self._buf[i + 2]
+
+
+# -----------------------
+# Simplification
+# -----------------------
+def _project(points):
+    # Local equirectangular projection to metres; fine at city scale
+    if not points:
+        return []
+    lat0 = radians(sum(p[1] for p in points) / len(points))
+    k = cos(lat0)
+    return [(radians(p[2]) * EARTH_RADIUS_M * k, radians(p[1]) * EARTH_RADIUS_M) for p in points]
+
+
+def _segment_distance(p, a, b):
+    ax, ay = a
+    dx, dy = b[0] - ax, b[1] - ay
+    if dx == 0 and dy == 0:
+        return sqrt((p[0] - ax)**2 + (p[1] - ay)**2)
+    t = max(0.0, min(1.0, ((p[0] - ax) * dx + (p[1] - ay) * dy) / (dx*dx + dy*dy)))
+    return sqrt((p[0] - ax - t*dx)**2 + (p[1] - ay - t*dy)**2)
+
+
+def douglas_peucker(points, tolerance_m=10.0):
+    """Keep points that deviate more than tolerance_m from the simplified line."""
+    n = len(points)
+    if n < 3:
+        return list(points)
+    xy = _project(points)
+    keep = bytearray(n)
+    keep[0] = keep[-1] = 1
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        best, best_d = None, tolerance_m
+        for i in range(first + 1, last):
+            d = _segment_distance(xy[i], xy[first], xy[last])
+            if d > best_d:
+                best, best_d = i, d
+        if best is not None:
+            keep[best] = 1
+            stack.append((first, best))
+            stack.append((best, last))
+    return [p for p, k in zip(points, keep) if k]
+
+
+def _triangle_area(a, b, c):
+    return abs((b[0] - a[0]) * (c[1] - a[1]) - (c[0] - a[0]) * (b[1] - a[1])) / 2
+
+
+def visvalingam(points, min_area_m2=50.0, max_points=None):
+    """
+    Repeatedly drop the point forming the smallest triangle with its
+    neighbours until every remaining triangle is >= min_area_m2 (and, if
+    given, no more than max_points remain).
+    """
+    n = len(points)
+    if n < 3:
+        return list(points)
+    xy = _project(points)
+    prev = list(range(-1, n - 1))
+    nxt = list(range(1, n + 1))
+    alive = bytearray(b"\x01") * n
+    version = [0] * n
+    heap = [(_triangle_area(xy[i - 1], xy[i], xy[i + 1]), i, 0) for i in range(1, n - 1)]
+    heapq.heapify(heap)
+    remaining = n
+
+    while heap:
+        area, i, ver = heap[0]
+        if not alive[i] or ver != version[i]:
+            heapq.heappop(heap)
+            continue
+        if area >= min_area_m2 and (max_points is None or remaining <= max_points):
+            break
+        heapq.heappop(heap)
+        alive[i] = 0
+        remaining -= 1
+        p, q = prev[i], nxt[i]
+        nxt[p] = q
+        prev[q] = p
+        # Neighbours' areas never drop below the removed one (keeps order sane)
+        for j in (p, q):
+            if 0 < j < n - 1:
+                version[j] += 1
+                a = max(area, _triangle_area(xy[prev[j]], xy[j], xy[nxt[j]]))
+                heapq.heappush(heap, (a, j, version[j]))
+    return [pt for pt, k in zip(points, alive) if k]
+
+
+def simplify(points, tolerance_m=10.0, max_points=DP_MAX_POINTS):
+    """
+    Douglas-Peucker with bounded cost: trails longer than max_points are
+    first thinned to max_points by Visvalingam-Whyatt (O(n log n)).
+    """
+    if len(points) > max_points:
+        points = visvalingam(points, min_area_m2=0.0, max_points=max_points)
+    return douglas_peucker(points, tolerance_m)
+
+
+# -----------------------
+# Export
+# -----------------------
+def to_geojson(points, properties=None):
+    feature = {
+        "type": "Feature",
+        "geometry": {
+            "type": "LineString",
+            "coordinates": [[round(p[2], 6), round(p[1], 6)] for p in points],
+        },
+        "properties": dict(properties or {}),
+    }
+    if points:
+        feature["properties"].setdefault("start_ts", points[0][0])
+        feature["properties"].setdefault("end_ts", points[-1][0])
+        feature["properties"].setdefault("timestamps", [p[0] for p in points])
+    return json.dumps(feature, separators=(",", ":"))
+
+
+def _encode_value(v, out):
+    v = ~(v << 1) if v < 0 else v << 1
+    while v >= 0x20:
+        out.append(chr((0x20 | (v & 0x1F)) + 63))
+        v >>= 5
+    out.append(chr(v + 63))
+
+
+def encode_polyline(points, precision=5):
+    """Google encoded polyline of the (lat, lon) part of the points."""
+    factor = 10 ** precision
+    out = []
+    last_lat = last_lon = 0
+    for _ts, lat, lon in points:
+        ilat = int(round(lat * factor))
+        ilon = int(round(lon * factor))
+        _encode_value(ilat - last_lat, out)
+        _encode_value(ilon - last_lon, out)
+        last_lat, last_lon = ilat, ilon
+    return "".join(out)
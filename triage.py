@@ -0,0 +1,152 @@
+"""
+Instant local triage of typed symptoms, shown while the model is thinking.
+
+A linear classifier over word n-gram features: the text is reduced to its
+1-, 2- and 3-word n-grams (words after "no"/"not"/"without" are marked as
+negated), each n-gram found in the bundled red-flag lexicon below selects
+one row of a flat weight array, and the three class scores are the bias
+plus the sum of those rows. Scoring is a few dictionary and array lookups
+and takes microseconds. The result is only a provisional Low/Moderate/High,
+or Unknown when nothing in the text is in the lexicon (the bias alone must
+never call an unrecognised complaint Low); the model's answer confirms or
+overrides it.
+"""
+
+import math
+import re
+from array import array
+from collections import namedtuple
+
+LEVELS = ("Low", "Moderate", "High")
+UNKNOWN = "Unknown"
+MAX_NGRAM = 3
+NEGATIONS = {"no", "not", "without", "denies", "never", "nor"}
+NEGATION_SPAN = 3       # words after a negation that it applies to
+BIAS = (0.6, 0.0, -0.2)
+
+# phrase -> (level, weight). Phrases are matched as whole word n-grams.
+RED_FLAGS = {
+    # High: possible emergencies
+    "heart attack": ("High", 3.5), "cardiac arrest": ("High", 3.5), "stroke": ("High", 3.0),
+    "chest pain": ("High", 2.5), "chest pressure": ("High", 2.5), "chest tightness": ("High", 2.2),
+    "pain spreading": ("High", 1.5), "left arm": ("High", 1.2), "jaw pain": ("High", 1.2),
+    "shortness of breath": ("High", 2.5), "short of breath": ("High", 2.5),
+    "can't breathe": ("High", 3.0), "cannot breathe": ("High", 3.0), "difficulty breathing": ("High", 2.5),
+    "trouble breathing": ("High", 2.5), "breathless": ("High", 2.0), "choking": ("High", 2.5),
+    "unconscious": ("High", 3.0), "passed out": ("High", 2.5), "fainted": ("High", 2.2),
+    "fainting": ("High", 2.2), "unresponsive": ("High", 3.0), "not breathing": ("High", 3.5),
+    "collapsed": ("High", 3.0), "collapse": ("High", 2.5), "knocked out": ("High", 2.5),
+    "seizure": ("High", 3.0), "seizures": ("High", 3.0), "convulsions": ("High", 3.0),
+    "slurred speech": ("High", 3.0), "face drooping": ("High", 3.0), "numb face": ("High", 2.5),
+    "numbness": ("High", 1.5), "one side": ("High", 1.2), "weakness": ("High", 0.8),
+    "worst headache": ("High", 3.0), "sudden headache": ("High", 2.0), "stiff neck": ("High", 1.8),
+    "confusion": ("High", 1.8), "confused": ("High", 1.8),
+    "vomiting blood": ("High", 3.0), "coughing blood": ("High", 3.0), "blood in stool": ("High", 2.2),
+    "black stool": ("High", 2.0), "heavy bleeding": ("High", 3.0), "bleeding heavily": ("High", 3.0),
+    "won't stop bleeding": ("High", 3.0), "bleeding a lot": ("High", 3.0), "bleeding badly": ("High", 3.0),
+    "lot of blood": ("High", 2.5), "losing blood": ("High", 2.5),
+    "suicidal": ("High", 3.5), "overdose": ("High", 3.5), "overdosed": ("High", 3.5),
+    "too many pills": ("High", 3.5), "took too many": ("High", 3.0), "too much medicine": ("High", 3.0),
+    "poisoning": ("High", 3.0), "poisoned": ("High", 3.0),
+    "anaphylaxis": ("High", 3.5), "throat swelling": ("High", 3.0), "swollen tongue": ("High", 3.0),
+    "severe allergic": ("High", 3.0), "blue lips": ("High", 3.0),
+    "severe burn": ("High", 2.5), "head injury": ("High", 2.0), "broken bone": ("High", 1.5),
+    "severe abdominal pain": ("High", 2.0), "pregnant bleeding": ("High", 2.5),
+    # Moderate: see a doctor soon
+    "fever": ("Moderate", 1.2), "high fever": ("Moderate", 1.8), "persistent fever": ("Moderate", 1.8),
+    "vomiting": ("Moderate", 1.3), "vomited": ("Moderate", 1.3), "diarrhea": ("Moderate", 1.1),
+    "dehydrated": ("Moderate", 1.5), "dehydration": ("Moderate", 1.5),
+    "dizzy": ("Moderate", 1.2), "dizziness": ("Moderate", 1.2), "palpitations": ("Moderate", 1.6),
+    "migraine": ("Moderate", 1.0), "abdominal pain": ("Moderate", 1.4), "stomach pain": ("Moderate", 1.2),
+    "stomach hurts": ("Moderate", 1.0), "belly pain": ("Moderate", 1.0),
+    "lower right": ("Moderate", 1.0), "blood": ("Moderate", 1.0), "swelling": ("Moderate", 0.9),
+    "infection": ("Moderate", 1.0), "pus": ("Moderate", 1.0), "rash": ("Moderate", 0.8),
+    "painful urination": ("Moderate", 1.2), "ear pain": ("Moderate", 0.8), "wheezing": ("Moderate", 1.5),
+    "cough": ("Moderate", 0.6), "back pain": ("Moderate", 0.6), "sprain": ("Moderate", 0.7),
+    "burn": ("Moderate", 0.9), "bite": ("Moderate", 0.9), "fracture": ("Moderate", 1.5),
+    # Low: self-care usually enough
+    "runny nose": ("Low", 1.2), "sneezing": ("Low", 1.2), "sore throat": ("Low", 0.8),
+    "mild": ("Low", 0.8), "slight": ("Low", 0.8), "itchy": ("Low", 0.6), "tired": ("Low", 0.5),
+    "common cold": ("Low", 1.2), "headache": ("Low", 0.5), "muscle ache": ("Low", 0.8),
+    # Severity modifiers
+    "severe": ("High", 1.0), "sudden": ("High", 0.7), "worst": ("High", 1.0),
+    "getting worse": ("Moderate", 0.8), "for days": ("Moderate", 0.5),
+}
+
+Triage = namedtuple("Triage", "level confidence scores matched")
+
+_WORD_RE = re.compile(r"[a-z0-9']+|[,.;:!?]")
+
+
+def tokenize(text):
+    """Lower-cased words, with negated ones prefixed by "not_"."""
+    words = []
+    negated = 0
+    for word in _WORD_RE.findall(text.lower()):
+        if not word[0].isalnum() or word == "but":
+            negated = 0             # a negation ends with its clause
+            continue
+        if word in NEGATIONS:
+            negated = NEGATION_SPAN
+            continue
+        if negated:
+            negated -= 1
+            word = "not_" + word
+        words.append(word)
+    return words
+
+
+def ngrams(words):
+    for n in range(1, MAX_NGRAM + 1):
+        for i in range(len(words) - n + 1):
+            yield " ".join(words[i:i + n])
+
+
+class TriageModel:
+    def __init__(self, lexicon=RED_FLAGS, bias=BIAS):
+        self.bias = bias
+        self.vocab = {}             # n-gram -> feature index
+        self.phrases = []           # feature index -> lexicon phrase
+        # weights[feature * 3 + class]; one flat array keeps the lookups cheap
+        self.weights = array("d")
+        for phrase, (level, weight) in lexicon.items():
+            words = tokenize(phrase)
+            if not 0 < len(words) <= MAX_NGRAM:
+                raise ValueError(f"Lexicon phrase must be 1-{MAX_NGRAM} words: {phrase!r}")
+            gram = " ".join(words)
+            f = self.vocab.get(gram)
+            if f is None:
+                f = self.vocab[gram] = len(self.phrases)
+                self.phrases.append(phrase)
+                self.weights.extend((0.0, 0.0, 0.0))
+            self.weights[f * 3 + LEVELS.index(level)] += weight
+
+    def classify(self, text):
+        vocab = self.vocab
+        features = {vocab[g] for g in ngrams(tokenize(text)) if g in vocab}
+        if not features:
+            return Triage(UNKNOWN, 0.0, tuple(self.bias), [])
+        w = self.weights
+        scores = list(self.bias)
+        for f in features:
+            i = f * 3
+            scores[0] += w[i]
+            scores[1] += w[i + 1]
+            scores[2] += w[i + 2]
+
+        best = max(range(3), key=scores.__getitem__)
+        # softmax probability of the winning class
+        top = scores[best]
+        confidence = 1.0 / sum(math.exp(s - top) for s in scores)
+        return Triage(LEVELS[best], confidence, tuple(scores), sorted(self.phrases[f] for f in features))
+
+
+_model = None
+
+
+def classify(text):
+    """Provisional triage of `text` with the bundled lexicon."""
+    global _model
+    if _model is None:
+        _model = TriageModel()
+    return _model.classify(text)
@@ -0,0 +1,139 @@
+"""
+Typo-tolerant term index used by the doctor search.
+
+Every distinct word (from names and specialties) is a term. Terms are indexed
+by their character trigrams, and each term keeps a bitset of the rows that
+contain it. A query word is matched against the vocabulary rather than the
+rows, so the cost per keystroke depends on the vocabulary size, not on the
+catalog size.
+"""
+
+import re
+from bisect import bisect_left
+from collections import defaultdict
+
+MIN_SIMILARITY = 0.4     # floor for the fuzzy threshold
+TYPO_GRAMS = 3.5         # trigrams one typo can change; sets the length-scaled threshold
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def trigrams(word, open_end=False):
+    """Padded trigrams; open_end drops the end marker for a word still being typed."""
+    padded = f"  {word}" if open_end else f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    def __init__(self, n_rows):
+        self.n_rows = n_rows
+        self.terms = []            # term id -> word
+        self._term_id = {}
+        self._term_rows = []       # term id -> list of rows
+        self._term_grams = []      # term id -> trigram count
+        self._postings = defaultdict(list)   # trigram -> term ids
+        self._sorted_terms = None
+        self._masks = {}
+
+    def add(self, row, text):
+        for word in set(tokenize(text)):
+            tid = self._term_id.get(word)
+            if tid is None:
+                tid = self._term_id[word] = len(self.terms)
+                self.terms.append(word)
+                self._term_rows.append([])
+                grams = trigrams(word)
+                self._term_grams.append(len(grams))
+                for g in grams:
+                    self._postings[g].append(tid)
+                self._sorted_terms = None
+            self._term_rows[tid].append(row)
+
+    def term_mask(self, tid):
+        mask = self._masks.get(tid)
+        if mask is None:
+            buf = bytearray((self.n_rows + 7) // 8 or 1)
+            for r in self._term_rows[tid]:
+                buf[r >> 3] |= 1 << (r & 7)
+            mask = self._masks[tid] = int.from_bytes(buf, "little")
+        return mask
+
+    def term_rows(self, tid):
+        return self._term_rows[tid]
+
+    # ---------------------------------
+    # Matching
+    # ---------------------------------
+    def _prefix_terms(self, word):
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted((t, i) for i, t in enumerate(self.terms))
+        terms = self._sorted_terms
+        i = bisect_left(terms, (word, -1))
+        while i < len(terms) and terms[i][0].startswith(word):
+            yield terms[i]
+            i += 1
+
+    def match_word(self, word, partial=False, min_similarity=MIN_SIMILARITY):
+        """
+        Return {term id: score} for vocabulary terms similar to `word`.
+        Exact match scores 1.0, prefixes 0.8-0.95. Only when there is neither
+        is the word treated as a typo: fuzzy matches use the Dice coefficient
+        over trigrams, with a threshold that allows about one typo for the
+        word's length (so "neurologist" doesn't match every "-ologist"); a
+        word that is still being typed is also compared with the same-length
+        prefix of each term.
+        """
+        scores = {}
+        for term, tid in self._prefix_terms(word):
+            scores[tid] = 1.0 if term == word else 0.8 + 0.15 * len(word) / len(term)
+
+        if scores or len(word) < 3:
+            return scores
+
+        grams = trigrams(word, open_end=partial)
+        min_similarity = max(min_similarity, 1.0 - TYPO_GRAMS / len(grams))
+        shared = defaultdict(int)
+        for g in grams:
+            for tid in self._postings.get(g, ()):
+                shared[tid] += 1
+
+        n = len(grams)
+        for tid, common in shared.items():
+            sim = 2.0 * common / (n + self._term_grams[tid])
+            if partial and sim < min_similarity:
+                # Compare with the term cut to the typed length instead
+                head = trigrams(self.terms[tid][:len(word)], open_end=True)
+                sim = 2.0 * len(grams & head) / (n + len(head))
+            if sim >= min_similarity:
+                scores[tid] = min(sim, 0.79)
+        return scores
+
+    def search(self, text):
+        """
+        Return (mask, ranked_terms) for a query string. `mask` has a bit for
+        every row matching all query words; `ranked_terms` lists
+        (score, term id) of the most selective word, best first.
+        """
+        words = tokenize(text)
+        if not words:
+            return None, []
+
+        mask = None
+        primary = None
+        for i, word in enumerate(words):
+            # the last word may still be being typed
+            matches = self.match_word(word, partial=i == len(words) - 1)
+            word_mask = 0
+            for tid in matches:
+                word_mask |= self.term_mask(tid)
+            mask = word_mask if mask is None else mask & word_mask
+            size = sum(len(self._term_rows[t]) for t in matches)
+            if primary is None or size < primary[0]:
+                primary = (size, matches)
+
+        ranked = sorted(((s, t) for t, s in primary[1].items()), key=lambda x: -x[0])
+        return mask, ranked
@@ -0,0 +1,56 @@
+"""
+Keeps one live instance per feature window (hospital finder, doctors, SOS).
+
+Closing a managed window only withdraws it, so reopening it is instant and
+keeps its loaded data, scroll position and filters.
+"""
+
+
+class WindowManager:
+    def __init__(self):
+        self._windows = {}
+
+    def show(self, key, factory, modal=False):
+        """Restore the window registered under `key`, creating it on first use."""
+        win = self._windows.get(key)
+        if win is None or not win.winfo_exists():
+            win = factory()
+            win.protocol("WM_DELETE_WINDOW", lambda k=key: self.hide(k))
+            self._windows[key] = win
+        else:
+            win.deiconify()
+
+        win.lift()
+        win.focus_force()
+        if modal:
+            win.grab_set()
+        return win
+
+    def hide(self, key):
+        win = self._windows.get(key)
+        if win is None or not win.winfo_exists():
+            return
+        try:
+            win.grab_release()
+        except Exception:
+            pass
+        win.withdraw()
+
+    def get(self, key):
+        win = self._windows.get(key)
+        if win is not None and win.winfo_exists():
+            return win
+        return None
+
+    def destroy_all(self):
+        for win in self._windows.values():
+            try:
+                if win.winfo_exists():
+                    win.destroy()
+            except Exception:
+                pass
+        self._windows.clear()
+
+
+# Shared by every page of the app
+windows = WindowManager()